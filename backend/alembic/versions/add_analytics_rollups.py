@@ -0,0 +1,41 @@
+"""add analytics rollups
+
+Daily and all-time rollup tables behind ``/api/analytics``. Fill them for
+existing data with ``python -m app.analytics --rebuild``.
+
+Revision ID: add_analytics_rollups
+Revises: add_change_log
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_analytics_rollups'
+down_revision = 'add_change_log'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'analytics_daily',
+        sa.Column('metric', sa.String(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('dimension', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('metric', 'day', 'dimension'),
+    )
+    op.create_table(
+        'analytics_totals',
+        sa.Column('metric', sa.String(), nullable=False),
+        sa.Column('dimension', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('metric', 'dimension'),
+    )
+
+def downgrade():
+    op.drop_table('analytics_totals')
+    op.drop_table('analytics_daily')
@@ -0,0 +1,68 @@
+"""add candidate dedup
+
+Normalised email and phone keys on candidates for the duplicate check on
+insert, and the table of likely duplicates found by the batch job. The keys
+of existing candidates are filled here; fill the table with
+``python -m app.dedup``.
+
+Revision ID: add_candidate_dedup
+Revises: add_resume_search
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.dedup import normalise_email, normalise_phone
+
+# revision identifiers, used by Alembic.
+revision = 'add_candidate_dedup'
+down_revision = 'add_resume_search'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+def _backfill_keys(bind):
+    last_id = ''
+    while True:
+        rows = bind.execute(sa.text(
+            "SELECT id, email, phone FROM candidates WHERE id > :last_id ORDER BY id LIMIT :limit"
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall()
+        if not rows:
+            return
+        bind.execute(
+            sa.text("UPDATE candidates SET email_key = :email_key, phone_key = :phone_key WHERE id = :id"),
+            [{'id': row_id, 'email_key': normalise_email(email), 'phone_key': normalise_phone(phone)}
+             for row_id, email, phone in rows]
+        )
+        last_id = rows[-1][0]
+
+def upgrade():
+    op.add_column('candidates', sa.Column('email_key', sa.String(), nullable=True))
+    op.add_column('candidates', sa.Column('phone_key', sa.String(), nullable=True))
+    # Before the indexes, so they are built once
+    _backfill_keys(op.get_bind())
+    op.create_index('ix_candidates_email_key', 'candidates', ['email_key'])
+    op.create_index('ix_candidates_phone_key', 'candidates', ['phone_key'])
+    op.create_table(
+        'candidate_duplicates',
+        sa.Column('candidate_id', sa.String(), sa.ForeignKey('candidates.id'), nullable=False),
+        sa.Column('duplicate_id', sa.String(), sa.ForeignKey('candidates.id'), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('reason', sa.String(), nullable=False),
+        sa.Column('detected_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('candidate_id', 'duplicate_id'),
+    )
+    op.create_index('ix_candidate_duplicates_duplicate_id', 'candidate_duplicates', ['duplicate_id'])
+    op.create_index('ix_candidate_duplicates_score', 'candidate_duplicates', ['score', 'candidate_id', 'duplicate_id'])
+
+def downgrade():
+    op.drop_index('ix_candidate_duplicates_score', table_name='candidate_duplicates')
+    op.drop_index('ix_candidate_duplicates_duplicate_id', table_name='candidate_duplicates')
+    op.drop_table('candidate_duplicates')
+    op.drop_index('ix_candidates_phone_key', table_name='candidates')
+    op.drop_index('ix_candidates_email_key', table_name='candidates')
+    with op.batch_alter_table('candidates') as batch_op:
+        batch_op.drop_column('phone_key')
+        batch_op.drop_column('email_key')
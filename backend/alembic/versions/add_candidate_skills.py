@@ -0,0 +1,40 @@
+"""add candidate skills
+
+Search index of candidate skills and languages, plus the candidate's years
+of experience and career level. Fill it for existing resumes with
+``python -m app.candidate_search``.
+
+Revision ID: add_candidate_skills
+Revises: add_native_json_columns
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_candidate_skills'
+down_revision = 'add_native_json_columns'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'candidate_skills',
+        sa.Column('candidate_id', sa.String(), sa.ForeignKey('candidates.id'), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('skill', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('candidate_id', 'kind', 'skill', name='pk_candidate_skills'),
+    )
+    op.create_index('ix_candidate_skills_kind_skill_candidate_id', 'candidate_skills', ['kind', 'skill', 'candidate_id'])
+    op.add_column('candidates', sa.Column('total_years_experience', sa.Float(), nullable=True))
+    op.add_column('candidates', sa.Column('career_level', sa.String(), nullable=True))
+    op.create_index('ix_candidates_career_level_years', 'candidates', ['career_level', 'total_years_experience'])
+
+def downgrade():
+    op.drop_index('ix_candidates_career_level_years', table_name='candidates')
+    with op.batch_alter_table('candidates') as batch_op:
+        batch_op.drop_column('career_level')
+        batch_op.drop_column('total_years_experience')
+    op.drop_index('ix_candidate_skills_kind_skill_candidate_id', table_name='candidate_skills')
+    op.drop_table('candidate_skills')
@@ -0,0 +1,42 @@
+"""add change log
+
+``updated_at`` on the tables the API exposes that lack it (resumes,
+projects and interviews got theirs with the project stages), and the change
+log behind the ``/api/changes`` feed.
+
+Revision ID: add_change_log
+Revises: add_candidate_dedup
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_change_log'
+down_revision = 'add_candidate_dedup'
+branch_labels = None
+depends_on = None
+
+TABLES = ['candidates', 'parse_jobs', 'tags', 'requirements']
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.create_table(
+        'change_log',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('entity', sa.String(), nullable=False),
+        sa.Column('entity_id', sa.String(), nullable=False),
+        sa.Column('operation', sa.String(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_change_log_changed_at', 'change_log', ['changed_at'])
+
+def downgrade():
+    op.drop_index('ix_change_log_changed_at', table_name='change_log')
+    op.drop_table('change_log')
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,68 @@
+"""add hot path indexes
+
+Indexes for the foreign keys, filters and keyset pagination orders used by
+the API, and composite primary keys on the tag association tables.
+
+Revision ID: add_hot_path_indexes
+Revises: add_resume_parser_version
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_hot_path_indexes'
+down_revision = 'add_resume_parser_version'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_candidates_email', 'candidates', ['email']),
+    ('ix_candidates_created_at_id', 'candidates', ['created_at', 'id']),
+    ('ix_resumes_created_at_id', 'resumes', ['created_at', 'id']),
+    ('ix_resumes_candidate_id_created_at_id', 'resumes', ['candidate_id', 'created_at', 'id']),
+    ('ix_projects_created_at_id', 'projects', ['created_at', 'id']),
+    ('ix_projects_status_created_at_id', 'projects', ['status', 'created_at', 'id']),
+    ('ix_requirements_created_at_id', 'requirements', ['created_at', 'id']),
+    ('ix_requirements_project_id_created_at_id', 'requirements', ['project_id', 'created_at', 'id']),
+    ('ix_interviews_scheduled_time', 'interviews', ['scheduled_time']),
+    ('ix_interviews_created_at_id', 'interviews', ['created_at', 'id']),
+    ('ix_interviews_project_id_created_at_id', 'interviews', ['project_id', 'created_at', 'id']),
+    ('ix_interviews_candidate_id_created_at_id', 'interviews', ['candidate_id', 'created_at', 'id']),
+    ('ix_tags_category_name_id', 'tags', ['category', 'name', 'id']),
+]
+
+ASSOCIATIONS = [
+    ('resume_tags', 'resume_id'),
+    ('requirement_tags', 'requirement_id'),
+]
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+    for table, owner in ASSOCIATIONS:
+        # Primary key columns cannot hold NULLs or duplicate pairs
+        op.execute(f"DELETE FROM {table} WHERE {owner} IS NULL OR tag_id IS NULL")
+        op.execute(f"CREATE TABLE {table}_dedup AS SELECT DISTINCT {owner}, tag_id FROM {table}")
+        op.execute(f"DELETE FROM {table}")
+        op.execute(f"INSERT INTO {table} ({owner}, tag_id) SELECT {owner}, tag_id FROM {table}_dedup")
+        op.execute(f"DROP TABLE {table}_dedup")
+        # Batch mode recreates the table on SQLite, which cannot ALTER constraints
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(owner, existing_type=sa.String(), nullable=False)
+            batch_op.alter_column('tag_id', existing_type=sa.String(), nullable=False)
+            batch_op.create_primary_key(f'pk_{table}', [owner, 'tag_id'])
+        op.create_index(f'ix_{table}_tag_id', table, ['tag_id'])
+
+def downgrade():
+    for table, owner in reversed(ASSOCIATIONS):
+        op.drop_index(f'ix_{table}_tag_id', table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(f'pk_{table}', type_='primary')
+            batch_op.alter_column(owner, existing_type=sa.String(), nullable=True)
+            batch_op.alter_column('tag_id', existing_type=sa.String(), nullable=True)
+
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
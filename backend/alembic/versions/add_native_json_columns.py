@@ -0,0 +1,102 @@
+"""add native json columns
+
+Stores parsed resumes, interview feedback and the project list fields as
+JSON (JSONB on PostgreSQL) instead of JSON text, and copies the resume's
+total_years_experience and career_level into indexed columns.
+
+Revision ID: add_native_json_columns
+Revises: add_hot_path_indexes
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+# revision identifiers, used by Alembic.
+revision = 'add_native_json_columns'
+down_revision = 'add_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+# (table, column, nullable)
+JSON_COLUMNS = [
+    ('resumes', 'parsed_content', True),
+    ('interviews', 'feedback', True),
+    ('projects', 'completed_stages', True),
+    ('projects', 'responsibilities', False),
+    ('projects', 'qualifications', False),
+    ('projects', 'benefits', True),
+]
+
+# Columns the API reads and writes as JSON lists
+LIST_COLUMNS = {'completed_stages', 'responsibilities', 'qualifications', 'benefits'}
+
+def _json_type(dialect):
+    if dialect == 'postgresql':
+        return JSONB(none_as_null=True)
+    return sa.JSON(none_as_null=True)
+
+def _clean(value, nullable, is_list=False):
+    """JSON text for a stored value: empty becomes NULL, non-JSON a JSON string.
+
+    For the list columns non-JSON text becomes a one-item list instead.
+    """
+    if value is None or value.strip() in ('', '{}'):
+        return None if nullable else '[]'
+    try:
+        json.loads(value)
+    except ValueError:
+        return json.dumps([value] if is_list else value, ensure_ascii=False)
+    return value
+
+def _alter_types(type_for, using):
+    bind = op.get_bind()
+    tables = {}
+    for table, column, nullable in JSON_COLUMNS:
+        tables.setdefault(table, []).append((column, nullable))
+    for table, columns in tables.items():
+        if bind.dialect.name == 'postgresql':
+            for column, nullable in columns:
+                op.alter_column(table, column, type_=type_for(bind.dialect.name),
+                                existing_nullable=nullable, postgresql_using=using.format(column=column))
+        else:
+            # SQLite cannot ALTER a column type; batch mode copies the table
+            with op.batch_alter_table(table) as batch_op:
+                for column, nullable in columns:
+                    batch_op.alter_column(column, type_=type_for(bind.dialect.name), existing_nullable=nullable)
+
+def upgrade():
+    bind = op.get_bind()
+    op.add_column('resumes', sa.Column('total_years_experience', sa.Float(), nullable=True))
+    op.add_column('resumes', sa.Column('career_level', sa.String(), nullable=True))
+
+    # Normalise the stored text while it is still text, so the cast to JSON
+    # cannot fail, and fill the new resume columns from it
+    for table, column, nullable in JSON_COLUMNS:
+        rows = bind.execute(sa.text(f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL")).fetchall()
+        for row_id, value in rows:
+            cleaned = _clean(value, nullable, column in LIST_COLUMNS)
+            values = {'id': row_id, 'value': cleaned}
+            assignments = f"{column} = :value"
+            if table == 'resumes':
+                content = json.loads(cleaned) if cleaned else None
+                content = content if isinstance(content, dict) else {}
+                values['years'] = content.get('total_years_experience')
+                values['level'] = content.get('career_level')
+                assignments += ", total_years_experience = :years, career_level = :level"
+            elif cleaned == value:
+                continue
+            bind.execute(sa.text(f"UPDATE {table} SET {assignments} WHERE id = :id"), values)
+
+    _alter_types(_json_type, "{column}::jsonb")
+    op.create_index('ix_resumes_career_level_years', 'resumes', ['career_level', 'total_years_experience'])
+
+def downgrade():
+    op.drop_index('ix_resumes_career_level_years', table_name='resumes')
+    _alter_types(lambda dialect: sa.String(), "{column}::text")
+    with op.batch_alter_table('resumes') as batch_op:
+        batch_op.drop_column('career_level')
+        batch_op.drop_column('total_years_experience')
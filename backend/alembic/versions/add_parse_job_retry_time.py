@@ -0,0 +1,25 @@
+"""add parse job retry time
+
+``not_before`` holds a failed parse job back until its retry backoff has
+passed.
+
+Revision ID: add_parse_job_retry_time
+Revises: add_analytics_rollups
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_parse_job_retry_time'
+down_revision = 'add_analytics_rollups'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('parse_jobs', sa.Column('not_before', sa.DateTime(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('parse_jobs') as batch_op:
+        batch_op.drop_column('not_before')
@@ -0,0 +1,23 @@
+"""add resume content hash
+
+Revision ID: add_resume_content_hash
+Revises: add_resume_parse_jobs
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_resume_content_hash'
+down_revision = 'add_resume_parse_jobs'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('resumes', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_resumes_content_hash', 'resumes', ['content_hash'])
+
+def downgrade():
+    op.drop_index('ix_resumes_content_hash', table_name='resumes')
+    op.drop_column('resumes', 'content_hash')
@@ -0,0 +1,23 @@
+"""add resume extracted text
+
+Revision ID: add_resume_extracted_text
+Revises: add_resume_content_hash
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_resume_extracted_text'
+down_revision = 'add_resume_content_hash'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('resumes', sa.Column('extracted_text', sa.LargeBinary(), nullable=True))
+    op.add_column('resumes', sa.Column('extractor_version', sa.String(), nullable=True))
+
+def downgrade():
+    op.drop_column('resumes', 'extractor_version')
+    op.drop_column('resumes', 'extracted_text')
@@ -0,0 +1,36 @@
+"""add resume parse jobs
+
+Revision ID: add_resume_parse_jobs
+Revises: add_interview_feedback_and_project_stages
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_resume_parse_jobs'
+down_revision = 'add_interview_feedback_and_project_stages'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'parse_jobs',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('resume_id', sa.String(), sa.ForeignKey('resumes.id'), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_parse_jobs_resume_id', 'parse_jobs', ['resume_id'])
+    op.create_index('ix_parse_jobs_status_created_at', 'parse_jobs', ['status', 'created_at'])
+
+def downgrade():
+    op.drop_index('ix_parse_jobs_status_created_at', table_name='parse_jobs')
+    op.drop_index('ix_parse_jobs_resume_id', table_name='parse_jobs')
+    op.drop_table('parse_jobs')
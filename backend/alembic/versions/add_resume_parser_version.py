@@ -0,0 +1,23 @@
+"""add resume parser version
+
+Revision ID: add_resume_parser_version
+Revises: add_unique_tag_names
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_resume_parser_version'
+down_revision = 'add_unique_tag_names'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('resumes', sa.Column('parser_version', sa.String(), nullable=True))
+    op.create_index('ix_resumes_parser_version', 'resumes', ['parser_version'])
+
+def downgrade():
+    op.drop_index('ix_resumes_parser_version', table_name='resumes')
+    op.drop_column('resumes', 'parser_version')
@@ -0,0 +1,43 @@
+"""add resume search
+
+Full-text index over resume text: FTS5 on SQLite, a generated tsvector
+column under a GIN index on PostgreSQL. Fill it for existing resumes with
+``python -m app.search --rebuild``.
+
+Revision ID: add_resume_search
+Revises: add_candidate_skills
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_resume_search'
+down_revision = 'add_candidate_skills'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS resume_search_docs ("
+            "id INTEGER PRIMARY KEY, resume_id VARCHAR NOT NULL UNIQUE REFERENCES resumes (id))"
+        )
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS resume_search USING fts5(body, tokenize = 'porter unicode61')")
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS resume_search ("
+            "resume_id VARCHAR PRIMARY KEY REFERENCES resumes (id) ON DELETE CASCADE, "
+            "body TEXT NOT NULL, "
+            "document tsvector GENERATED ALWAYS AS (to_tsvector('english', body)) STORED)"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_resume_search_document ON resume_search USING GIN (document)")
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS resume_search")
+        op.execute("DROP TABLE IF EXISTS resume_search_docs")
+    elif dialect == 'postgresql':
+        op.execute("DROP TABLE IF EXISTS resume_search")
@@ -0,0 +1,38 @@
+"""add unique tag names
+
+Merges tags that share a name into the one with the lowest id, repointing
+resume and requirement links, then adds a unique index on tags.name.
+
+Revision ID: add_unique_tag_names
+Revises: add_resume_extracted_text
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_unique_tag_names'
+down_revision = 'add_resume_extracted_text'
+branch_labels = None
+depends_on = None
+
+KEEPER = "(SELECT MIN(k.id) FROM tags k WHERE k.name = (SELECT t.name FROM tags t WHERE t.id = {table}.tag_id))"
+
+def _dedupe_links(table, owner):
+    op.execute(f"UPDATE {table} SET tag_id = {KEEPER.format(table=table)}")
+    op.execute(f"CREATE TABLE {table}_dedup AS SELECT DISTINCT {owner}, tag_id FROM {table}")
+    op.execute(f"DELETE FROM {table}")
+    op.execute(f"INSERT INTO {table} ({owner}, tag_id) SELECT {owner}, tag_id FROM {table}_dedup")
+    op.execute(f"DROP TABLE {table}_dedup")
+
+def upgrade():
+    _dedupe_links('resume_tags', 'resume_id')
+    _dedupe_links('requirement_tags', 'requirement_id')
+    op.execute(
+        "DELETE FROM tags WHERE id <> (SELECT MIN(k.id) FROM tags k WHERE k.name = tags.name)"
+    )
+    op.create_index('ix_tags_name', 'tags', ['name'], unique=True)
+
+def downgrade():
+    op.drop_index('ix_tags_name', table_name='tags')
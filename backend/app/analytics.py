@@ -0,0 +1,328 @@
+"""Recruiting analytics rollups.
+
+``/api/analytics`` reads pre-aggregated counts instead of the projects,
+interviews and resumes themselves, so the dashboard costs the same however
+much history there is. Every project, interview, resume and parse job
+contributes facts to the day it was created: its status, whether it is
+parsed, a closed project's cycle length, an interview's feedback scores for
+its project. ``analytics_daily`` holds them per day and ``analytics_totals``
+over all time.
+
+The rollups are maintained incrementally by session hooks: a flush adds
+the facts of inserted rows, subtracts those of deleted ones, and for an
+updated row subtracts its facts before the change and adds them after. The
+commit applies the summed deltas with one upsert per touched rollup row.
+Writes that bypass the ORM are invisible to the hooks, as they are to the
+change feed; the parse queue's queued/running moves are such writes, so
+both count as "pending". ``python -m app.analytics --rebuild`` recomputes
+everything from the source tables.
+"""
+import argparse
+import sys
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, inspect, insert, select, text, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.base import NO_VALUE
+
+from . import database, models
+
+PROJECT_STATUS = "project_status"
+INTERVIEW_STATUS = "interview_status"
+PARSE_JOB_STATUS = "parse_job_status"
+RESUME_PARSE = "resume_parse"
+SCORE_FIELDS = ("technical_score", "communication_score", "culture_fit_score", "overall_rating")
+# Metric counting the interviews with at least one feedback score
+SCORED_INTERVIEWS = "scored_interviews"
+FINISHED_PARSE_STATUSES = ("succeeded", "failed")
+
+# Attributes the facts of each model are computed from. "parsed" stands
+# for whether Resume.parsed_content is set.
+_FIELDS = {
+    models.Project: ("created_at", "status", "updated_at"),
+    models.Interview: ("created_at", "status", "project_id", "feedback", *SCORE_FIELDS),
+    models.Resume: ("created_at", "parsed"),
+    models.ParseJob: ("created_at", "status"),
+}
+
+# Session.info key for the rollup deltas of the current transaction
+_PENDING_KEY = "analytics_pending"
+# pg_advisory_xact_lock key: writers take it shared, a rebuild exclusively
+_LOCK_KEY = 0x616e616c79746963
+
+Fact = Tuple[str, str, int, float]  # metric, dimension, count, total
+Key = Tuple[str, date, str]  # metric, day, dimension
+
+def _day(values: Dict[str, Any]) -> date:
+    # Rows stored without a creation time count on the epoch
+    return (values["created_at"] or datetime(1970, 1, 1)).date()
+
+def _score(value: Any) -> Optional[float]:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+def facts(model, values: Dict[str, Any]) -> List[Fact]:
+    """What a row of ``model`` with ``values`` adds to the rollups of its creation day."""
+    if model is models.Project:
+        cycle = 0.0
+        if values["status"] == "closed" and values["created_at"] is not None:
+            # As the dashboard has always measured it: creation to last update
+            finished = values["updated_at"] or values["created_at"]
+            cycle = (finished - values["created_at"]).total_seconds() / 86400
+        return [(PROJECT_STATUS, values["status"], 1, cycle)]
+    if model is models.Interview:
+        rows = [(INTERVIEW_STATUS, values["status"], 1, 0.0)]
+        # Scores come from the feedback the API stores, or the older columns
+        feedback = models.decode_json(values["feedback"])
+        feedback = feedback if isinstance(feedback, dict) else {}
+        scored = False
+        for field in SCORE_FIELDS:
+            score = _score(values[field]) if values[field] is not None else _score(feedback.get(field))
+            if score is not None:
+                rows.append((field, values["project_id"] or "", 1, score))
+                scored = True
+        if scored:
+            rows.append((SCORED_INTERVIEWS, values["project_id"] or "", 1, 0.0))
+        return rows
+    if model is models.Resume:
+        return [(RESUME_PARSE, "parsed" if values["parsed"] else "unparsed", 1, 0.0)]
+    if model is models.ParseJob:
+        status = values["status"] if values["status"] in FINISHED_PARSE_STATUSES else "pending"
+        return [(PARSE_JOB_STATUS, status, 1, 0.0)]
+    return []
+
+def _add(deltas: Dict[Key, List[float]], day: date, rows: List[Fact], sign: int) -> None:
+    for metric, dimension, count, total in rows:
+        delta = deltas.setdefault((metric, day, dimension), [0, 0.0])
+        delta[0] += sign * count
+        delta[1] += sign * total
+
+def _key(field: str) -> str:
+    return "parsed_content" if field == "parsed" else field
+
+def _values(instance, old: bool) -> Dict[str, Any]:
+    """The tracked attributes of ``instance``, as last flushed if ``old``."""
+    state = inspect(instance)
+    values = {}
+    for field in _FIELDS[type(instance)]:
+        key = _key(field)
+        value = state.committed_state.get(key, NO_VALUE) if old else NO_VALUE
+        if value is NO_VALUE:
+            value = getattr(instance, key)
+        values[field] = value is not None if field == "parsed" else value
+    return values
+
+# Setting a tracked attribute loads its previous value first, so a flush
+# always knows which facts to take back
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+for _model, _fields in _FIELDS.items():
+    for _field in _fields:
+        event.listen(getattr(_model, _key(_field)), "set", _keep_old_value, active_history=True)
+
+@event.listens_for(Session, "before_flush")
+def _collect_deltas(session, flush_context, instances):
+    deltas = session.info.setdefault(_PENDING_KEY, {})
+    now = datetime.utcnow()
+    for instance in session.new:
+        if type(instance) in _FIELDS:
+            # Set now rather than by the column default, so the day is known
+            if instance.created_at is None:
+                instance.created_at = now
+            values = _values(instance, False)
+            _add(deltas, _day(values), facts(type(instance), values), 1)
+    for instance in session.dirty:
+        if type(instance) not in _FIELDS or not session.is_modified(instance, include_collections=False):
+            continue
+        changed = inspect(instance).committed_state
+        if isinstance(instance, models.Project) and "updated_at" not in changed:
+            # What the column's onupdate would set; the cycle length needs it
+            instance.updated_at = now
+        elif not any(_key(field) in changed for field in _FIELDS[type(instance)]):
+            continue
+        before = _values(instance, True)
+        _add(deltas, _day(before), facts(type(instance), before), -1)
+        after = _values(instance, False)
+        _add(deltas, _day(after), facts(type(instance), after), 1)
+    for instance in session.deleted:
+        if type(instance) in _FIELDS:
+            before = _values(instance, True)
+            _add(deltas, _day(before), facts(type(instance), before), -1)
+
+def _lock(session, shared: bool) -> None:
+    if session.get_bind().dialect.name == "postgresql":
+        function = "pg_advisory_xact_lock_shared" if shared else "pg_advisory_xact_lock"
+        session.execute(text(f"SELECT {function}(:key)"), {"key": _LOCK_KEY})
+
+def _upsert(session, model, rows: List[Dict[str, Any]], keys: List[str]) -> None:
+    table = model.__table__
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(table)
+        session.execute(statement.on_conflict_do_update(index_elements=keys, set_={
+            "count": table.c.count + statement.excluded.count,
+            "total": table.c.total + statement.excluded.total,
+        }), rows)
+        return
+    for row in rows:
+        result = session.execute(
+            update(table).where(*(table.c[key] == row[key] for key in keys))
+            .values(count=table.c.count + row["count"], total=table.c.total + row["total"])
+        )
+        if result.rowcount == 0:
+            session.execute(insert(table), [row])
+
+def apply_deltas(session, deltas: Dict[Key, List[float]]) -> None:
+    """Add ``deltas`` to the daily and all-time rollups."""
+    # Sorted so concurrent writers lock the rollup rows in the same order
+    daily = [
+        {"metric": metric, "day": day, "dimension": dimension, "count": count, "total": total}
+        for (metric, day, dimension), (count, total) in sorted(deltas.items())
+        if count or abs(total) > 1e-9
+    ]
+    if not daily:
+        return
+    totals: Dict[Tuple[str, str], List[float]] = {}
+    for row in daily:
+        total = totals.setdefault((row["metric"], row["dimension"]), [0, 0.0])
+        total[0] += row["count"]
+        total[1] += row["total"]
+    _upsert(session, models.AnalyticsDaily, daily, ["metric", "day", "dimension"])
+    _upsert(session, models.AnalyticsTotal, [
+        {"metric": metric, "dimension": dimension, "count": count, "total": total}
+        for (metric, dimension), (count, total) in sorted(totals.items())
+    ], ["metric", "dimension"])
+
+@event.listens_for(Session, "before_commit")
+def _write_deltas(session):
+    session.flush()
+    deltas = session.info.pop(_PENDING_KEY, None)
+    if deltas:
+        _lock(session, shared=True)
+        apply_deltas(session, deltas)
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_deltas(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+def _source_columns(model):
+    return [
+        (model.parsed_content.isnot(None) if field == "parsed" else getattr(model, field)).label(field)
+        for field in _FIELDS[model]
+    ]
+
+def rebuild(batch_size: int = 5000) -> int:
+    """Recompute the rollups from the source tables; returns the rows read.
+
+    Runs as one transaction that writers wait for, so no write is counted
+    twice or lost.
+    """
+    done = 0
+    with database.SessionLocal() as db:
+        _lock(db, shared=False)
+        db.execute(delete(models.AnalyticsDaily))
+        db.execute(delete(models.AnalyticsTotal))
+        deltas: Dict[Key, List[float]] = {}
+        for model in _FIELDS:
+            rows = db.execute(select(*_source_columns(model)).execution_options(yield_per=batch_size))
+            for row in rows:
+                values = row._asdict()
+                _add(deltas, _day(values), facts(model, values), 1)
+                done += 1
+            print(f"Rolled up {model.__tablename__}")
+        apply_deltas(db, deltas)
+        db.commit()
+    return done
+
+def _period(rows: Dict[Tuple[str, str], List[float]], start: Optional[date], end: Optional[date]) -> Dict[str, Any]:
+    def by_dimension(metric):
+        return {dimension: int(count) for (name, dimension), (count, _) in rows.items() if name == metric and count}
+
+    resumes = by_dimension(RESUME_PARSE)
+    interviews = by_dimension(INTERVIEW_STATUS)
+    closed = rows.get((PROJECT_STATUS, "closed"), [0, 0.0])
+    resume_count = sum(resumes.values())
+    interview_count = sum(interviews.values())
+    return {
+        "start": start,
+        "end": end,
+        "projects": by_dimension(PROJECT_STATUS),
+        "interviews": interviews,
+        "parse_jobs": by_dimension(PARSE_JOB_STATUS),
+        "resumes": resume_count,
+        "parsed_resumes": resumes.get("parsed", 0),
+        "parse_success_rate": resumes.get("parsed", 0) / resume_count if resume_count else None,
+        "interview_completion_rate": interviews.get("completed", 0) / interview_count if interview_count else None,
+        "average_cycle_days": closed[1] / closed[0] if closed[0] else None,
+    }
+
+def summary(db: Session, days: int = 30, today: Optional[date] = None) -> Dict[str, Any]:
+    """The last ``days`` days, the ``days`` before them, and all time.
+
+    Reads at most ``2 * days`` days of the status rollups plus the all-time
+    rollups, whose size depends on the number of statuses and projects only.
+    """
+    today = today or datetime.utcnow().date()
+    current_start = today - timedelta(days=days - 1)
+    previous_start = current_start - timedelta(days=days)
+    table = models.AnalyticsDaily
+    current: Dict[Tuple[str, str], List[float]] = {}
+    previous: Dict[Tuple[str, str], List[float]] = {}
+    for metric, day, dimension, count, total in db.execute(
+        select(table.metric, table.day, table.dimension, table.count, table.total).where(
+            table.metric.in_([PROJECT_STATUS, INTERVIEW_STATUS, PARSE_JOB_STATUS, RESUME_PARSE]),
+            table.day >= previous_start, table.day <= today
+        )
+    ):
+        period = current if day >= current_start else previous
+        sums = period.setdefault((metric, dimension), [0, 0.0])
+        sums[0] += count
+        sums[1] += total
+
+    all_time: Dict[Tuple[str, str], List[float]] = {}
+    scores: Dict[str, Dict[str, Any]] = {}
+    for metric, dimension, count, total in db.execute(select(
+        models.AnalyticsTotal.metric, models.AnalyticsTotal.dimension,
+        models.AnalyticsTotal.count, models.AnalyticsTotal.total
+    )):
+        if metric in SCORE_FIELDS or metric == SCORED_INTERVIEWS:
+            if dimension and count:
+                project = scores.setdefault(dimension, {"project_id": dimension, SCORED_INTERVIEWS: 0})
+                project[metric] = count if metric == SCORED_INTERVIEWS else total / count
+        else:
+            all_time[(metric, dimension)] = [count, total]
+    return {
+        "days": days,
+        "current": _period(current, current_start, today),
+        "previous": _period(previous, previous_start, current_start - timedelta(days=1)),
+        "all_time": _period(all_time, None, None),
+        "project_scores": sorted(
+            (project for project in scores.values() if project[SCORED_INTERVIEWS]),
+            key=lambda project: project["project_id"]
+        ),
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Recruiting analytics rollups")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the rollups from the source tables")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=30, help="period to print")
+    args = parser.parse_args(argv)
+    if args.rebuild:
+        print(f"Rolled up {rebuild(args.batch_size)} rows")
+    with database.SessionLocal() as db:
+        result = summary(db, args.days)
+    for name in ("current", "previous", "all_time"):
+        print(f"{name}: {result[name]}")
+    for project in result["project_scores"]:
+        print(project)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""Bulk resume import from many files or ZIP archives.
+
+Entries are streamed one at a time into blob storage and committed in
+batches. Every committed batch wakes the parse queue, so extraction and
+parsing of earlier batches overlap with storing the rest of the import, with
+concurrency bounded by the parse worker pool. Reading archives, hashing and
+the database work all block, so the import runs in a worker thread.
+"""
+import asyncio
+import json
+import os
+import zipfile
+from pathlib import PurePosixPath
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import UploadFile
+from sqlalchemy.orm import selectinload
+
+from . import database, models, schemas
+from .jobs import enqueue, parse_queue, record_reused
+from .storage import (
+    COMPATIBLE_TYPES, EXTENSION_TYPES, MAX_UPLOAD_BYTES, StoredUpload,
+    UploadTooLarge, discard_blob, resolve_file_type, store_stream
+)
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "50"))
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "5000"))
+
+ZIP_TYPES = {"application/zip", "application/x-zip-compressed"}
+
+def parse_manifest(raw: str) -> Dict[str, str]:
+    """Parse the file → candidate manifest.
+
+    Accepts either ``{"cv.pdf": "<candidate_id>", ...}`` or
+    ``[{"file": "cv.pdf", "candidate_id": "<candidate_id>"}, ...]``.
+
+    Raises:
+        ValueError: If the manifest is not valid JSON in one of these forms
+    """
+    data = json.loads(raw)
+    if isinstance(data, dict):
+        entries = data.items()
+    elif isinstance(data, list):
+        try:
+            entries = [(entry["file"], entry["candidate_id"]) for entry in data]
+        except (TypeError, KeyError) as e:
+            raise ValueError(f"manifest entries need file and candidate_id: {e}")
+    else:
+        raise ValueError("manifest must be a JSON object or array")
+    return {str(name): str(candidate_id) for name, candidate_id in entries}
+
+def _is_zip(upload: UploadFile) -> bool:
+    return upload.content_type in ZIP_TYPES or (upload.filename or "").lower().endswith(".zip")
+
+def _is_hidden(name: str) -> bool:
+    return any(part.startswith((".", "__MACOSX")) for part in PurePosixPath(name).parts)
+
+def _store_zip_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> StoredUpload:
+    # The declared size is checked first so oversized entries are skipped
+    # without decompressing them; BlobWriter still enforces the real size.
+    if info.file_size > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge(f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+    with archive.open(info) as stream:
+        return store_stream(stream, PurePosixPath(info.filename).suffix)
+
+class BulkImporter:
+    def __init__(self, db, manifest: Dict[str, str], batch_size: int = BULK_BATCH_SIZE):
+        self.db = db
+        self.manifest = manifest
+        self.batch_size = batch_size
+        self.results: List[schemas.BulkImportItem] = []
+        self._pending: List[Tuple[schemas.BulkImportItem, StoredUpload, str]] = []
+        self._seen = 0
+        self._candidate_ids = self._load_candidates()
+
+    def _load_candidates(self) -> set:
+        # One lookup for the whole import instead of one per file
+        candidate_ids = set()
+        for candidate_id in self.manifest.values():
+            try:
+                candidate_ids.add(str(UUID(candidate_id)))
+            except ValueError:
+                continue
+        if not candidate_ids:
+            return set()
+        rows = self.db.query(models.Candidate.id).filter(models.Candidate.id.in_(candidate_ids)).all()
+        return {row.id for row in rows}
+
+    def _candidate_for(self, filename: str) -> Optional[str]:
+        candidate_id = self.manifest.get(filename) or self.manifest.get(PurePosixPath(filename).name)
+        if candidate_id is None:
+            return None
+        try:
+            return str(UUID(candidate_id))
+        except ValueError:
+            return candidate_id
+
+    def _fail(self, item: schemas.BulkImportItem, error: str) -> None:
+        item.status = "failed"
+        item.error = error
+
+    def run(self, files: List[UploadFile]) -> schemas.BulkImportResult:
+        for upload in files:
+            if not _is_zip(upload):
+                self._add(
+                    upload.filename or "", upload.content_type,
+                    lambda upload=upload: store_stream(upload.file, PurePosixPath(upload.filename or "").suffix)
+                )
+                continue
+            try:
+                archive = zipfile.ZipFile(upload.file)
+            except zipfile.BadZipFile:
+                item = schemas.BulkImportItem(filename=upload.filename or "")
+                self.results.append(item)
+                self._fail(item, "无效的ZIP文件")
+                continue
+            with archive:
+                for info in archive.infolist():
+                    if info.is_dir() or _is_hidden(info.filename):
+                        continue
+                    declared_type = EXTENSION_TYPES.get(PurePosixPath(info.filename).suffix.lower())
+                    self._add(info.filename, declared_type, lambda info=info: _store_zip_entry(archive, info))
+        self._flush()
+        created = sum(1 for item in self.results if item.status == "created")
+        return schemas.BulkImportResult(
+            total=len(self.results),
+            created=created,
+            failed=len(self.results) - created,
+            results=self.results
+        )
+
+    def _add(self, filename: str, declared_type: Optional[str], store: Callable[[], StoredUpload]) -> None:
+        item = schemas.BulkImportItem(filename=filename)
+        self.results.append(item)
+        self._seen += 1
+        if self._seen > BULK_MAX_FILES:
+            return self._fail(item, f"超过单次导入文件数量上限（{BULK_MAX_FILES}）")
+        candidate_id = self._candidate_for(filename)
+        if candidate_id is None:
+            return self._fail(item, "导入清单中未指定该文件对应的候选人")
+        if candidate_id not in self._candidate_ids:
+            return self._fail(item, "未找到该候选人，请确认候选人信息已正确录入系统")
+        item.candidate_id = UUID(candidate_id)
+        if declared_type not in COMPATIBLE_TYPES:
+            return self._fail(item, "不支持的文件类型。请上传 PDF、Word 文档或文本文件。")
+        try:
+            stored = store()
+        except UploadTooLarge:
+            return self._fail(item, "文件大小超过限制（最大10MB）")
+        except Exception as e:
+            return self._fail(item, f"文件保存失败：{str(e)}")
+        file_type = resolve_file_type(declared_type, stored.sniffed_type)
+        if file_type is None:
+            discard_blob(self.db, stored)
+            return self._fail(item, "文件内容与文件类型不符。请上传 PDF、Word 文档或文本文件。")
+        self._pending.append((item, stored, file_type))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Insert the pending resumes and their parse jobs in one transaction."""
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        db = self.db
+        try:
+            digests = {stored.digest for _, stored, _ in batch}
+            parsed_by_hash = {}
+            for resume in db.query(models.Resume).options(selectinload(models.Resume.tags)).filter(
+                models.Resume.content_hash.in_(digests),
+                models.Resume.parsed_content.isnot(None)
+            ).order_by(models.Resume.created_at):
+                parsed_by_hash.setdefault(resume.content_hash, resume)
+
+            created = []
+            for item, stored, file_type in batch:
+                db_resume = models.Resume(
+                    candidate_id=str(item.candidate_id),
+                    file_path=str(stored.path),
+                    file_type=file_type,
+                    content_hash=stored.digest
+                )
+                db.add(db_resume)
+                duplicate = parsed_by_hash.get(stored.digest)
+                if duplicate:
+                    parse_job = record_reused(db, db_resume, duplicate)
+                else:
+                    parse_job = enqueue(db, db_resume)
+                created.append((item, db_resume, parse_job))
+            # Flush before commit so ids are read without a refresh per row
+            db.flush()
+            for item, db_resume, parse_job in created:
+                item.status = "created"
+                item.resume_id = UUID(db_resume.id)
+                item.parse_job_id = UUID(parse_job.id)
+                item.parse_status = parse_job.status
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for item, stored, _ in batch:
+                discard_blob(db, stored)
+                item.resume_id = item.parse_job_id = item.parse_status = None
+                self._fail(item, f"简历上传失败：{str(e)}")
+            return
+        parse_queue.notify()
+
+def _import(files: List[UploadFile], manifest: Dict[str, str]) -> schemas.BulkImportResult:
+    with database.SessionLocal() as db:
+        return BulkImporter(db, manifest).run(files)
+
+async def import_resumes(files: List[UploadFile], manifest: Dict[str, str]) -> schemas.BulkImportResult:
+    """Store every file in ``files`` (expanding ZIP archives) and queue parsing."""
+    return await asyncio.to_thread(_import, files, manifest)
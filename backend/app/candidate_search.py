@@ -0,0 +1,203 @@
+"""Candidate search by skills, languages and experience.
+
+The technical skills and languages of every parsed resume are copied into
+``candidate_skills``, one row per (candidate, kind, skill) keyed by the
+normalised taxonomy name, and the candidate's years of experience and career
+level into indexed columns on ``candidates``. A search is then a handful of
+index lookups instead of a pass over every resume's parsed JSON.
+
+The index is refreshed in the same transaction whenever a flush changes a
+resume's parsed content, whichever code path stored it. Resumes parsed
+before the index existed are added with::
+
+    python -m app.candidate_search
+"""
+import argparse
+import os
+import sys
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, delete, event, exists, func, inspect, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import database, models
+from .taxonomy import get_taxonomy, normalise
+
+# A search starts from the candidates of its rarest skill when that skill
+# has at most this many candidates
+SEARCH_DRIVER_MAX_ROWS = int(os.getenv("SEARCH_DRIVER_MAX_ROWS", "20000"))
+
+KIND_TECHNICAL = "technical"
+KIND_LANGUAGE = "language"
+
+# Session.info key for candidates whose resumes changed in the current flush
+_STALE_KEY = "candidate_profiles_stale"
+
+def skill_key(name: str) -> str:
+    """Search key of a skill: its canonical taxonomy name, normalised."""
+    return normalise(get_taxonomy().canonical(name))
+
+def build_profile(contents: Iterable[Dict]) -> Tuple[Set[Tuple[str, str]], Optional[float], Optional[str]]:
+    """(kind, key) skill pairs, years and career level for a candidate's parsed resumes.
+
+    Skills are the union over all resumes; years and career level come from
+    the resume with the most experience.
+    """
+    skills: Set[Tuple[str, str]] = set()
+    years, level = None, None
+    for content in contents:
+        parsed_skills = content.get("skills") or {}
+        for name in parsed_skills.get("technical") or []:
+            if name and name.strip():
+                skills.add((KIND_TECHNICAL, skill_key(name)))
+        for name in parsed_skills.get("languages") or []:
+            if name and name.strip():
+                skills.add((KIND_LANGUAGE, normalise(name)))
+        resume_years = content.get("total_years_experience")
+        if resume_years is not None and (years is None or resume_years > years):
+            years, level = resume_years, content.get("career_level")
+    return skills, years, level
+
+def refresh_profiles(connection, candidate_ids: Iterable[str]) -> None:
+    """Recompute the search index of ``candidate_ids`` from their resumes."""
+    candidate_ids = list(candidate_ids)
+    if not candidate_ids:
+        return
+    contents: Dict[str, List[Dict]] = {candidate_id: [] for candidate_id in candidate_ids}
+    rows = connection.execute(
+        select(models.Resume.candidate_id, models.Resume.parsed_content).where(
+            models.Resume.candidate_id.in_(candidate_ids),
+            models.Resume.parsed_content.isnot(None)
+        )
+    )
+    for candidate_id, content in rows:
+        contents[candidate_id].append(content)
+
+    skill_rows, candidate_rows = [], []
+    for candidate_id, items in contents.items():
+        skills, years, level = build_profile(items)
+        skill_rows.extend(
+            {"candidate_id": candidate_id, "kind": kind, "skill": skill} for kind, skill in sorted(skills)
+        )
+        candidate_rows.append({"candidate": candidate_id, "years": years, "level": level})
+
+    table = models.candidate_skills
+    connection.execute(delete(table).where(table.c.candidate_id.in_(candidate_ids)))
+    if skill_rows:
+        connection.execute(insert(table), skill_rows)
+    candidates = models.Candidate.__table__
+    connection.execute(
+        update(candidates).where(candidates.c.id == bindparam("candidate")).values(
+            total_years_experience=bindparam("years"), career_level=bindparam("level")
+        ),
+        candidate_rows
+    )
+
+def _skill_condition(kind: str, keys: List[str]):
+    table = models.candidate_skills
+    return (table.c.kind == kind, table.c.skill.in_(keys))
+
+def _capped_count(db: Session, kind: str, keys: List[str], cap: int) -> int:
+    """Candidates with any of ``keys``, counted up to ``cap + 1`` only."""
+    table = models.candidate_skills
+    rows = select(table.c.candidate_id).where(*_skill_condition(kind, keys)).limit(cap + 1).subquery()
+    return db.scalar(select(func.count()).select_from(rows))
+
+def search_candidates(
+    db: Session,
+    skills: Iterable[str] = (),
+    match_all: bool = True,
+    languages: Iterable[str] = (),
+    min_years: Optional[float] = None,
+    career_level: Optional[str] = None,
+):
+    """Query of the candidates matching every given criterion.
+
+    ``skills`` must all match with ``match_all``, else any one of them;
+    ``languages`` must all match. The query is unordered, for
+    ``pagination.paginate``.
+
+    Each skill criterion is a semi-join on ``candidate_skills``. Walking
+    candidates in page order and probing each criterion finds a page quickly
+    when the skills are common, but reads the whole table when a rare
+    combination has few matches. So when one criterion matches at most
+    ``SEARCH_DRIVER_MAX_ROWS`` candidates, the search starts from those and
+    probes the rest.
+    """
+    table = models.candidate_skills
+    keys = list(dict.fromkeys(skill_key(name) for name in skills if name and name.strip()))
+    terms: List[Tuple[str, List[str]]] = []
+    if keys:
+        terms.extend([(KIND_TECHNICAL, [key]) for key in keys] if match_all else [(KIND_TECHNICAL, keys)])
+    terms.extend(
+        (KIND_LANGUAGE, [name])
+        for name in dict.fromkeys(normalise(name) for name in languages if name and name.strip())
+    )
+
+    query = db.query(models.Candidate)
+    if len(terms) > 1 or (terms and (min_years is not None or career_level)):
+        count, index = min(
+            (_capped_count(db, kind, term_keys, SEARCH_DRIVER_MAX_ROWS), index)
+            for index, (kind, term_keys) in enumerate(terms)
+        )
+        if count <= SEARCH_DRIVER_MAX_ROWS:
+            kind, term_keys = terms.pop(index)
+            query = query.filter(models.Candidate.id.in_(
+                select(table.c.candidate_id).where(*_skill_condition(kind, term_keys))
+            ))
+    for kind, term_keys in terms:
+        query = query.filter(exists().where(
+            table.c.candidate_id == models.Candidate.id, *_skill_condition(kind, term_keys)
+        ))
+    if min_years is not None:
+        query = query.filter(models.Candidate.total_years_experience >= min_years)
+    if career_level:
+        query = query.filter(models.Candidate.career_level == career_level)
+    return query
+
+@event.listens_for(Session, "before_flush")
+def _collect_changed_resumes(session, flush_context, instances):
+    stale = session.info.setdefault(_STALE_KEY, set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(instance, models.Resume):
+            continue
+        attrs = inspect(instance).attrs
+        candidate = attrs.candidate_id.history
+        if instance in session.deleted or attrs.parsed_content.history.has_changes() or candidate.has_changes():
+            for candidate_id in (instance.candidate_id, *(candidate.deleted or ())):
+                if candidate_id:
+                    stale.add(candidate_id)
+
+@event.listens_for(Session, "after_flush_postexec")
+def _refresh_changed_profiles(session, flush_context):
+    stale = session.info.pop(_STALE_KEY, None)
+    if stale:
+        refresh_profiles(session.connection(), stale)
+
+def rebuild(batch_size: int = 500) -> int:
+    """Recompute the index for every candidate; returns the number processed."""
+    done = 0
+    last_id = ""
+    while True:
+        with database.SessionLocal() as db:
+            candidate_ids = list(db.scalars(
+                select(models.Candidate.id).where(models.Candidate.id > last_id)
+                .order_by(models.Candidate.id).limit(batch_size)
+            ))
+            if not candidate_ids:
+                return done
+            refresh_profiles(db.connection(), candidate_ids)
+            db.commit()
+        done += len(candidate_ids)
+        last_id = candidate_ids[-1]
+        print(f"Indexed {done} candidates")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild the candidate skill search index")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+    rebuild(args.batch_size)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
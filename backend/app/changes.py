@@ -0,0 +1,224 @@
+"""Change feed for polling clients.
+
+Every insert, update and delete of a candidate, resume, project,
+requirement, interview or tag made through a Session is appended to
+``change_log`` by the transaction that makes it. A resume whose parsed
+content or candidate changes also logs an update of the candidate, whose
+experience fields are derived from it.
+
+The log's id is the feed's sequence. Rows are written just before the
+commit, and on PostgreSQL under a transaction-level advisory lock (SQLite
+allows one writer at a time anyway), so a transaction that commits later
+always gets higher ids: a client that has read up to id N can never miss a
+change below N that commits afterwards.
+
+``GET /api/changes?since=N`` returns the entities changed after N, each once
+and in its current state, and the cursor to poll with next. A client takes a
+cursor first (no ``since``), then loads its lists, then polls; a poll with
+nothing new is a single primary-key range lookup. Rows older than
+CHANGE_LOG_RETENTION_DAYS are pruned in the background; a client whose
+cursor is older than the log gets ChangesExpired and reloads.
+"""
+import asyncio
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, inspect, insert, select, text
+from sqlalchemy.orm import Session, selectinload
+
+from . import database, models
+
+CHANGE_FEED_MAX_ROWS = int(os.getenv("CHANGE_FEED_MAX_ROWS", "500"))
+CHANGE_LOG_RETENTION_DAYS = float(os.getenv("CHANGE_LOG_RETENTION_DAYS", "7"))
+CHANGE_LOG_PRUNE_INTERVAL = float(os.getenv("CHANGE_LOG_PRUNE_INTERVAL", "3600"))
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+ENTITIES = {
+    "candidate": models.Candidate,
+    "resume": models.Resume,
+    "project": models.Project,
+    "requirement": models.Requirement,
+    "interview": models.Interview,
+    "tag": models.Tag,
+}
+_ENTITY_NAMES = {model: name for name, model in ENTITIES.items()}
+# Relationships the API schemas of an entity include
+_LOAD_OPTIONS = {
+    "resume": [selectinload(models.Resume.tags)],
+    "requirement": [selectinload(models.Requirement.tags)],
+}
+
+# Session.info key for the changes of the current transaction, by (entity, id)
+_PENDING_KEY = "change_log_pending"
+# pg_advisory_xact_lock key serialising change log writers
+_LOCK_KEY = 0x6368616e6765
+
+class ChangesExpired(Exception):
+    """The cursor is older than the oldest change still in the log."""
+
+@dataclass
+class Change:
+    seq: int
+    entity: str
+    entity_id: str
+    operation: str
+    row: Any  # the entity's current state; None when deleted
+
+@dataclass
+class ChangePage:
+    cursor: int
+    changes: List[Change]
+    has_more: bool
+
+def _record(pending: Dict[Tuple[str, str], str], entity: str, entity_id: Optional[str], operation: str) -> None:
+    if not entity_id:
+        return
+    key = (entity, entity_id)
+    previous = pending.pop(key, None)
+    if previous == INSERT:
+        # Created in this transaction: later updates are part of the insert,
+        # and a delete means clients never need to hear of it
+        if operation == DELETE:
+            return
+        operation = INSERT
+    elif previous == DELETE and operation == INSERT:
+        operation = UPDATE
+    # Re-inserted so the dict stays in order of the last change
+    pending[key] = operation
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for operation, instances in ((INSERT, session.new), (UPDATE, session.dirty), (DELETE, session.deleted)):
+        for instance in instances:
+            entity = _ENTITY_NAMES.get(type(instance))
+            if entity is None:
+                continue
+            if operation == UPDATE and not session.is_modified(instance):
+                continue
+            _record(pending, entity, instance.id, operation)
+            if isinstance(instance, models.Resume):
+                attrs = inspect(instance).attrs
+                candidate = attrs.candidate_id.history
+                if operation != UPDATE or attrs.parsed_content.history.has_changes() or candidate.has_changes():
+                    for candidate_id in (instance.candidate_id, *(candidate.deleted or ())):
+                        _record(pending, "candidate", candidate_id, UPDATE)
+
+@event.listens_for(Session, "before_commit")
+def _write_changes(session):
+    # Changes still pending in the session are flushed by commit after this
+    # hook; flush them now so they are logged too
+    session.flush()
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+    changed_at = datetime.utcnow()
+    session.execute(insert(models.ChangeLog.__table__), [
+        {"entity": entity, "entity_id": entity_id, "operation": operation, "changed_at": changed_at}
+        for (entity, entity_id), operation in pending.items()
+    ])
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_changes(session, transaction):
+    # Rolled back, or closed without a commit
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+def latest_cursor(db: Session) -> int:
+    return db.scalar(select(func.max(models.ChangeLog.id))) or 0
+
+def read_changes(db: Session, since: int, limit: int = CHANGE_FEED_MAX_ROWS) -> ChangePage:
+    """Entities changed after ``since``, each once, oldest change first.
+
+    Reads up to ``limit`` log rows; ``has_more`` tells whether more follow
+    the returned cursor.
+
+    Raises:
+        ChangesExpired: changes after ``since`` were already pruned
+    """
+    oldest = db.scalar(select(func.min(models.ChangeLog.id)))
+    if oldest is not None and since < oldest - 1:
+        raise ChangesExpired(since)
+    rows = db.execute(
+        select(models.ChangeLog.id, models.ChangeLog.entity, models.ChangeLog.entity_id, models.ChangeLog.operation)
+        .where(models.ChangeLog.id > since).order_by(models.ChangeLog.id).limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return ChangePage(since, [], False)
+
+    latest: Dict[Tuple[str, str], Tuple[int, str]] = {}
+    for seq, entity, entity_id, operation in rows:
+        key = (entity, entity_id)
+        first = latest.pop(key, (seq, operation))[1]
+        latest[key] = (seq, INSERT if first == INSERT and operation != DELETE else operation)
+    current: Dict[Tuple[str, str], Any] = {}
+    for entity, model in ENTITIES.items():
+        ids = [entity_id for (name, entity_id) in latest if name == entity]
+        for start in range(0, len(ids), 500):
+            query = db.query(model).options(*_LOAD_OPTIONS.get(entity, []))
+            for row in query.filter(model.id.in_(ids[start:start + 500])):
+                current[(entity, row.id)] = row
+    changes = []
+    for (entity, entity_id), (seq, operation) in latest.items():
+        row = current.get((entity, entity_id))
+        # The state now decides: a row deleted by a later change is gone,
+        # one re-created after its delete is back
+        if row is None:
+            operation = DELETE
+        elif operation == DELETE:
+            operation = UPDATE
+        changes.append(Change(seq, entity, entity_id, operation, row))
+    return ChangePage(rows[-1].id, changes, has_more)
+
+def prune(retention_days: float = CHANGE_LOG_RETENTION_DAYS) -> int:
+    """Delete log rows older than ``retention_days``; returns how many.
+
+    The newest row is kept, so the latest cursor never goes back.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    table = models.ChangeLog.__table__
+    with database.engine.begin() as connection:
+        return connection.execute(delete(table).where(
+            table.c.changed_at < cutoff, table.c.id < select(func.max(table.c.id)).scalar_subquery()
+        )).rowcount
+
+class ChangeLogPruner:
+    """Prunes the change log every CHANGE_LOG_PRUNE_INTERVAL seconds."""
+
+    def __init__(self, interval: float = CHANGE_LOG_PRUNE_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="change-log-pruner")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                pruned = await asyncio.to_thread(prune)
+                if pruned:
+                    print(f"Pruned {pruned} change log rows")
+            except Exception as e:
+                print(f"Change log pruning failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+change_log_pruner = ChangeLogPruner()
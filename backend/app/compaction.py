@@ -0,0 +1,205 @@
+"""Resume text compaction before prompting.
+
+Extracted resume text carries a lot of tokens the parser does not need:
+runs of whitespace, page headers and footers repeated on every page and
+sections such as hobbies or references. This module normalises the text,
+drops repeated page furniture, splits the text into sections and, if it is
+still over the token budget, keeps sections in priority order so the fields
+``ParsedResumeContent`` needs survive.
+"""
+import math
+import os
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from .llm_gateway import estimate_tokens
+
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "3000"))
+
+# Page separator emitted by the PDF extractor
+PAGE_BREAK = "\f"
+
+# Sections in the order they are kept when the budget is tight
+SECTION_PRIORITY = [
+    "experience", "skills", "education", "certifications",
+    "header", "summary", "projects", "other"
+]
+
+# Sections holding the fields ParsedResumeContent is built from
+ESSENTIAL_SECTIONS = {"experience", "skills", "education", "certifications"}
+
+SECTION_HEADINGS = {
+    "summary": [
+        "summary", "profile", "professional summary", "objective", "about me",
+        "个人简介", "自我评价", "求职意向"
+    ],
+    "experience": [
+        "experience", "work experience", "professional experience", "employment",
+        "employment history", "work history", "career history",
+        "工作经历", "工作经验", "实习经历"
+    ],
+    "education": [
+        "education", "academic background", "education and training",
+        "教育背景", "教育经历"
+    ],
+    "skills": [
+        "skills", "technical skills", "core competencies", "technologies",
+        "skills and tools", "languages", "专业技能", "技能", "技能特长", "语言能力"
+    ],
+    "certifications": [
+        "certifications", "certificates", "licenses", "licenses and certifications",
+        "证书", "资格证书"
+    ],
+    "projects": ["projects", "selected projects", "project experience", "项目经历", "项目经验"],
+    "other": [
+        "interests", "hobbies", "references", "publications", "awards",
+        "volunteering", "volunteer experience", "兴趣爱好", "获奖情况"
+    ],
+}
+
+_HEADINGS: Dict[str, str] = {
+    heading: section
+    for section, headings in SECTION_HEADINGS.items()
+    for heading in headings
+}
+
+_SPACES = re.compile(r"[ \t]+")
+_DIGITS = re.compile(r"\d+")
+_HEADING_DECORATION = re.compile(r"^[#*\-=•·\s]+|[#*\-=:：•·\s]+$")
+
+@dataclass
+class Section:
+    name: str
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+@dataclass
+class CompactionResult:
+    text: str
+    original_tokens: int
+    compacted_tokens: int
+    sections: List[str]
+    dropped_sections: List[str]
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.compacted_tokens)
+
+def normalise_whitespace(text: str) -> str:
+    """Collapse runs of spaces and blank lines, keeping page breaks."""
+    text = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+    pages = []
+    for page in text.split(PAGE_BREAK):
+        lines = [_SPACES.sub(" ", line).strip() for line in page.split("\n")]
+        page = re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+        pages.append(page)
+    return PAGE_BREAK.join(pages)
+
+def drop_repeated_page_lines(text: str, min_share: float = 0.5) -> str:
+    """Remove header and footer lines repeated on most pages.
+
+    Digits are ignored when comparing lines, so "Page 1 of 3" and
+    "Page 2 of 3" count as the same footer. The first page keeps its copy,
+    which is usually where a running header carries the candidate's name.
+    """
+    pages = text.split(PAGE_BREAK)
+    if len(pages) < 2:
+        return text
+    threshold = max(2, math.ceil(len(pages) * min_share))
+    page_counts: Dict[str, int] = {}
+    for page in pages:
+        for key in {_DIGITS.sub("#", line) for line in page.split("\n") if 0 < len(line) <= 80}:
+            page_counts[key] = page_counts.get(key, 0) + 1
+    repeated = {key for key, count in page_counts.items() if count >= threshold}
+    if not repeated:
+        return text
+    return PAGE_BREAK.join(pages[:1] + [
+        "\n".join(line for line in page.split("\n") if _DIGITS.sub("#", line) not in repeated)
+        for page in pages[1:]
+    ])
+
+def _heading_section(line: str) -> str:
+    if not line or len(line) > 40:
+        return ""
+    return _HEADINGS.get(_HEADING_DECORATION.sub("", line).lower(), "")
+
+def split_sections(text: str) -> List[Section]:
+    """Split resume text at recognised section headings.
+
+    Text before the first heading is the ``header`` section (name, contact).
+    """
+    sections = [Section("header")]
+    for line in text.replace(PAGE_BREAK, "\n").split("\n"):
+        name = _heading_section(line)
+        if name:
+            sections.append(Section(name, [line]))
+        else:
+            sections[-1].lines.append(line)
+    return [section for section in sections if section.text.strip()]
+
+def _truncate(section: Section, budget: int) -> Section:
+    kept = Section(section.name)
+    used = 0
+    for line in section.lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            # Keep the start of an overlong line rather than nothing
+            room = budget - used - 1
+            if room >= 8:
+                kept.lines.append(line[:room * len(line) // cost])
+            break
+        kept.lines.append(line)
+        used += cost
+    return kept
+
+def fit_to_budget(sections: List[Section], budget: int) -> List[Section]:
+    """Keep sections by priority, truncating those that do not fit.
+
+    A section that has to be truncated leaves room for the essential
+    sections after it, so one long work history cannot push out skills or
+    education.
+    """
+    costs = [estimate_tokens(section.text) + 1 for section in sections]
+    if sum(costs) <= budget:
+        return sections
+    order = sorted(
+        range(len(sections)),
+        key=lambda i: (SECTION_PRIORITY.index(sections[i].name), i)
+    )
+    kept: Dict[int, Section] = {}
+    remaining = budget
+    for position, i in enumerate(order):
+        if remaining <= 0:
+            break
+        if costs[i] <= remaining:
+            kept[i] = sections[i]
+            remaining -= costs[i]
+            continue
+        reserve = sum(
+            costs[j] for j in order[position + 1:] if sections[j].name in ESSENTIAL_SECTIONS
+        )
+        truncated = _truncate(sections[i], max(remaining - reserve, remaining // 2))
+        if truncated.lines:
+            kept[i] = truncated
+            remaining -= estimate_tokens(truncated.text) + 1
+    return [kept[i] for i in sorted(kept)]
+
+def compact_resume_text(text: str, budget: int = RESUME_TOKEN_BUDGET) -> CompactionResult:
+    """Normalise resume text and fit it to ``budget`` tokens."""
+    original_tokens = estimate_tokens(text)
+    sections = split_sections(drop_repeated_page_lines(normalise_whitespace(text)))
+    kept = fit_to_budget(sections, budget)
+    compacted = re.sub(r"\n{3,}", "\n\n", "\n".join(section.text for section in kept)).strip()
+    kept_names = [section.name for section in kept]
+    return CompactionResult(
+        text=compacted,
+        original_tokens=original_tokens,
+        compacted_tokens=estimate_tokens(compacted),
+        sections=kept_names,
+        dropped_sections=[section.name for section in sections if section.name not in kept_names]
+    )
@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
@@ -6,20 +8,124 @@ from . import models
 
 load_dotenv()
 
-# For development, we'll use SQLite
-SQLALCHEMY_DATABASE_URL = "sqlite:///./resume_parser.db"
+# SQLite for development; set DATABASE_URL=postgresql://... for deployments
+# that run several API workers against one store
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./resume_parser.db")
+if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
+    # Hosting platforms hand out the scheme SQLAlchemy no longer accepts
+    SQLALCHEMY_DATABASE_URL = "postgresql://" + SQLALCHEMY_DATABASE_URL[len("postgres://"):]
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Per-connection SQLite tuning.
+
+    WAL lets readers proceed while a writer commits, and with
+    synchronous=NORMAL a commit no longer waits for an fsync (a power loss can
+    drop the last transactions but cannot corrupt the file). busy_timeout
+    makes a second writer wait for the lock instead of failing with
+    "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, **kwargs) -> Engine:
+    """Engine for ``url`` with the settings for its backend.
+
+    Extra keyword arguments go to ``create_engine`` and take precedence, e.g.
+    ``poolclass=NullPool`` for one-off scripts such as migrations.
+    """
+    if url.startswith("sqlite"):
+        options = {"connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+        options.update(kwargs)
+        engine = create_engine(url, **options)
+        if not _is_memory_sqlite(url):
+            event.listen(engine, "connect", _apply_sqlite_pragmas)
+        return engine
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        # Replace connections the server closed while they sat in the pool
+        "pool_pre_ping": True,
+    }
+    options.update(kwargs)
+    if "poolclass" in kwargs:
+        # Non-queue pools reject the sizing options
+        for key in ("pool_size", "max_overflow", "pool_timeout"):
+            options.pop(key, None)
+    return create_engine(url, **options)
+
+def async_url(url: str) -> str:
+    """The asyncio driver URL for a database URL (aiosqlite, asyncpg)."""
+    scheme, rest = url.split(":", 1)
+    backend = scheme.split("+", 1)[0]
+    if backend == "sqlite":
+        return "sqlite+aiosqlite:" + rest
+    if backend == "postgresql":
+        return "postgresql+asyncpg:" + rest
+    return url
+
+def create_async_db_engine(url: str = SQLALCHEMY_DATABASE_URL, **kwargs) -> AsyncEngine:
+    """Async engine on the same database as :func:`create_db_engine`."""
+    url = async_url(url)
+    if url.startswith("sqlite"):
+        # aiosqlite runs each connection in its own thread already
+        options = {"connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+        options.update(kwargs)
+        engine = create_async_engine(url, **options)
+        if not _is_memory_sqlite(url):
+            event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+        return engine
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+    options.update(kwargs)
+    return create_async_engine(url, **options)
+
+engine = create_db_engine()
+async_engine = create_async_db_engine()
 
 # Database initialization moved to FastAPI startup event
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# expire_on_commit=False: attributes of committed objects stay readable
+# without another query, which an AsyncSession cannot issue implicitly
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """Session dependency for ``async def`` endpoints.
+
+    Queries are awaited, so a slow one does not hold up other requests on
+    the event loop the way a blocking ``get_db`` session does.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,379 @@
+"""Candidate deduplication and merging.
+
+Every candidate carries a normalised email and phone key (lower-cased email
+without a ``+tag``, Gmail dots removed; the last digits of the phone
+number), kept current by a session event. Creating a candidate whose email
+or phone key already exists is refused, which a single index lookup decides.
+
+Duplicates that slipped in earlier, or that differ in both, are surfaced by
+a batch job::
+
+    python -m app.dedup
+
+It fills missing keys, then pairs candidates that share a key, and
+candidates whose resume text is nearly the same. Comparing every resume
+with every other is quadratic, so the job computes a MinHash signature of
+each candidate's word-trigram set and only compares candidates that collide
+in one of the DEDUP_BANDS bands of DEDUP_ROWS hash values (locality
+sensitive hashing). A pair is kept when the estimated Jaccard similarity of
+the texts is at least DEDUP_SAME_TEXT_THRESHOLD, or at least
+DEDUP_TEXT_THRESHOLD with names of at least DEDUP_NAME_THRESHOLD
+similarity. The pairs replace the contents of ``candidate_duplicates``;
+``merge_candidates`` then moves a duplicate's resumes and interviews to the
+candidate that is kept and deletes it.
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+import unicodedata
+import zlib
+from array import array
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, delete, event, insert, inspect, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import database, models
+from .extraction import decompress_text
+
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "20"))
+DEDUP_ROWS = int(os.getenv("DEDUP_ROWS", "3"))
+DEDUP_TEXT_THRESHOLD = float(os.getenv("DEDUP_TEXT_THRESHOLD", "0.5"))
+DEDUP_SAME_TEXT_THRESHOLD = float(os.getenv("DEDUP_SAME_TEXT_THRESHOLD", "0.8"))
+DEDUP_NAME_THRESHOLD = float(os.getenv("DEDUP_NAME_THRESHOLD", "0.4"))
+# LSH buckets with more candidates than this are shared boilerplate, not
+# duplicates, and are skipped
+DEDUP_MAX_BUCKET = int(os.getenv("DEDUP_MAX_BUCKET", "50"))
+# Only the start of long resumes is shingled
+DEDUP_MAX_TOKENS = int(os.getenv("DEDUP_MAX_TOKENS", "3000"))
+
+# Phone numbers are compared on their last digits, so "+86 138 0000 0000"
+# and "13800000000" match
+PHONE_KEY_DIGITS = 10
+
+REASON_EMAIL = "email"
+REASON_PHONE = "phone"
+REASON_TEXT = "text"
+
+_GMAIL_DOMAINS = {"gmail.com", "googlemail.com"}
+_NON_DIGITS = re.compile(r"\D")
+# ASCII words, and CJK characters one by one
+_TOKENS = re.compile(r"[a-z0-9]+|[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]")
+
+_PRIME_MULTIPLIERS = np.array([0x9E3779B1, 0x85EBCA77], dtype=np.uint64)
+_random = np.random.default_rng(20261018)
+# Multiply-shift hash functions, one per signature value
+_HASH_A = _random.integers(1, 2 ** 63, size=DEDUP_BANDS * DEDUP_ROWS, dtype=np.uint64) | np.uint64(1)
+_HASH_B = _random.integers(0, 2 ** 63, size=DEDUP_BANDS * DEDUP_ROWS, dtype=np.uint64)
+# Mixes the values of one band into one bucket key
+_BAND_MULTIPLIERS = _random.integers(1, 2 ** 63, size=DEDUP_ROWS, dtype=np.uint64) | np.uint64(1)
+del _random
+
+def normalise_email(email: Optional[str]) -> Optional[str]:
+    """Duplicate-check key of an email address, or None for an unusable one."""
+    local, _, domain = (email or "").strip().lower().rpartition("@")
+    local = local.split("+", 1)[0]
+    if not local or not domain:
+        return None
+    if domain in _GMAIL_DOMAINS:
+        local, domain = local.replace(".", ""), "gmail.com"
+    return f"{local}@{domain}"
+
+def normalise_phone(phone: Optional[str]) -> Optional[str]:
+    """Duplicate-check key of a phone number, or None for a short or placeholder one."""
+    digits = _NON_DIGITS.sub("", phone or "")
+    if len(digits) < 7 or len(set(digits)) == 1:
+        return None
+    return digits[-PHONE_KEY_DIGITS:]
+
+def find_existing(db: Session, email: Optional[str], phone: Optional[str]) -> Optional[models.Candidate]:
+    """The oldest candidate with the same email or phone key, if any."""
+    conditions = []
+    email_key, phone_key = normalise_email(email), normalise_phone(phone)
+    if email_key:
+        conditions.append(models.Candidate.email_key == email_key)
+    if phone_key:
+        conditions.append(models.Candidate.phone_key == phone_key)
+    if not conditions:
+        return None
+    # A key is shared by few candidates, as inserts check it
+    matches = db.query(models.Candidate).filter(or_(*conditions)).all()
+    return min(matches, key=lambda candidate: (candidate.created_at, candidate.id), default=None)
+
+def merge_candidates(db: Session, target: models.Candidate, duplicates: Sequence[models.Candidate]) -> models.Candidate:
+    """Move the resumes and interviews of ``duplicates`` to ``target`` and delete them.
+
+    ``target`` takes a duplicate's phone number if it has none. The caller
+    commits.
+    """
+    for duplicate in duplicates:
+        for resume in list(duplicate.resumes):
+            resume.candidate = target
+        for interview in list(duplicate.interviews):
+            interview.candidate = target
+        if not target.phone and duplicate.phone:
+            target.phone = duplicate.phone
+    # Re-index the moved resumes while both candidates still exist
+    db.flush()
+    duplicate_ids = [duplicate.id for duplicate in duplicates]
+    table = models.CandidateDuplicate.__table__
+    db.execute(delete(table).where(or_(
+        table.c.candidate_id.in_(duplicate_ids), table.c.duplicate_id.in_(duplicate_ids)
+    )))
+    for duplicate in duplicates:
+        db.delete(duplicate)
+    db.flush()
+    return target
+
+@event.listens_for(Session, "before_flush")
+def _set_candidate_keys(session, flush_context, instances):
+    for instance in list(session.new) + list(session.dirty):
+        if not isinstance(instance, models.Candidate):
+            continue
+        attrs = inspect(instance).attrs
+        if instance in session.new or attrs.email.history.has_changes():
+            instance.email_key = normalise_email(instance.email)
+        if instance in session.new or attrs.phone.history.has_changes():
+            instance.phone_key = normalise_phone(instance.phone)
+
+# Batch job
+
+def _normalise_text(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).lower()
+
+def text_shingles(text: str) -> np.ndarray:
+    """Sorted unique 64-bit hashes of the word trigrams of ``text``."""
+    tokens = _TOKENS.findall(_normalise_text(text))[:DEDUP_MAX_TOKENS]
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    hashes = np.fromiter((zlib.crc32(token.encode()) for token in tokens), dtype=np.uint64, count=len(tokens))
+    if len(hashes) >= 3:
+        hashes = hashes[:-2] * _PRIME_MULTIPLIERS[0] + hashes[1:-1] * _PRIME_MULTIPLIERS[1] + hashes[2:]
+    return np.unique(hashes ^ (hashes >> np.uint64(32)))
+
+def minhash(shingles: np.ndarray) -> np.ndarray:
+    """MinHash signature of a shingle set, DEDUP_BANDS * DEDUP_ROWS uint32 values."""
+    values = (_HASH_A[:, None] * shingles[None, :] + _HASH_B[:, None]) >> np.uint64(32)
+    return values.min(axis=1).astype(np.uint32)
+
+def name_similarity(first: str, second: str) -> float:
+    """Jaccard similarity of the character trigrams of two names, word order ignored."""
+    def grams(name: str) -> Set[str]:
+        key = "".join(sorted(_TOKENS.findall(_normalise_text(name))))
+        return {key[i:i + 3] for i in range(max(len(key) - 2, 1))} if key else set()
+    first_grams, second_grams = grams(first), grams(second)
+    if not first_grams or not second_grams:
+        return 0.0
+    return len(first_grams & second_grams) / len(first_grams | second_grams)
+
+@dataclass
+class Pair:
+    candidate_id: str
+    duplicate_id: str
+    score: float
+    reason: str
+
+class DuplicateFinder:
+    """Collects candidates batch by batch, then pairs up the likely duplicates.
+
+    Per candidate it keeps the id, name, creation time, 64-bit hashes of the
+    email and phone keys and the MinHash signature, in compact arrays, so a
+    million candidates fit in a few hundred megabytes. Candidates must be
+    added in id order.
+    """
+
+    _BLOCK = 4096
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self._created = array("q")  # microseconds since datetime.min
+        self._key_hashes = {REASON_EMAIL: array("Q"), REASON_PHONE: array("Q")}  # 0 for no key
+        self._blocks: List[np.ndarray] = []
+        self._pending: List[np.ndarray] = []
+        self._signed = array("q")  # candidate index of each signature
+
+    def add(self, candidate_id: str, name: str, created_at: Optional[datetime],
+            email_key: Optional[str], phone_key: Optional[str], text: str) -> None:
+        index = len(self.ids)
+        self.ids.append(candidate_id)
+        self.names.append(name or "")
+        self._created.append(((created_at or datetime.min) - datetime.min) // timedelta(microseconds=1))
+        self._key_hashes[REASON_EMAIL].append(_key_hash(email_key))
+        self._key_hashes[REASON_PHONE].append(_key_hash(phone_key))
+        shingles = text_shingles(text) if text else None
+        if shingles is not None and len(shingles):
+            self._pending.append(minhash(shingles))
+            self._signed.append(index)
+            if len(self._pending) == self._BLOCK:
+                self._blocks.append(np.vstack(self._pending))
+                self._pending = []
+
+    def pairs(self) -> List[Pair]:
+        # Oldest first; ties in creation time keep id order
+        rank = np.empty(len(self.ids), dtype=np.int64)
+        rank[np.argsort(np.frombuffer(self._created, dtype=np.int64), kind="stable")] = np.arange(len(self.ids))
+        found: Dict[Tuple[int, int], Pair] = {}
+        for reason, hashes in self._key_hashes.items():
+            shared = _shared_key_pairs(np.frombuffer(hashes, dtype=np.uint64), rank)
+            for older, newer in zip(*(part.tolist() for part in shared)):
+                found.setdefault((older, newer), self._pair(older, newer, 1.0, reason))
+        if self._pending:
+            self._blocks.append(np.vstack(self._pending))
+            self._pending = []
+        if self._blocks:
+            signatures = np.vstack(self._blocks)
+            self._blocks = [signatures]
+            signed = np.frombuffer(self._signed, dtype=np.int64)
+            first, second = _colliding(signatures)
+            for start in range(0, len(first), self._BLOCK * 32):
+                rows = first[start:start + self._BLOCK * 32], second[start:start + self._BLOCK * 32]
+                similarity = (signatures[rows[0]] == signatures[rows[1]]).mean(axis=1)
+                close = similarity >= DEDUP_TEXT_THRESHOLD
+                candidates = signed[rows[0][close]].tolist(), signed[rows[1][close]].tolist()
+                for a, b, score in zip(*candidates, similarity[close].tolist()):
+                    if score < DEDUP_SAME_TEXT_THRESHOLD and \
+                            name_similarity(self.names[a], self.names[b]) < DEDUP_NAME_THRESHOLD:
+                        continue
+                    older, newer = (a, b) if rank[a] < rank[b] else (b, a)
+                    found.setdefault((older, newer), self._pair(older, newer, round(score, 3), REASON_TEXT))
+        return sorted(found.values(), key=lambda pair: (-pair.score, pair.candidate_id, pair.duplicate_id))
+
+    def _pair(self, older: int, newer: int, score: float, reason: str) -> Pair:
+        return Pair(self.ids[older], self.ids[newer], score, reason)
+
+def _key_hash(key: Optional[str]) -> int:
+    if not key:
+        return 0
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+def _shared_key_pairs(hashes: np.ndarray, rank: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(oldest, other) candidate index pairs for every key held by more than one candidate."""
+    indexes = np.flatnonzero(hashes)
+    if len(indexes) < 2:
+        return indexes[:0], indexes[:0]
+    indexes = indexes[np.lexsort((rank[indexes], hashes[indexes]))]
+    keys = hashes[indexes]
+    starts = np.r_[True, keys[1:] != keys[:-1]]
+    oldest = indexes[np.maximum.accumulate(np.where(starts, np.arange(len(indexes)), 0))]
+    return oldest[~starts], indexes[~starts]
+
+def _colliding(signatures: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Row index pairs, first < second, of the signatures sharing a bucket in any band."""
+    count = len(signatures)
+    codes, skipped = [], 0
+    for band in range(DEDUP_BANDS):
+        values = signatures[:, band * DEDUP_ROWS:(band + 1) * DEDUP_ROWS].astype(np.uint64)
+        buckets = (values * _BAND_MULTIPLIERS).sum(axis=1)
+        order = np.argsort(buckets, kind="stable")
+        sorted_buckets = buckets[order]
+        group = np.cumsum(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]]) - 1
+        sizes = np.bincount(group)
+        skipped += int(np.count_nonzero(sizes > DEDUP_MAX_BUCKET))
+        size = sizes[group]
+        keep = (size > 1) & (size <= DEDUP_MAX_BUCKET)
+        members, group = order[keep], group[keep]
+        # Members of a bucket are adjacent: pair each with the ones 1, 2, ... places on
+        for offset in range(1, DEDUP_MAX_BUCKET):
+            same = group[offset:] == group[:-offset]
+            if not same.any():
+                break
+            first, second = members[:-offset][same], members[offset:][same]
+            codes.append(np.minimum(first, second) * count + np.maximum(first, second))
+    if skipped:
+        print(f"Skipped {skipped} LSH buckets with more than {DEDUP_MAX_BUCKET} candidates")
+    if not codes:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    codes = np.unique(np.concatenate(codes))
+    return codes // count, codes % count
+
+def _candidate_texts(connection, candidate_ids: List[str]) -> Dict[str, str]:
+    texts: Dict[str, List[str]] = defaultdict(list)
+    rows = connection.execute(
+        select(models.Resume.candidate_id, models.Resume.extracted_text).where(
+            models.Resume.candidate_id.in_(candidate_ids),
+            models.Resume.extracted_text.isnot(None)
+        )
+    )
+    for candidate_id, data in rows:
+        texts[candidate_id].append(decompress_text(data))
+    return {candidate_id: "\n".join(parts) for candidate_id, parts in texts.items()}
+
+def scan(batch_size: int = 1000) -> DuplicateFinder:
+    """Read every candidate into a DuplicateFinder, filling missing or stale keys."""
+    finder = DuplicateFinder()
+    candidates = models.Candidate.__table__
+    last_id = ""
+    while True:
+        with database.engine.begin() as connection:
+            rows = connection.execute(
+                select(
+                    candidates.c.id, candidates.c.name, candidates.c.email, candidates.c.phone,
+                    candidates.c.created_at, candidates.c.email_key, candidates.c.phone_key
+                ).where(candidates.c.id > last_id).order_by(candidates.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return finder
+            texts = _candidate_texts(connection, [row.id for row in rows])
+            stale = []
+            for row in rows:
+                email_key, phone_key = normalise_email(row.email), normalise_phone(row.phone)
+                if (email_key, phone_key) != (row.email_key, row.phone_key):
+                    stale.append({"candidate": row.id, "email_key": email_key, "phone_key": phone_key})
+                finder.add(row.id, row.name, row.created_at, email_key, phone_key, texts.get(row.id, ""))
+            if stale:
+                connection.execute(
+                    update(candidates).where(candidates.c.id == bindparam("candidate")).values(
+                        email_key=bindparam("email_key"), phone_key=bindparam("phone_key")
+                    ),
+                    stale
+                )
+        last_id = rows[-1].id
+        print(f"Scanned {len(finder.ids)} candidates")
+
+def store(pairs: Iterable[Pair], batch_size: int = 5000) -> int:
+    """Replace the contents of ``candidate_duplicates`` with ``pairs``."""
+    table = models.CandidateDuplicate.__table__
+    detected_at = datetime.utcnow()
+    rows = [
+        {"candidate_id": pair.candidate_id, "duplicate_id": pair.duplicate_id,
+         "score": pair.score, "reason": pair.reason, "detected_at": detected_at}
+        for pair in pairs
+    ]
+    with database.engine.begin() as connection:
+        connection.execute(delete(table))
+        for start in range(0, len(rows), batch_size):
+            connection.execute(insert(table), rows[start:start + batch_size])
+    return len(rows)
+
+def run(batch_size: int = 1000, dry_run: bool = False) -> List[Pair]:
+    began = time.perf_counter()
+    finder = scan(batch_size)
+    scanned = time.perf_counter()
+    pairs = finder.pairs()
+    print(f"Scanned {len(finder.ids)} candidates in {scanned - began:.1f}s, "
+          f"found {len(pairs)} likely duplicates in {time.perf_counter() - scanned:.1f}s")
+    if not dry_run:
+        store(pairs)
+    return pairs
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Find likely duplicate candidates")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="print the pairs instead of storing them")
+    args = parser.parse_args(argv)
+    pairs = run(args.batch_size, args.dry_run)
+    if args.dry_run:
+        for pair in pairs:
+            print(f"{pair.score:.3f} {pair.reason:<5} {pair.candidate_id} {pair.duplicate_id}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Resume text extraction.
+
+PDF and DOCX extraction is CPU-bound, so the API runs it in a process pool
+instead of on the event loop. This module deliberately has no OpenAI or
+database imports, since every pool worker process imports it.
+"""
+import asyncio
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+import docx
+from PyPDF2 import PdfReader
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "60"))
+EXTRACTION_MAX_PAGES = int(os.getenv("EXTRACTION_MAX_PAGES", "30"))
+
+# Stored with the extracted text; text from another version (or page cap) is
+# extracted again instead of reused. Bump when extraction output changes.
+EXTRACTOR_VERSION = f"1-p{EXTRACTION_MAX_PAGES}"
+
+WORD_TYPES = [
+    "application/msword",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+]
+
+def extract_text_from_docx(file_path: str) -> str:
+    """Extract text content from a DOCX file."""
+    try:
+        doc = docx.Document(file_path)
+        return "\n".join([paragraph.text for paragraph in doc.paragraphs])
+    except Exception as e:
+        print(f"Error extracting text from DOCX: {str(e)}")
+        raise ValueError(f"Failed to extract text from DOCX: {str(e)}")
+
+def extract_text_from_pdf(file_path: str, max_pages: Optional[int] = EXTRACTION_MAX_PAGES) -> str:
+    """Extract text content from the first ``max_pages`` pages of a PDF file."""
+    try:
+        reader = PdfReader(file_path)
+        pages = reader.pages if max_pages is None else reader.pages[:max_pages]
+        # Pages are separated by form feeds so page headers and footers can
+        # be recognised later
+        return "\f".join(page.extract_text() or "" for page in pages).strip()
+    except Exception as e:
+        print(f"Error extracting text from PDF: {str(e)}")
+        raise ValueError(f"Failed to extract text from PDF: {str(e)}")
+
+def extract_text(file_path: str, file_type: str, max_pages: Optional[int] = EXTRACTION_MAX_PAGES) -> str:
+    """Extract plain text from a resume file based on its MIME type.
+
+    Raises:
+        ValueError: If the file type is unsupported or cannot be read
+    """
+    try:
+        if file_type == "application/pdf":
+            return extract_text_from_pdf(file_path, max_pages)
+        elif file_type in WORD_TYPES:
+            return extract_text_from_docx(file_path)
+        elif file_type == "text/plain":
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        else:
+            raise ValueError(f"Unsupported file type: {file_type}")
+    except Exception as e:
+        raise ValueError(f"Failed to read resume file: {str(e)}")
+
+def compress_text(text: str) -> bytes:
+    """Compress extracted text for storage on the resume row."""
+    return zlib.compress(text.encode("utf-8"), 6)
+
+def decompress_text(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+class ExtractionEngine:
+    """Runs :func:`extract_text` in a process pool with a per-document timeout."""
+
+    def __init__(
+        self,
+        workers: int = EXTRACTION_WORKERS,
+        timeout: float = EXTRACTION_TIMEOUT,
+        max_pages: Optional[int] = EXTRACTION_MAX_PAGES,
+    ):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn rather than fork: the parent runs an event loop and threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def extract(self, file_path: str, file_type: str) -> str:
+        """Extract text without blocking the event loop.
+
+        Raises:
+            ValueError: If extraction fails or exceeds the timeout
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._get_pool(), extract_text, file_path, file_type, self.max_pages
+        )
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            # A worker stuck on a pathological document cannot be cancelled,
+            # only killed, so the pool is replaced.
+            self._reset_pool()
+            raise ValueError(f"Text extraction timed out after {self.timeout:g}s")
+        except BrokenProcessPool as e:
+            self._reset_pool()
+            raise ValueError(f"Text extraction worker crashed: {str(e)}")
+
+    def _reset_pool(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        processes = getattr(pool, "_processes", None) or {}
+        for process in list(processes.values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+extraction_engine = ExtractionEngine()
@@ -0,0 +1,281 @@
+"""Local rule-based resume parser.
+
+Fills ``ParsedResumeContent`` from plain, well-structured resume text with
+the skill taxonomy, date-range patterns and the section headings found by
+:mod:`compaction`. It needs no network and runs in milliseconds; its
+confidence score tells the parser router whether the LLM is still needed.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .compaction import Section, normalise_whitespace, split_sections
+from .schemas import (
+    CertificationEntry, EducationEntry, ExperienceEntry, ParsedResumeContent, Skills
+)
+from .taxonomy import get_taxonomy
+
+# Canonical name -> aliases (matched case-insensitively). Technical skills
+# come from the shared taxonomy instead.
+SOFT_SKILLS: Dict[str, List[str]] = {
+    "Communication": ["communication", "沟通"],
+    "Leadership": ["leadership", "team lead", "领导力"],
+    "Teamwork": ["teamwork", "collaboration", "团队合作"],
+    "Problem Solving": ["problem solving", "problem-solving", "解决问题"],
+    "Mentoring": ["mentoring", "coaching"],
+    "Project Management": ["project management", "项目管理"],
+}
+
+LANGUAGES: Dict[str, List[str]] = {
+    "English": ["english", "英语"],
+    "Chinese": ["chinese", "mandarin", "cantonese", "中文", "普通话", "粤语"],
+    "Japanese": ["japanese", "日语"],
+    "Korean": ["korean", "韩语"],
+    "French": ["french", "法语"],
+    "German": ["german", "德语"],
+    "Spanish": ["spanish", "西班牙语"],
+}
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+_DATE = rf"(?:(?:{_MONTH}\s+)?(?:19|20)\d{{2}}(?:\s*[./\-年]\s*\d{{1,2}}月?)?)"
+DATE_RANGE = re.compile(
+    rf"(?P<start>{_DATE})\s*(?:-|–|—|~|to|至|到)\s*"
+    rf"(?P<end>{_DATE}|present|current|now|today|至今|今)",
+    re.IGNORECASE
+)
+YEAR = re.compile(r"(?:19|20)\d{2}")
+DEGREE = re.compile(
+    r"\b(ph\.?d|doctor(?:ate)?|master(?:'s)?|m\.?sc?|mba|bachelor(?:'s)?|b\.?sc?|b\.?a|b\.?eng|"
+    r"associate)\b|博士|硕士|学士|本科|专科",
+    re.IGNORECASE
+)
+INSTITUTION = re.compile(r"university|college|institute|school|academy|大学|学院", re.IGNORECASE)
+BULLET = re.compile(r"^\s*(?:[-•*·▪●]|\d+[.)])\s*")
+FIELD = re.compile(r"\b(?:in|of)\s+([A-Z][A-Za-z &]+?)(?=\s*(?:$|[,|(]|\bin\b|(?:19|20)\d{2}))")
+
+def _compile(dictionary: Dict[str, List[str]]) -> Tuple[re.Pattern, Dict[str, str]]:
+    lookup = {alias.lower(): canonical for canonical, aliases in dictionary.items() for alias in aliases}
+    # Longest aliases first so "spring boot" wins over "spring"
+    alternation = "|".join(re.escape(alias) for alias in sorted(lookup, key=len, reverse=True))
+    pattern = re.compile(rf"(?<![\w+#.])(?:{alternation})(?![\w+#])", re.IGNORECASE)
+    return pattern, lookup
+
+_SOFT = _compile(SOFT_SKILLS)
+_LANGUAGES = _compile(LANGUAGES)
+
+def match_terms(text: str, compiled: Tuple[re.Pattern, Dict[str, str]]) -> List[str]:
+    """Return the canonical names of dictionary terms found in ``text``, in order."""
+    pattern, lookup = compiled
+    found: Dict[str, None] = {}
+    for match in pattern.finditer(text):
+        found.setdefault(lookup[match.group(0).lower()], None)
+    return list(found)
+
+def parse_date(value: str) -> Optional[date]:
+    """Parse "2019", "2019-03", "Mar 2019" or "2019年3月"; None for present."""
+    value = value.strip().lower()
+    if value in ("present", "current", "now", "today", "至今", "今"):
+        return None
+    year = YEAR.search(value)
+    if not year:
+        return None
+    month = 1
+    name = re.match(r"([a-z]{3})", value)
+    if name and name.group(1) in MONTHS:
+        month = MONTHS[name.group(1)]
+    else:
+        number = re.search(r"(?:19|20)\d{2}\s*[./\-年]\s*(\d{1,2})", value)
+        if number and 1 <= int(number.group(1)) <= 12:
+            month = int(number.group(1))
+    return date(int(year.group(0)), month, 1)
+
+def _format_date(value: Optional[date]) -> str:
+    return value.strftime("%Y-%m") if value else "present"
+
+def _years_between(start: date, end: date) -> float:
+    return max(0.0, (end.year - start.year) + (end.month - start.month) / 12)
+
+def _merged_years(ranges: Iterable[Tuple[date, date]]) -> float:
+    """Total years covered by possibly overlapping ranges."""
+    total = 0.0
+    current_start = current_end = None
+    for start, end in sorted(ranges):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += _years_between(current_start, current_end)
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += _years_between(current_start, current_end)
+    return round(total, 1)
+
+def _split_title_company(text: str) -> Tuple[str, str]:
+    text = text.strip(" ,|-–—:")
+    for separator in (" at ", " @ ", " | ", ", ", " - ", " – ", "，"):
+        if separator in text:
+            title, company = text.split(separator, 1)
+            return title.strip(), company.strip(" ,|-–—")
+    return text, ""
+
+def parse_experience(sections: List[Section], today: date) -> Tuple[List[ExperienceEntry], List[Tuple[date, date]]]:
+    entries: List[ExperienceEntry] = []
+    ranges: List[Tuple[date, date]] = []
+    for section in sections:
+        if section.name not in ("experience", "header"):
+            continue
+        current = None
+        previous_line = ""
+        for line in section.lines[1 if section.name == "experience" else 0:]:
+            match = DATE_RANGE.search(line)
+            if match:
+                start = parse_date(match.group("start"))
+                end = parse_date(match.group("end"))
+                if start is None:
+                    continue
+                end_date = end or today
+                ranges.append((start, end_date))
+                heading = (line[:match.start()] + line[match.end():]).strip(" ,|-–—()")
+                title, company = _split_title_company(heading or previous_line)
+                if not company and heading and previous_line:
+                    company = previous_line.strip()
+                current = {
+                    "company": company,
+                    "title": title,
+                    "duration": f"{_years_between(start, end_date):.1f} years",
+                    "start_date": _format_date(start),
+                    "end_date": _format_date(end),
+                    "achievements": [],
+                    "lines": [line],
+                }
+                entries.append(current)
+            elif current is not None and line.strip():
+                if BULLET.match(line):
+                    current["achievements"].append(BULLET.sub("", line).strip())
+                current["lines"].append(line)
+            previous_line = line
+    return [
+        ExperienceEntry(
+            company=entry["company"],
+            title=entry["title"],
+            duration=entry["duration"],
+            start_date=entry["start_date"],
+            end_date=entry["end_date"],
+            achievements=entry["achievements"],
+            technologies=get_taxonomy().match_text("\n".join(entry["lines"])),
+        )
+        for entry in entries
+    ], ranges
+
+def parse_education(sections: List[Section]) -> List[EducationEntry]:
+    entries: List[EducationEntry] = []
+    for section in sections:
+        if section.name != "education":
+            continue
+        # Group lines into blocks separated by blank lines
+        blocks, block = [], []
+        for line in section.lines[1:] + [""]:
+            if line.strip():
+                block.append(line)
+            elif block:
+                blocks.append(block)
+                block = []
+        for block in blocks:
+            text = " ".join(block)
+            degree = DEGREE.search(text)
+            institution = next((line for line in block if INSTITUTION.search(line)), "")
+            if not degree and not institution:
+                continue
+            institution = YEAR.sub("", DATE_RANGE.sub("", institution)).strip(" ,|-–—()")
+            # "Bachelor of Science in Computer Science": the field follows "in"
+            field = ""
+            for line in block:
+                matches = FIELD.findall(line)
+                if matches and DEGREE.search(line):
+                    field = matches[-1].strip()
+                    break
+            years = YEAR.findall(text)
+            entries.append(EducationEntry(
+                institution=institution,
+                degree=degree.group(0) if degree else "",
+                field=field,
+                graduation_date=years[-1] if years else "",
+            ))
+    return entries
+
+def parse_certifications(sections: List[Section]) -> List[CertificationEntry]:
+    entries: List[CertificationEntry] = []
+    for section in sections:
+        if section.name != "certifications":
+            continue
+        for line in section.lines[1:]:
+            name = BULLET.sub("", line).strip()
+            if not name:
+                continue
+            years = YEAR.findall(name)
+            issuer = ""
+            if " - " in name:
+                name, issuer = [part.strip() for part in name.split(" - ", 1)]
+            entries.append(CertificationEntry(
+                name=name, issuer=issuer, date=years[0] if years else ""
+            ))
+    return entries
+
+@dataclass
+class HeuristicResult:
+    content: Optional[ParsedResumeContent]
+    confidence: float  # 0..1, share of the checks below that passed
+
+def parse(text: str, today: Optional[date] = None) -> HeuristicResult:
+    """Parse resume text locally and score how complete the result is."""
+    today = today or date.today().replace(day=1)
+    sections = split_sections(normalise_whitespace(text))
+    names = {section.name for section in sections}
+    full_text = "\n".join(section.text for section in sections)
+    skills_text = "\n".join(section.text for section in sections if section.name == "skills") or full_text
+
+    taxonomy = get_taxonomy()
+    technical = taxonomy.match_text(skills_text)
+    for skill in taxonomy.match_text(full_text):
+        if skill not in technical:
+            technical.append(skill)
+    experience, ranges = parse_experience(sections, today)
+    education = parse_education(sections)
+    total_years = _merged_years(ranges)
+
+    # Each check covers fields the LLM would otherwise have to supply
+    confidence = 0.0
+    if experience and all(entry.title for entry in experience):
+        confidence += 0.35
+    if len(technical) >= 3:
+        confidence += 0.25
+    if education:
+        confidence += 0.2
+    if {"experience", "skills"} <= names:
+        confidence += 0.1
+    if total_years > 0:
+        confidence += 0.1
+
+    if not experience and not technical:
+        return HeuristicResult(None, 0.0)
+    content = ParsedResumeContent(
+        skills=Skills(
+            technical=technical,
+            soft=match_terms(full_text, _SOFT),
+            languages=match_terms(full_text, _LANGUAGES),
+        ),
+        experience=experience,
+        education=education,
+        certifications=parse_certifications(sections),
+        total_years_experience=total_years,
+        career_level="entry",
+        suggested_roles=list(dict.fromkeys(entry.title for entry in experience if entry.title))[:5],
+        suggested_tags=list(technical),
+    )
+    return HeuristicResult(content, round(confidence, 2))
@@ -0,0 +1,318 @@
+"""Background resume parsing queue.
+
+Parse jobs are persisted in the ``parse_jobs`` table, so uploads only have to
+insert a row and return. A fixed number of asyncio workers claim queued jobs,
+run text extraction (in a process pool) plus the LLM call and write the result
+back to the resume. The extracted text is stored compressed on the resume,
+so retries and re-parses skip extraction. A failed job is retried after an
+exponential backoff, so a transient LLM outage or rate limit does not use up
+its attempts at once. Jobs left ``running`` by a crashed or restarted
+process are re-queued on startup.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import or_, update
+
+from . import database, llm, models
+# Register the session events that keep the search indexes, change log and
+# analytics rollups current
+from . import analytics, candidate_search, changes, dedup, search, semantic  # noqa: F401
+from .tags import tag_service
+from .extraction import EXTRACTOR_VERSION, compress_text, decompress_text, extraction_engine
+
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "4"))
+PARSE_MAX_ATTEMPTS = int(os.getenv("PARSE_MAX_ATTEMPTS", "3"))
+PARSE_POLL_INTERVAL = float(os.getenv("PARSE_POLL_INTERVAL", "5"))
+# Delay before the second attempt, doubled for each further one
+PARSE_RETRY_BASE = float(os.getenv("PARSE_RETRY_BASE", "30"))
+PARSE_RETRY_MAX = float(os.getenv("PARSE_RETRY_MAX", "900"))
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+def enqueue(db, resume: models.Resume) -> models.ParseJob:
+    """Add a parse job for ``resume`` to the session.
+
+    The job is committed together with the resume, so a resume is never
+    stored without the work needed to parse it.
+    """
+    job = models.ParseJob(resume=resume, status=JobStatus.QUEUED.value, attempts=0)
+    db.add(job)
+    return job
+
+def record_reused(db, resume: models.Resume, duplicate: models.Resume) -> models.ParseJob:
+    """Copy the parse result of ``duplicate`` and record a finished job for it."""
+    copy_parse_result(duplicate, resume)
+    job = models.ParseJob(
+        resume=resume,
+        status=JobStatus.SUCCEEDED.value,
+        attempts=0,
+        finished_at=datetime.utcnow()
+    )
+    db.add(job)
+    return job
+
+def find_parsed_duplicate(db, resume: models.Resume) -> Optional[models.Resume]:
+    """Return an already parsed resume with the same file content, if any."""
+    if not resume.content_hash:
+        return None
+    query = db.query(models.Resume).filter(
+        models.Resume.content_hash == resume.content_hash,
+        models.Resume.parsed_content.isnot(None)
+    )
+    if resume.id is not None:
+        query = query.filter(models.Resume.id != resume.id)
+    return query.order_by(models.Resume.created_at).first()
+
+def stored_text(resume: models.Resume) -> Optional[str]:
+    """Extracted text stored on ``resume`` by the current extractor, if any."""
+    if resume.extracted_text is None or resume.extractor_version != EXTRACTOR_VERSION:
+        return None
+    return decompress_text(resume.extracted_text)
+
+def store_text(resume: models.Resume, text: str) -> None:
+    resume.extracted_text = compress_text(text)
+    resume.extractor_version = EXTRACTOR_VERSION
+
+def load_text(db, resume: models.Resume) -> Optional[str]:
+    """Stored text of ``resume`` or of an identical file; None if not extracted yet."""
+    text = stored_text(resume)
+    if text is None and resume.content_hash:
+        source = db.query(models.Resume).filter(
+            models.Resume.content_hash == resume.content_hash,
+            models.Resume.extractor_version == EXTRACTOR_VERSION,
+            models.Resume.extracted_text.isnot(None)
+        ).first()
+        if source is not None:
+            text = stored_text(source)
+    return text
+
+def apply_parse_result(
+    db,
+    resume: models.Resume,
+    parsed_data: Dict[str, Any],
+    parser_version: Optional[str],
+    replace_tags: bool = False
+) -> None:
+    """Store a parse result on ``resume`` and attach its suggested tags.
+
+    With ``replace_tags`` the tags of a previous parse are removed first.
+    """
+    resume.parsed_content = parsed_data
+    resume.parser_version = parser_version
+    if replace_tags:
+        tag_service.detach_all(db, resume)
+    tag_service.attach(db, resume, parsed_data.get("suggested_tags", []))
+
+def copy_parse_result(source: models.Resume, target: models.Resume) -> None:
+    """Reuse the parse output of an identical upload instead of parsing again."""
+    target.parsed_content = source.parsed_content
+    target.parser_version = source.parser_version
+    if source.extracted_text is not None and target.extracted_text is None:
+        target.extracted_text = source.extracted_text
+        target.extractor_version = source.extractor_version
+    for tag in source.tags:
+        if tag not in target.tags:
+            target.tags.append(tag)
+
+class ParseQueue:
+    def __init__(
+        self,
+        workers: int = PARSE_WORKERS,
+        max_attempts: int = PARSE_MAX_ATTEMPTS,
+        poll_interval: float = PARSE_POLL_INTERVAL,
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        """Re-queue interrupted jobs and start the worker tasks."""
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        requeued = await asyncio.to_thread(self._requeue_interrupted)
+        if requeued:
+            print(f"Re-queued {requeued} interrupted parse jobs")
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"parse-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks. Running jobs are re-queued on next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self, delay: float = 0) -> None:
+        """Wake idle workers after new jobs were committed, or ``delay`` seconds later."""
+        if self._loop is None or self._wakeup is None:
+            return
+        if delay > 0:
+            self._loop.call_soon_threadsafe(self._loop.call_later, delay, self._wakeup.set)
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def retry_delay(self, attempts: int) -> float:
+        """Seconds to wait before retrying a job that failed ``attempts`` times."""
+        return min(PARSE_RETRY_MAX, PARSE_RETRY_BASE * 2 ** max(attempts - 1, 0))
+
+    async def _worker(self) -> None:
+        while True:
+            # Clear before claiming so a notify() racing with an empty claim
+            # is not lost.
+            self._wakeup.clear()
+            try:
+                job_id = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                print(f"解析任务领取失败: {str(e)}")
+                job_id = None
+            if job_id is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job_id)
+
+    def _requeue_interrupted(self) -> int:
+        with database.SessionLocal() as db:
+            result = db.execute(
+                update(models.ParseJob)
+                .where(models.ParseJob.status == JobStatus.RUNNING.value)
+                .values(status=JobStatus.QUEUED.value, started_at=None)
+            )
+            db.commit()
+            return result.rowcount
+
+    def _claim(self) -> Optional[str]:
+        """Atomically move the oldest queued job that is due to ``running``."""
+        with database.SessionLocal() as db:
+            while True:
+                now = datetime.utcnow()
+                job_id = db.query(models.ParseJob.id).filter(
+                    models.ParseJob.status == JobStatus.QUEUED.value,
+                    or_(models.ParseJob.not_before.is_(None), models.ParseJob.not_before <= now)
+                ).order_by(models.ParseJob.created_at).limit(1).scalar()
+                if job_id is None:
+                    return None
+                # The status guard makes the claim safe across workers and
+                # processes: only one UPDATE can win.
+                result = db.execute(
+                    update(models.ParseJob)
+                    .where(
+                        models.ParseJob.id == job_id,
+                        models.ParseJob.status == JobStatus.QUEUED.value,
+                    )
+                    .values(
+                        status=JobStatus.RUNNING.value,
+                        attempts=models.ParseJob.attempts + 1,
+                        started_at=now,
+                        not_before=None,
+                    )
+                )
+                db.commit()
+                if result.rowcount == 1:
+                    return job_id
+
+    async def _run(self, job_id: str) -> None:
+        try:
+            if await asyncio.to_thread(self._reuse_duplicate, job_id):
+                return
+            file_path, file_type, text = await asyncio.to_thread(self._load_source, job_id)
+            if text is None:
+                text = await extraction_engine.extract(file_path, file_type)
+                # Saved before the LLM call so a failed parse is retried
+                # without extracting again
+                await asyncio.to_thread(self._store_text, job_id, text)
+            outcome = await llm.parse_text(text)
+            if "error" in outcome.data:
+                raise ValueError(outcome.data["error"])
+            await asyncio.to_thread(self._store_result, job_id, outcome)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"简历解析错误: {str(e)}")
+            try:
+                await asyncio.to_thread(self._record_failure, job_id, str(e))
+            except Exception as record_error:
+                print(f"解析任务状态更新失败: {str(record_error)}")
+
+    def _reuse_duplicate(self, job_id: str) -> bool:
+        # An identical file may have finished parsing after this job was
+        # queued, e.g. during a bulk re-upload.
+        with database.SessionLocal() as db:
+            job = db.get(models.ParseJob, job_id)
+            duplicate = find_parsed_duplicate(db, job.resume)
+            if duplicate is None:
+                return False
+            copy_parse_result(duplicate, job.resume)
+            job.status = JobStatus.SUCCEEDED.value
+            job.error = None
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            return True
+
+    def _load_source(self, job_id: str):
+        """Return the resume file and its stored text, None if not extracted yet."""
+        with database.SessionLocal() as db:
+            resume = db.get(models.ParseJob, job_id).resume
+            return resume.file_path, resume.file_type, load_text(db, resume)
+
+    def _store_text(self, job_id: str, text: str) -> None:
+        with database.SessionLocal() as db:
+            store_text(db.get(models.ParseJob, job_id).resume, text)
+            db.commit()
+
+    def _store_result(self, job_id: str, outcome: llm.ParseOutcome) -> None:
+        with database.SessionLocal() as db:
+            job = db.get(models.ParseJob, job_id)
+            resume = job.resume
+            apply_parse_result(db, resume, outcome.data, outcome.parser_version)
+            job.status = JobStatus.SUCCEEDED.value
+            job.error = None
+            job.finished_at = datetime.utcnow()
+            # Identical uploads still waiting in the queue reuse this result
+            if resume.content_hash:
+                pending_jobs = db.query(models.ParseJob).join(models.Resume).filter(
+                    models.Resume.content_hash == resume.content_hash,
+                    models.ParseJob.status == JobStatus.QUEUED.value
+                ).all()
+                for pending_job in pending_jobs:
+                    copy_parse_result(resume, pending_job.resume)
+                    pending_job.status = JobStatus.SUCCEEDED.value
+                    pending_job.finished_at = job.finished_at
+            db.commit()
+
+    def _record_failure(self, job_id: str, error: str) -> None:
+        with database.SessionLocal() as db:
+            job = db.get(models.ParseJob, job_id)
+            job.error = error
+            retry = job.attempts < self.max_attempts
+            if retry:
+                delay = self.retry_delay(job.attempts)
+                job.status = JobStatus.QUEUED.value
+                job.started_at = None
+                job.not_before = datetime.utcnow() + timedelta(seconds=delay)
+            else:
+                job.status = JobStatus.FAILED.value
+                job.finished_at = datetime.utcnow()
+                tag_service.attach(db, job.resume, ["needs_review"])
+            db.commit()
+        if retry:
+            self.notify(delay)
+
+parse_queue = ParseQueue()
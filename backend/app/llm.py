@@ -1,275 +1,221 @@
-from openai import OpenAI
 import json
-from typing import List, Dict, Any
-import docx
-from PyPDF2 import PdfReader
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
 import os
 from dotenv import load_dotenv
+from . import heuristic_parser
 from .schemas import ParsedResumeContent
+from .llm_gateway import llm_gateway, estimate_tokens
+from .compaction import compact_resume_text
+from .taxonomy import get_taxonomy
 
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# The response structure, written without indentation to save prompt tokens
+RESUME_SCHEMA = (
+    '{"skills":{"technical":["skill1","skill2",...],"soft":["skill1","skill2",...],'
+    '"languages":["language1","language2",...]},'
+    '"experience":[{"company":"company name","title":"job title","duration":"duration in years",'
+    '"start_date":"YYYY-MM","end_date":"YYYY-MM or present","achievements":["achievement1",...],'
+    '"technologies":["tech1",...]}],'
+    '"education":[{"institution":"school name","degree":"degree type","field":"field of study",'
+    '"graduation_date":"YYYY-MM","gpa":"optional GPA"}],'
+    '"certifications":[{"name":"certification name","issuer":"issuing organization",'
+    '"date":"YYYY-MM","expires":"YYYY-MM or never"}],'
+    '"total_years_experience":"number","career_level":"entry|mid|senior|executive",'
+    '"suggested_roles":["role1",...],"suggested_tags":["tag1",...]}'
+)
 
-def extract_text_from_docx(file_path: str) -> str:
-    """Extract text content from a DOCX file."""
-    try:
-        doc = docx.Document(file_path)
-        return "\n".join([paragraph.text for paragraph in doc.paragraphs])
-    except Exception as e:
-        print(f"Error extracting text from DOCX: {str(e)}")
-        raise ValueError(f"Failed to extract text from DOCX: {str(e)}")
+# Expected size of the JSON answer, charged against the tokens-per-minute budget
+MAX_COMPLETION_TOKENS = 1500
 
-def extract_text_from_pdf(file_path: str) -> str:
-    """Extract text content from a PDF file."""
-    try:
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
-    except Exception as e:
-        print(f"Error extracting text from PDF: {str(e)}")
-        raise ValueError(f"Failed to extract text from PDF: {str(e)}")
+# Bump when the prompt, schema or post-processing changes; stored on each
+# resume as "<backend>:<version>" so outdated parses can be re-run
+PARSER_VERSION = "1"
 
-def parse_resume(file_path: str, file_type: str) -> Dict[str, Any]:
-    """
-    Parse a resume file and extract structured information using OpenAI's GPT model.
-    
-    Args:
-        file_path: Path to the resume file
-        file_type: MIME type of the file
-        
-    Returns:
-        Dict containing parsed resume information or error details
-    
-    Raises:
-        ValueError: If file type is unsupported or content is empty
-        Exception: For other parsing or processing errors
-    """
-    text = ""
-    parsed_content = None
-    
-    try:
-        # Extract text based on file type
-        try:
-            if file_type == "application/pdf":
-                text = extract_text_from_pdf(file_path)
-            elif file_type in ["application/msword", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]:
-                text = extract_text_from_docx(file_path)
-            elif file_type == "text/plain":
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    text = f.read()
-            else:
-                raise ValueError(f"Unsupported file type: {file_type}")
-        except Exception as e:
-            raise ValueError(f"Failed to read resume file: {str(e)}")
+# "auto" tries the local parser first and calls the LLM only when its result
+# is incomplete; "local" and "llm" force one backend
+RESUME_PARSER_MODE = os.getenv("RESUME_PARSER_MODE", "auto")
+LOCAL_PARSER_MIN_CONFIDENCE = float(os.getenv("LOCAL_PARSER_MIN_CONFIDENCE", "0.8"))
+
+@dataclass
+class ParseOutcome:
+    data: Dict[str, Any]  # parsed content, or error details
+    parser_version: Optional[str] = None  # None when parsing failed
+
+@dataclass
+class ParserResult:
+    content: ParsedResumeContent
+    confidence: float
+    backend: str
+
+class ResumeParserBackend(ABC):
+    """Turns resume text into ``ParsedResumeContent``."""
+
+    name = "base"
+
+    @abstractmethod
+    async def parse(self, text: str) -> Optional[ParserResult]:
+        """Parse ``text``; None if this backend could not extract anything.
+
+        Raises:
+            ValueError: If the backend produced an unusable response
+        """
+
+class HeuristicParserBackend(ResumeParserBackend):
+    name = "local"
+
+    async def parse(self, text: str) -> Optional[ParserResult]:
+        # Regex matching over one resume takes milliseconds; no need for a thread
+        result = heuristic_parser.parse(text)
+        if result.content is None:
+            return None
+        return ParserResult(result.content, result.confidence, self.name)
+
+class LLMParserBackend(ResumeParserBackend):
+    name = "llm"
+
+    async def parse(self, text: str) -> Optional[ParserResult]:
+        # Send only what the parser needs: normalised, de-duplicated text
+        # fitted to the token budget
+        compacted = compact_resume_text(text)
+        llm_gateway.metrics.tokens_saved += compacted.tokens_saved
+        if compacted.dropped_sections:
+            print(f"Resume text over budget, dropped sections: {', '.join(compacted.dropped_sections)}")
         
-        if not text.strip():
-            raise ValueError("Empty resume content")
-            
         # Use OpenAI to analyze the resume with more structured output
         prompt = (
             "Analyze the following resume and extract detailed information in JSON format "
-            "with the following structure:\n"
-            "{\n"
-            '    "skills": {\n'
-            '        "technical": ["skill1", "skill2", ...],\n'
-            '        "soft": ["skill1", "skill2", ...],\n'
-            '        "languages": ["language1", "language2", ...]\n'
-            "    },\n"
-            '    "experience": [\n'
-            "        {\n"
-            '            "company": "company name",\n'
-            '            "title": "job title",\n'
-            '            "duration": "duration in years",\n'
-            '            "start_date": "YYYY-MM",\n'
-            '            "end_date": "YYYY-MM or present",\n'
-            '            "achievements": ["achievement1", "achievement2", ...],\n'
-            '            "technologies": ["tech1", "tech2", ...]\n'
-            "        }\n"
-            "    ],\n"
-            '    "education": [\n'
-            "        {\n"
-            '            "institution": "school name",\n'
-            '            "degree": "degree type",\n'
-            '            "field": "field of study",\n'
-            '            "graduation_date": "YYYY-MM",\n'
-            '            "gpa": "optional GPA"\n'
-            "        }\n"
-            "    ],\n"
-            '    "certifications": [\n'
-            "        {\n"
-            '            "name": "certification name",\n'
-            '            "issuer": "issuing organization",\n'
-            '            "date": "YYYY-MM",\n'
-            '            "expires": "YYYY-MM or never"\n'
-            "        }\n"
-            "    ],\n"
-            '    "total_years_experience": "number",\n'
-            '    "career_level": "entry|mid|senior|executive",\n'
-            '    "suggested_roles": ["role1", "role2", ...],\n'
-            '    "suggested_tags": ["tag1", "tag2", ...]\n'
-            "}\n\n"
-            f"Resume text:\n{text}"
+            f"with the following structure:\n{RESUME_SCHEMA}\n\n"
+            f"Resume text:\n{compacted.text}"
         )
         
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a resume parsing assistant. Extract and structure resume information in the exact JSON format requested."},
-                {"role": "user", "content": prompt}
-            ],
+        messages = [
+            {"role": "system", "content": "You are a resume parsing assistant. Extract and structure resume information in the exact JSON format requested."},
+            {"role": "user", "content": prompt}
+        ]
+        response = await llm_gateway.chat(
+            messages,
+            estimated_tokens=estimate_tokens(prompt) + MAX_COMPLETION_TOKENS,
             response_format={"type": "json_object"}
         )
         
         try:
             parsed_data = json.loads(response.choices[0].message.content)
             # Validate parsed data against our schema
-            parsed_content = ParsedResumeContent(**parsed_data)
-            
-            # Generate automatic classification and tags
-            career_level = "entry"
-            if parsed_content.total_years_experience > 5:
-                career_level = "senior"
-            elif parsed_content.total_years_experience > 2:
-                career_level = "mid"
-            
-            # Update career level
-            parsed_content.career_level = career_level
-            
-            # Generate additional tags based on experience and skills
-            additional_tags = set()
-            
-            # Add career level tag
-            additional_tags.add(f"level:{career_level}")
-            
-            # Add primary skill domain tags
-            if any(tech in parsed_content.skills.technical for tech in ["Python", "Java", "C++", "Go"]):
-                additional_tags.add("domain:backend")
-            if any(tech in parsed_content.skills.technical for tech in ["React", "Vue", "Angular"]):
-                additional_tags.add("domain:frontend")
-            if any(tech in parsed_content.skills.technical for tech in ["TensorFlow", "PyTorch", "ML"]):
-                additional_tags.add("domain:ml")
-            
-            # Add language proficiency tags
-            for lang in parsed_content.skills.languages:
-                additional_tags.add(f"language:{lang.lower()}")
-            
-            # Update suggested tags
-            parsed_content.suggested_tags.extend(list(additional_tags))
-            
-            return parsed_content.model_dump()
-            
+            return ParserResult(ParsedResumeContent(**parsed_data), 1.0, self.name)
         except json.JSONDecodeError as e:
             raise ValueError(f"Failed to parse OpenAI response: {str(e)}")
         except Exception as e:
             raise ValueError(f"Failed to process parsed content: {str(e)}")
+
+class ParserRouter:
+    """Picks the parser backend for each resume.
+
+    The local parser runs first; its result is used when its confidence
+    reaches ``min_confidence``. Otherwise the LLM is called, and if that
+    fails (no API key, no network, provider outage) a partial local result
+    is still returned rather than nothing.
+    """
+
+    def __init__(
+        self,
+        local: ResumeParserBackend,
+        remote: ResumeParserBackend,
+        min_confidence: float = LOCAL_PARSER_MIN_CONFIDENCE,
+        mode: str = RESUME_PARSER_MODE,
+    ):
+        self.local = local
+        self.remote = remote
+        self.min_confidence = min_confidence
+        self.mode = mode
+        self.counts: Dict[str, int] = {"local": 0, "llm": 0, "fallback": 0}
+
+    async def parse(self, text: str) -> ParserResult:
+        local = None
+        if self.mode != "llm":
+            local = await self.local.parse(text)
+            if local and (self.mode == "local" or local.confidence >= self.min_confidence):
+                self.counts["local"] += 1
+                return local
+            if self.mode == "local":
+                raise ValueError("Local parser could not extract resume content")
+        try:
+            result = await self.remote.parse(text)
+        except Exception as e:
+            if local is None:
+                raise
+            print(f"LLM parse failed ({e}), using local result (confidence {local.confidence:.2f})")
+            self.counts["fallback"] += 1
+            return local
+        self.counts["llm"] += 1
+        return result
+
+parser_router = ParserRouter(HeuristicParserBackend(), LLMParserBackend())
+
+def classify(parsed_content: ParsedResumeContent) -> ParsedResumeContent:
+    """Derive career level and classification tags from parsed content."""
+    # Generate automatic classification and tags
+    career_level = "entry"
+    if parsed_content.total_years_experience > 5:
+        career_level = "senior"
+    elif parsed_content.total_years_experience > 2:
+        career_level = "mid"
+    
+    # Update career level
+    parsed_content.career_level = career_level
+    
+    # Generate additional tags based on experience and skills
+    additional_tags = set()
+    
+    # Add career level tag
+    additional_tags.add(f"level:{career_level}")
+    
+    # Canonicalise skill names ("python", "ReactJS") and add domain tags
+    taxonomy = get_taxonomy()
+    parsed_content.skills.technical = taxonomy.normalise_skills(parsed_content.skills.technical)
+    parsed_content.suggested_tags = taxonomy.normalise_skills(parsed_content.suggested_tags)
+    additional_tags.update(taxonomy.domain_tags(parsed_content.skills.technical))
+    
+    # Add language proficiency tags
+    for lang in parsed_content.skills.languages:
+        additional_tags.add(f"language:{lang.lower()}")
+    
+    # Update suggested tags
+    parsed_content.suggested_tags.extend(
+        tag for tag in sorted(additional_tags) if tag not in parsed_content.suggested_tags
+    )
+    return parsed_content
+
+async def parse_text(text: str) -> ParseOutcome:
+    """
+    Extract structured information from resume text.
+    
+    Uses the local parser when it is confident enough and the LLM otherwise;
+    see :class:`ParserRouter`.
+    
+    Args:
+        text: Plain text extracted from the resume file
+        
+    Returns:
+        Parsed resume information or error details, with the parser version
+    """
+    try:
+        if not text.strip():
+            raise ValueError("Empty resume content")
+        result = await parser_router.parse(text)
+        return ParseOutcome(
+            classify(result.content).model_dump(), f"{result.backend}:{PARSER_VERSION}"
+        )
             
     except ValueError as e:
-        return {
+        return ParseOutcome({
             "error": str(e),
             "suggested_tags": ["needs_review"]
-        }
+        })
     except Exception as e:
-        return {
+        return ParseOutcome({
             "error": f"Unexpected error: {str(e)}",
             "suggested_tags": ["needs_review"]
-        }
-        {{
-            "skills": {{
-                "technical": ["skill1", "skill2", ...],
-                "soft": ["skill1", "skill2", ...],
-                "languages": ["language1", "language2", ...]
-            }},
-            "experience": [
-                {{
-                    "company": "company name",
-                    "title": "job title",
-                    "duration": "duration in years",
-                    "start_date": "YYYY-MM",
-                    "end_date": "YYYY-MM or present",
-                    "achievements": ["achievement1", "achievement2", ...],
-                    "technologies": ["tech1", "tech2", ...]
-                }}
-            ],
-            "education": [
-                {{
-                    "institution": "school name",
-                    "degree": "degree type",
-                    "field": "field of study",
-                    "graduation_date": "YYYY-MM",
-                    "gpa": "optional GPA"
-                }}
-            ],
-            "certifications": [
-                {{
-                    "name": "certification name",
-                    "issuer": "issuing organization",
-                    "date": "YYYY-MM",
-                    "expires": "YYYY-MM or never"
-                }}
-            ],
-            "total_years_experience": "number",
-            "career_level": "entry|mid|senior|executive",
-            "suggested_roles": ["role1", "role2", ...],
-            "suggested_tags": ["tag1", "tag2", ...]
-        }}
-
-        Resume text:
-        {text}
-        """
-        
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a resume parsing assistant. Extract and structure resume information in the exact JSON format requested."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        try:
-            parsed_data = json.loads(response.choices[0].message.content)
-            # Validate parsed data against our schema
-            parsed_content = ParsedResumeContent(**parsed_data)
-            
-            # Generate automatic classification and tags
-            career_level = "entry"
-            if parsed_content.total_years_experience > 5:
-                career_level = "senior"
-            elif parsed_content.total_years_experience > 2:
-                career_level = "mid"
-            
-            # Update career level
-            parsed_content.career_level = career_level
-            
-            # Generate additional tags based on experience and skills
-            additional_tags = set()
-            
-            # Add career level tag
-            additional_tags.add(f"level:{career_level}")
-            
-            # Add primary skill domain tags
-            if any(tech in parsed_content.skills.technical for tech in ["Python", "Java", "C++", "Go"]):
-                additional_tags.add("domain:backend")
-            if any(tech in parsed_content.skills.technical for tech in ["React", "Vue", "Angular"]):
-                additional_tags.add("domain:frontend")
-            if any(tech in parsed_content.skills.technical for tech in ["TensorFlow", "PyTorch", "ML"]):
-                additional_tags.add("domain:ml")
-            
-            # Add language proficiency tags
-            for lang in parsed_content.skills.languages:
-                additional_tags.add(f"language:{lang.lower()}")
-            
-            # Update suggested tags
-            parsed_content.suggested_tags.extend(list(additional_tags))
-            
-            return parsed_content.model_dump()
-            
-        except Exception as e:
-            print(f"Error parsing resume: {str(e)}")
-            return {
-                "error": str(e),
-                "suggested_tags": ["needs_review"]
-            }
+        })
@@ -0,0 +1,228 @@
+"""Async gateway for OpenAI chat completion calls.
+
+Every call goes through a shared concurrency limit and token buckets for
+requests and tokens per minute, times out individually and is retried with
+exponential backoff on 429 and 5xx responses. Set OPENAI_BASE_URL to point
+the gateway at a local stub server instead of the OpenAI API.
+"""
+import asyncio
+import math
+import os
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import openai
+from openai import AsyncOpenAI
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "40000"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "60"))
+
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: one per CJK character, ~4 characters per token otherwise."""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk) // 4 + 1
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate_per_minute``."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Wait until ``amount`` tokens are available and take them.
+
+        Returns:
+            Seconds spent waiting
+        """
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def adjust(self, amount: float) -> None:
+        """Charge (or refund, if negative) tokens after the fact.
+
+        Used once the real token usage of a call is known; the balance may go
+        negative, which delays the following calls accordingly.
+        """
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - amount)
+
+class LLMMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.tokens_used = 0
+        self.tokens_saved = 0  # prompt tokens removed by text compaction
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.queue_wait_total += seconds
+        self.queue_wait_max = max(self.queue_wait_max, seconds)
+
+    def record_latency(self, seconds: float) -> None:
+        self.latency_total += seconds
+        self.latency_max = max(self.latency_max, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        attempts = self.calls + self.retries
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "in_flight": self.in_flight,
+            "tokens_used": self.tokens_used,
+            "tokens_saved": self.tokens_saved,
+            "queue_wait_avg": self.queue_wait_total / self.calls if self.calls else 0.0,
+            "queue_wait_max": self.queue_wait_max,
+            "latency_avg": self.latency_total / attempts if attempts else 0.0,
+            "latency_max": self.latency_max,
+        }
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        delay = float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+    return delay if math.isfinite(delay) and delay >= 0 else None
+
+class LLMGateway:
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        model: str = LLM_MODEL,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+        timeout: float = LLM_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+    ):
+        self._client = client
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.metrics = LLMMetrics()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        # Created on first use so the API starts without OpenAI credentials.
+        # Retries are handled here, not by the SDK.
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                base_url=os.getenv("OPENAI_BASE_URL") or None,
+                max_retries=0
+            )
+        return self._client
+
+    async def chat(self, messages: List[Dict[str, str]], estimated_tokens: int, **kwargs):
+        """Create a chat completion under the gateway's limits.
+
+        Args:
+            messages: Chat messages for the completion
+            estimated_tokens: Expected prompt plus completion tokens, charged
+                against the tokens-per-minute bucket before the call
+            **kwargs: Passed through to ``chat.completions.create``
+
+        Raises:
+            openai.OpenAIError: When the call fails with a non-retryable error
+                or retries are exhausted
+        """
+        queued_at = time.monotonic()
+        async with self._semaphore:
+            self.metrics.calls += 1
+            self.metrics.in_flight += 1
+            try:
+                for attempt in range(self.max_retries + 1):
+                    await self._requests.acquire(1)
+                    await self._tokens.acquire(estimated_tokens)
+                    if attempt == 0:
+                        self.metrics.record_wait(time.monotonic() - queued_at)
+                    started = time.monotonic()
+                    try:
+                        response = await self.client.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            timeout=self.timeout,
+                            **kwargs
+                        )
+                    except Exception as e:
+                        self.metrics.record_latency(time.monotonic() - started)
+                        if isinstance(e, openai.RateLimitError):
+                            self.metrics.rate_limited += 1
+                        if not _is_retryable(e) or attempt == self.max_retries:
+                            raise
+                        self.metrics.retries += 1
+                        delay = _retry_after(e)
+                        if delay is None:
+                            delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt)
+                            delay *= random.uniform(0.5, 1.0)
+                        else:
+                            # A huge Retry-After would park the slot indefinitely
+                            delay = min(delay, LLM_BACKOFF_MAX)
+                        print(f"LLM call failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                        await asyncio.sleep(delay)
+                        continue
+                    self.metrics.record_latency(time.monotonic() - started)
+                    usage = getattr(response, "usage", None)
+                    if usage is not None:
+                        self.metrics.tokens_used += usage.total_tokens
+                        self._tokens.adjust(usage.total_tokens - estimated_tokens)
+                    return response
+            except Exception:
+                self.metrics.failures += 1
+                raise
+            finally:
+                self.metrics.in_flight -= 1
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+llm_gateway = LLMGateway()
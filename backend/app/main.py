@@ -1,12 +1,32 @@
-from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, Form, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import String
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import String, or_
+from sqlalchemy.exc import IntegrityError
 import os
 import json
 from . import models, schemas, database
+from .jobs import parse_queue, enqueue as enqueue_parse_job, find_parsed_duplicate, record_reused
+from .extraction import extraction_engine
+from .llm_gateway import llm_gateway
+from .llm import parser_router
+from .taxonomy import get_taxonomy, taxonomy_store
+from .tags import tag_service
+from .candidate_search import search_candidates
+from .dedup import find_existing, merge_candidates
+from .analytics import summary as analytics_summary
+from .changes import CHANGE_FEED_MAX_ROWS, ChangesExpired, change_log_pruner, latest_cursor, read_changes
+from .search import search_resumes
+from .matching import match_project
+from .semantic import KIND_PROJECT, KIND_REQUIREMENT, KIND_RESUME, document_text, similar
+from .pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, PageParams, page_params, paginate
+)
+from .bulk_import import import_resumes, parse_manifest
+from .storage import UPLOAD_DIR, UploadTooLarge, discard_blob, save_upload, resolve_file_type
 from .notifications import notification_service, NotificationType
-from typing import List
+from typing import List, Optional
 import shutil
 from pathlib import Path
 from uuid import UUID
@@ -21,12 +41,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["Content-Type", "Authorization", "Accept", "Origin", "X-Requested-With"],
-    expose_headers=["Content-Type"],
+    expose_headers=["Content-Type", NEXT_CURSOR_HEADER],
     max_age=3600
 )
 
 # Create uploads directory
-UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
 @app.on_event("startup")
@@ -36,6 +55,10 @@ async def startup_event():
     try:
         models.Base.metadata.create_all(bind=database.engine)
         print("Database tables created successfully")
+        get_taxonomy()
+        await parse_queue.start()
+        print(f"Started {parse_queue.workers} resume parse workers")
+        change_log_pruner.start()
         # Verify route registration
         print("Registered routes:")
         for route in app.routes:
@@ -43,10 +66,79 @@ async def startup_event():
     except Exception as e:
         print(f"Error during startup: {str(e)}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await parse_queue.stop()
+    await change_log_pruner.stop()
+    extraction_engine.shutdown()
+    await llm_gateway.close()
+    await database.async_engine.dispose()
+
 @app.get("/healthz")
 async def healthz():
     return {"status": "ok"}
 
+# Schemas the change feed serialises each entity with, as its list endpoint does
+CHANGE_SCHEMAS = {
+    "candidate": schemas.Candidate,
+    "resume": schemas.Resume,
+    "project": schemas.Project,
+    "requirement": schemas.Requirement,
+    "interview": schemas.Interview,
+    "tag": schemas.Tag,
+}
+
+@app.get("/api/changes", response_model=schemas.ChangeFeed)
+def list_changes(
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(CHANGE_FEED_MAX_ROWS, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(database.get_db)
+):
+    """Entities inserted, updated or deleted after the ``since`` cursor.
+    
+    Without ``since`` only the current cursor is returned: take it before
+    loading the lists, then poll with it. Poll again straight away while
+    ``has_more`` is true.
+    """
+    if since is None:
+        return {"cursor": latest_cursor(db), "changes": [], "has_more": False}
+    try:
+        page = read_changes(db, since, limit)
+    except ChangesExpired:
+        raise HTTPException(status_code=410, detail="变更记录已过期，请重新加载数据")
+    return {
+        "cursor": page.cursor,
+        "has_more": page.has_more,
+        "changes": [
+            {
+                "seq": change.seq, "entity": change.entity, "id": change.entity_id, "operation": change.operation,
+                "data": None if change.row is None
+                else CHANGE_SCHEMAS[change.entity].model_validate(change.row).model_dump(mode="json"),
+            }
+            for change in page.changes
+        ],
+    }
+
+@app.get("/api/analytics", response_model=schemas.Analytics)
+def get_analytics(days: int = Query(30, ge=1, le=366), db: Session = Depends(database.get_db)):
+    """Dashboard figures for the last ``days`` days, the period before and all time.
+    
+    Read from the analytics rollups, so the cost does not grow with history.
+    """
+    return analytics_summary(db, days)
+
+@app.get("/api/llm/metrics")
+async def llm_metrics():
+    return {**llm_gateway.metrics.snapshot(), "parsed_by": parser_router.counts}
+
+@app.post("/api/taxonomy/reload")
+def reload_taxonomy():
+    try:
+        taxonomy = taxonomy_store.reload()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"技能分类配置加载失败：{str(e)}")
+    return {"skills": taxonomy.size, "domains": len(taxonomy.domains)}
+
 # Project endpoints
 @app.post("/api/projects/", response_model=schemas.Project)
 def create_project(project: schemas.ProjectCreate, db: Session = Depends(database.get_db)):
@@ -57,8 +149,16 @@ def create_project(project: schemas.ProjectCreate, db: Session = Depends(databas
     return db_project
 
 @app.get("/api/projects/", response_model=List[schemas.Project])
-def list_projects(db: Session = Depends(database.get_db)):
-    return db.query(models.Project).all()
+def list_projects(
+    response: Response,
+    status: Optional[str] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(database.get_db)
+):
+    query = db.query(models.Project)
+    if status:
+        query = query.filter(models.Project.status == status)
+    return paginate(query, response, page, (models.Project.created_at, models.Project.id))
 
 @app.put("/api/projects/{project_id}", response_model=schemas.Project)
 def update_project(project_id: UUID, project: schemas.ProjectUpdate, db: Session = Depends(database.get_db)):
@@ -80,29 +180,57 @@ def delete_project(project_id: UUID, db: Session = Depends(database.get_db)):
     db.commit()
     return {"status": "success"}
 
+@app.get("/api/projects/{project_id}/matches", response_model=List[schemas.CandidateMatch])
+def match_project_candidates(
+    project_id: UUID,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(database.get_db)
+):
+    """Candidates best matching the tagged requirements of a project, best first."""
+    db_project = db.get(models.Project, str(project_id))
+    if not db_project:
+        raise HTTPException(status_code=404, detail="项目不存在")
+    return match_project(db, db_project, limit)
+
 # Requirement endpoints
 @app.post("/api/requirements/", response_model=schemas.Requirement)
 def create_requirement(requirement: schemas.RequirementCreate, db: Session = Depends(database.get_db)):
-    db_requirement = models.Requirement(**requirement.dict())
+    db_requirement = models.Requirement(
+        **requirement.dict(exclude={"project_id"}),
+        project_id=str(requirement.project_id)
+    )
     db.add(db_requirement)
+    # Tag requirements with the same taxonomy as resumes so they can be matched
+    tag_service.attach(db, db_requirement, get_taxonomy().tags_for_text(requirement.description))
     db.commit()
     db.refresh(db_requirement)
     return db_requirement
 
 @app.get("/api/requirements/", response_model=List[schemas.Requirement])
-def list_requirements(db: Session = Depends(database.get_db)):
-    return db.query(models.Requirement).all()
+def list_requirements(
+    response: Response,
+    project_id: Optional[UUID] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(database.get_db)
+):
+    query = db.query(models.Requirement).options(selectinload(models.Requirement.tags))
+    if project_id:
+        query = query.filter(models.Requirement.project_id == str(project_id))
+    return paginate(query, response, page, (models.Requirement.created_at, models.Requirement.id))
 
 # Interview endpoints
 @app.post("/api/interviews/", response_model=schemas.Interview)
-async def create_interview(interview: schemas.InterviewCreate, db: Session = Depends(database.get_db)):
-    db_interview = models.Interview(**interview.dict())
+async def create_interview(interview: schemas.InterviewCreate, db: AsyncSession = Depends(database.get_async_db)):
+    interview_data = interview.dict()
+    interview_data["project_id"] = str(interview.project_id)
+    interview_data["candidate_id"] = str(interview.candidate_id)
+    db_interview = models.Interview(**interview_data)
     db.add(db_interview)
-    db.commit()
-    db.refresh(db_interview)
+    await db.commit()
+    await db.refresh(db_interview)
     
     # Get candidate name for notification
-    candidate = db.query(models.Candidate).filter(models.Candidate.id == interview.candidate_id).first()
+    candidate = await db.get(models.Candidate, str(interview.candidate_id))
     if candidate:
         await notification_service.send_notification(
             NotificationType.INTERVIEW_SCHEDULED,
@@ -115,30 +243,44 @@ async def create_interview(interview: schemas.InterviewCreate, db: Session = Dep
     return db_interview
 
 @app.get("/api/interviews/", response_model=List[schemas.Interview])
-def list_interviews(db: Session = Depends(database.get_db)):
-    return db.query(models.Interview).all()
+def list_interviews(
+    response: Response,
+    candidate_id: Optional[UUID] = None,
+    project_id: Optional[UUID] = None,
+    status: Optional[str] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(database.get_db)
+):
+    query = db.query(models.Interview)
+    if candidate_id:
+        query = query.filter(models.Interview.candidate_id == str(candidate_id))
+    if project_id:
+        query = query.filter(models.Interview.project_id == str(project_id))
+    if status:
+        query = query.filter(models.Interview.status == status)
+    return paginate(query, response, page, (models.Interview.created_at, models.Interview.id))
 
 @app.put("/api/interviews/{interview_id}", response_model=schemas.Interview)
 async def update_interview(
     interview_id: UUID,
     interview: schemas.Interview,
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    db_interview = db.query(models.Interview).filter(models.Interview.id == interview_id).first()
+    db_interview = await db.get(models.Interview, str(interview_id))
     if not db_interview:
         raise HTTPException(status_code=404, detail="Interview not found")
     
     update_data = interview.dict(exclude_unset=True)
     for key, value in update_data.items():
-        setattr(db_interview, key, value)
+        setattr(db_interview, key, str(value) if isinstance(value, UUID) else value)
     
     db_interview.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(db_interview)
+    await db.commit()
+    await db.refresh(db_interview)
     
     # Send notification if feedback is submitted
     if interview.feedback and db_interview.status == "completed":
-        candidate = db.query(models.Candidate).filter(models.Candidate.id == db_interview.candidate_id).first()
+        candidate = await db.get(models.Candidate, db_interview.candidate_id)
         if candidate:
             await notification_service.send_notification(
                 NotificationType.FEEDBACK_SUBMITTED,
@@ -150,6 +292,10 @@ async def update_interview(
 # Candidate endpoints
 @app.post("/api/candidates/", response_model=schemas.Candidate)
 def create_candidate(candidate: schemas.CandidateCreate, db: Session = Depends(database.get_db)):
+    # Bulk sourcing sends the same person again; their resumes would be parsed twice
+    existing = find_existing(db, candidate.email, candidate.phone)
+    if existing:
+        raise HTTPException(status_code=409, detail=f"候选人已存在（ID：{existing.id}）")
     db_candidate = models.Candidate(**candidate.dict())
     db.add(db_candidate)
     db.commit()
@@ -157,15 +303,92 @@ def create_candidate(candidate: schemas.CandidateCreate, db: Session = Depends(d
     return db_candidate
 
 @app.get("/api/candidates/", response_model=List[schemas.Candidate])
-def list_candidates(db: Session = Depends(database.get_db)):
-    return db.query(models.Candidate).all()
+def list_candidates(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(database.get_db)
+):
+    query = db.query(models.Candidate)
+    return paginate(query, response, page, (models.Candidate.created_at, models.Candidate.id))
+
+@app.get("/api/candidates/search", response_model=List[schemas.Candidate])
+def search_candidates_endpoint(
+    response: Response,
+    skills: List[str] = Query([]),
+    match: str = Query("all", pattern="^(all|any)$"),
+    languages: List[str] = Query([]),
+    min_years: Optional[float] = Query(None, ge=0),
+    career_level: Optional[str] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(database.get_db)
+):
+    """Search candidates by skills, languages, experience and career level.
+    
+    ``match=all`` requires every skill in ``skills``, ``match=any`` one of
+    them; all ``languages`` are required.
+    """
+    query = search_candidates(
+        db, skills, match_all=match == "all", languages=languages,
+        min_years=min_years, career_level=career_level
+    )
+    return paginate(query, response, page, (models.Candidate.created_at, models.Candidate.id))
+
+@app.get("/api/candidates/duplicates", response_model=List[schemas.CandidateDuplicate])
+def list_candidate_duplicates(
+    response: Response,
+    candidate_id: Optional[UUID] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(database.get_db)
+):
+    """Likely duplicate candidate pairs from the last dedup run, most similar first."""
+    query = db.query(models.CandidateDuplicate)
+    if candidate_id:
+        query = query.filter(or_(
+            models.CandidateDuplicate.candidate_id == str(candidate_id),
+            models.CandidateDuplicate.duplicate_id == str(candidate_id)
+        ))
+    page = PageParams(limit, cursor, None, None)
+    return paginate(query, response, page, (
+        models.CandidateDuplicate.score, models.CandidateDuplicate.candidate_id,
+        models.CandidateDuplicate.duplicate_id
+    ))
+
+@app.post("/api/candidates/{candidate_id}/merge", response_model=schemas.Candidate)
+def merge_candidate_duplicates(
+    candidate_id: UUID,
+    merge: schemas.CandidateMerge,
+    db: Session = Depends(database.get_db)
+):
+    """Move the resumes and interviews of ``duplicate_ids`` to this candidate and delete them."""
+    duplicate_ids = list(dict.fromkeys(str(duplicate_id) for duplicate_id in merge.duplicate_ids))
+    if str(candidate_id) in duplicate_ids:
+        raise HTTPException(status_code=400, detail="不能将候选人与自身合并")
+    db_candidate = db.get(models.Candidate, str(candidate_id))
+    duplicates = db.query(models.Candidate).filter(models.Candidate.id.in_(duplicate_ids)).all()
+    if not db_candidate or len(duplicates) != len(duplicate_ids):
+        raise HTTPException(status_code=404, detail="未找到该候选人，请确认候选人信息已正确录入系统")
+    merge_candidates(db, db_candidate, duplicates)
+    db.commit()
+    db.refresh(db_candidate)
+    return db_candidate
 
 # Resume endpoints
-@app.post("/api/resumes/", response_model=schemas.Resume)
+def queue_parse(db: Session, resume: models.Resume) -> models.ParseJob:
+    """Reuse the parse of an identical file, else queue ``resume`` for parsing."""
+    # Identical files are stored once and parsed once
+    parsed_duplicate = find_parsed_duplicate(db, resume)
+    if parsed_duplicate:
+        return record_reused(db, resume, parsed_duplicate)
+    # Parsing runs in the background worker pool; the job row is committed
+    # with the resume so it survives a restart.
+    return enqueue_parse_job(db, resume)
+
+@app.post("/api/resumes/", response_model=schemas.ResumeUploadResponse, status_code=202)
 async def upload_resume(
     file: UploadFile = File(...),
     candidate_id: str = Form(...),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     if not candidate_id:
         raise HTTPException(status_code=400, detail="请提供候选人ID")
@@ -176,9 +399,7 @@ async def upload_resume(
         raise HTTPException(status_code=400, detail="候选人ID格式无效")
     
     # Check if candidate exists
-    candidate = db.query(models.Candidate).filter(
-        models.Candidate.id == str(candidate_uuid)
-    ).first()
+    candidate = await db.get(models.Candidate, str(candidate_uuid))
     if not candidate:
         raise HTTPException(status_code=404, detail="未找到该候选人，请确认候选人信息已正确录入系统")
     
@@ -196,37 +417,34 @@ async def upload_resume(
         )
     
     try:
-        # Read file content for size validation
-        content = await file.read()
-        # Validate file size (10MB limit)
-        if len(content) > 10 * 1024 * 1024:  # 10MB in bytes
+        # Stream to disk in chunks; the size limit, hash and file type are
+        # checked on the fly instead of buffering the whole file.
+        try:
+            stored = await save_upload(file)
+        except UploadTooLarge:
             raise HTTPException(
                 status_code=400,
                 detail="文件大小超过限制（最大10MB）"
             )
-        
-        # Create uploads directory if it doesn't exist
-        UPLOAD_DIR.mkdir(exist_ok=True)
-        
-        # Generate unique filename with timestamp
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        file_ext = Path(file.filename).suffix
-        unique_filename = f"{candidate_id}_{timestamp}{file_ext}"
-        file_path = UPLOAD_DIR / unique_filename
-        
-        # Save the file
-        with file_path.open("wb") as buffer:
-            buffer.write(content)
+        file_path = stored.path
+        file_type = resolve_file_type(file.content_type, stored.sniffed_type)
+        if file_type is None:
+            await db.run_sync(discard_blob, stored)
+            raise HTTPException(
+                status_code=400,
+                detail="文件内容与文件类型不符。请上传 PDF、Word 文档或文本文件。"
+            )
         
         try:
             # Create resume record
             db_resume = models.Resume(
                 candidate_id=str(candidate_uuid),
                 file_path=str(file_path),
-                file_type=file.content_type,
-                parsed_content="{}"
+                file_type=file_type,
+                content_hash=stored.digest
             )
             db.add(db_resume)
+            parse_job = await db.run_sync(queue_parse, db_resume)
             
             try:
                 # Send notification for new resume
@@ -237,76 +455,166 @@ async def upload_resume(
             except Exception as notify_error:
                 print(f"通知发送失败: {str(notify_error)}")
             
-            db.commit()
-            db.refresh(db_resume)
-            return db_resume
+            await db.commit()
+            # Columns are still loaded after the commit; the tags collection
+            # has to be loaded explicitly as it cannot lazy-load here
+            await db.refresh(db_resume, ["tags"])
+            parse_queue.notify()
+            return schemas.ResumeUploadResponse(
+                **schemas.Resume.model_validate(db_resume).model_dump(),
+                parse_job_id=parse_job.id,
+                parse_status=parse_job.status
+            )
             
         except Exception as e:
-            # Clean up file if it was created
-            if file_path.exists():
-                file_path.unlink()
-            db.rollback()
+            await db.rollback()
+            # Clean up file if it was created; shared blobs stay in place
+            await db.run_sync(discard_blob, stored)
             raise HTTPException(
                 status_code=500,
                 detail=f"简历上传失败：{str(e)}"
             )
-        await notification_service.send_notification(
-            NotificationType.RESUME_RECEIVED,
-            {"candidate_name": candidate.name}
-        )
-        
-        # Parse resume using LLM
-        try:
-            from . import llm
-            parsed_data = llm.parse_resume(str(file_path), file.content_type)
-            db_resume.parsed_content = json.dumps(parsed_data)
-            
-            # Create tags from parsed data
-            if "suggested_tags" in parsed_data:
-                for tag_name in parsed_data["suggested_tags"]:
-                    # Check if tag exists
-                    existing_tag = db.query(models.Tag).filter(models.Tag.name == tag_name).first()
-                    if not existing_tag:
-                        tag = models.Tag(name=tag_name, category="skill")
-                        db.add(tag)
-                        db.flush()
-                        db_resume.tags.append(tag)
-                    else:
-                        db_resume.tags.append(existing_tag)
-        except Exception as parse_error:
-            print(f"简历解析错误: {str(parse_error)}")
-            # Continue without parsed content
-            db_resume.parsed_content = "{}"
-        
-        db.commit()
-        db.refresh(db_resume)
-        return db_resume
-        
     except HTTPException:
         raise
     except Exception as e:
+        await db.rollback()
         # Clean up file if it was created
-        if 'file_path' in locals() and file_path.exists():
-            file_path.unlink()
-        db.rollback()
+        if locals().get('stored'):
+            await db.run_sync(discard_blob, stored)
         raise HTTPException(
             status_code=500,
             detail=f"简历上传失败：{str(e)}"
         )
 
+@app.post("/api/resumes/bulk", response_model=schemas.BulkImportResult, status_code=202)
+async def bulk_upload_resumes(
+    files: List[UploadFile] = File(...),
+    manifest: str = Form(...)
+):
+    """Import many resumes, or ZIP archives of resumes, in one request.
+    
+    ``manifest`` maps each file name (or ZIP entry path) to a candidate ID.
+    Every file gets its own entry in the returned report. The import runs in
+    a worker thread with a session of its own.
+    """
+    try:
+        manifest_map = parse_manifest(manifest)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"导入清单格式无效：{str(e)}")
+    
+    result = await import_resumes(files, manifest_map)
+    
+    try:
+        await notification_service.send_notification(
+            NotificationType.BULK_IMPORT_COMPLETED,
+            {"created": result.created, "failed": result.failed}
+        )
+    except Exception as notify_error:
+        print(f"通知发送失败: {str(notify_error)}")
+    
+    return result
+
+@app.get("/api/resumes/search", response_model=List[schemas.ResumeSearchHit])
+def search_resumes_endpoint(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(database.get_db)
+):
+    """Full-text search over resume text and parsed achievements, best match first.
+    
+    ``q`` takes web-search syntax: words, "quoted phrases", ``or`` and ``-word``.
+    """
+    return search_resumes(db, q, response, limit, cursor)
+
+@app.post("/api/similar", response_model=List[schemas.SimilarDocument])
+def find_similar(query: schemas.SimilarityQuery, db: Session = Depends(database.get_db)):
+    """Resumes, requirements or projects most similar to a text or a stored document.
+    
+    E.g. ``{"project_id": ..., "kind": "resume"}`` finds resumes like a job description.
+    """
+    sources = [query.text, query.resume_id, query.requirement_id, query.project_id]
+    if sum(source is not None for source in sources) != 1:
+        raise HTTPException(status_code=400, detail="请提供查询文本，或简历、需求、项目中的一个")
+    exclude = None
+    if query.text is not None:
+        text = query.text
+    else:
+        if query.resume_id:
+            kind, item = KIND_RESUME, db.get(models.Resume, str(query.resume_id))
+        elif query.requirement_id:
+            kind, item = KIND_REQUIREMENT, db.get(models.Requirement, str(query.requirement_id))
+        else:
+            kind, item = KIND_PROJECT, db.get(models.Project, str(query.project_id))
+        if not item:
+            raise HTTPException(status_code=404, detail="查询的文档不存在")
+        text = document_text(item)
+        exclude = item.id if kind == query.kind else None
+    hits = similar(text, query.kind, query.limit, exclude)
+    if query.kind != KIND_RESUME:
+        return [{"kind": query.kind, "id": doc_id, "score": score} for doc_id, score in hits]
+    candidates = dict(db.query(models.Resume.id, models.Resume.candidate_id).filter(
+        models.Resume.id.in_([doc_id for doc_id, _ in hits])
+    ).all())
+    return [
+        {"kind": query.kind, "id": doc_id, "score": score, "candidate_id": candidates[doc_id]}
+        for doc_id, score in hits if doc_id in candidates
+    ]
+
 @app.get("/api/resumes/", response_model=List[schemas.Resume])
-def list_resumes(db: Session = Depends(database.get_db)):
-    return db.query(models.Resume).all()
+def list_resumes(
+    response: Response,
+    candidate_id: Optional[UUID] = None,
+    career_level: Optional[str] = None,
+    min_years: Optional[float] = Query(None, ge=0),
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(database.get_db)
+):
+    query = db.query(models.Resume).options(selectinload(models.Resume.tags))
+    if candidate_id:
+        query = query.filter(models.Resume.candidate_id == str(candidate_id))
+    if career_level:
+        query = query.filter(models.Resume.career_level == career_level)
+    if min_years is not None:
+        query = query.filter(models.Resume.total_years_experience >= min_years)
+    return paginate(query, response, page, (models.Resume.created_at, models.Resume.id))
+
+@app.get("/api/resumes/{resume_id}/parse-status", response_model=schemas.ParseJobStatus)
+def get_resume_parse_status(resume_id: UUID, db: Session = Depends(database.get_db)):
+    parse_job = db.query(models.ParseJob).filter(
+        models.ParseJob.resume_id == str(resume_id)
+    ).order_by(models.ParseJob.created_at.desc()).first()
+    if not parse_job:
+        raise HTTPException(status_code=404, detail="未找到该简历的解析任务")
+    return parse_job
 
 # Tag endpoints
 @app.post("/api/tags/", response_model=schemas.Tag)
 def create_tag(tag: schemas.TagCreate, db: Session = Depends(database.get_db)):
+    if db.query(models.Tag.id).filter(models.Tag.name == tag.name).first():
+        raise HTTPException(status_code=409, detail="标签已存在")
     db_tag = models.Tag(**tag.dict())
     db.add(db_tag)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="标签已存在")
     db.refresh(db_tag)
     return db_tag
 
 @app.get("/api/tags/", response_model=List[schemas.Tag])
-def list_tags(db: Session = Depends(database.get_db)):
-    return db.query(models.Tag).all()
+def list_tags(
+    response: Response,
+    category: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(database.get_db)
+):
+    # Tags have no created_at; they are listed alphabetically
+    query = db.query(models.Tag)
+    if category:
+        query = query.filter(models.Tag.category == category)
+    page = PageParams(limit, cursor, None, None)
+    return paginate(query, response, page, (models.Tag.name, models.Tag.id), descending=False)
@@ -0,0 +1,394 @@
+"""Rank candidates for a project by the tags of its requirements.
+
+Resumes and requirements are tagged from the same taxonomy, so both sides
+are rows of a tag-incidence matrix: candidates × tags (the union of the tags
+on a candidate's resumes) and requirements × tags. Each requirement spreads
+its weight (MATCH_REQUIRED_WEIGHT or MATCH_PREFERRED_WEIGHT) evenly over its
+tags, which turns a project into one weight per tag; a candidate's skill
+score is then a single sparse product over just those tag columns. It is
+blended with how close the candidate's years of experience come to the
+project's job level (MATCH_EXPERIENCE_WEIGHT).
+
+The candidate matrix is loaded on first use and kept in memory. Commits that
+change a resume's tags, parse or candidate mark that candidate stale, and the
+next match reloads only the stale candidates into an overlay, which is merged
+into the matrix once it grows past MATCH_OVERLAY_MAX_ROWS. Writes committed
+by other processes are picked up by a full reload every MATCH_RELOAD_SECONDS.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from scipy.sparse import csc_matrix, csr_matrix
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from . import database, models
+from .tags import RETAGGED_RESUMES_KEY
+
+MATCH_REQUIRED_WEIGHT = float(os.getenv("MATCH_REQUIRED_WEIGHT", "2"))
+MATCH_PREFERRED_WEIGHT = float(os.getenv("MATCH_PREFERRED_WEIGHT", "1"))
+# Share of the score that comes from years of experience
+MATCH_EXPERIENCE_WEIGHT = float(os.getenv("MATCH_EXPERIENCE_WEIGHT", "0.2"))
+MATCH_OVERLAY_MAX_ROWS = int(os.getenv("MATCH_OVERLAY_MAX_ROWS", "2000"))
+MATCH_RELOAD_SECONDS = float(os.getenv("MATCH_RELOAD_SECONDS", "900"))  # 0 disables
+
+# Years of experience that fully satisfy a project's job level
+LEVEL_YEARS = {"entry": 0, "mid": 3, "senior": 5, "lead": 8}
+
+# Session.info key for candidates whose tags changed in the current transaction
+_STALE_KEY = "match_stale_candidates"
+
+_LOAD_BATCH_SIZE = 50000
+_LOOKUP_CHUNK_SIZE = 500
+
+@dataclass
+class Match:
+    candidate_id: str
+    score: float
+    skill_score: float  # weighted share of the requirement tags the candidate has
+    experience_score: float  # years of experience relative to the job level, capped at 1
+    matched_tags: List[str] = field(default_factory=list)
+    name: Optional[str] = None
+
+class CandidateTagMatrix:
+    """In-memory candidate × tag incidence matrix, updated incrementally."""
+
+    def __init__(
+        self,
+        overlay_max_rows: int = MATCH_OVERLAY_MAX_ROWS,
+        reload_seconds: float = MATCH_RELOAD_SECONDS
+    ):
+        self.overlay_max_rows = overlay_max_rows
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._tracking = False
+        self._stale_candidates: Set[str] = set()
+        self._stale_resumes: Set[str] = set()
+        self._install({}, {}, csc_matrix((0, 0), dtype=np.float32), np.zeros(0))
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    @property
+    def tracking(self) -> bool:
+        """Whether changes matter: until the first load starts it reads everything anyway."""
+        return self._tracking
+
+    def mark_stale(self, candidate_ids: Iterable[str] = (), resume_ids: Iterable[str] = ()) -> None:
+        """Reload these candidates (and the candidates of these resumes) before the next match."""
+        if not self._tracking:
+            return
+        with self._lock:
+            self._stale_candidates.update(candidate_ids)
+            self._stale_resumes.update(resume_ids)
+
+    def rank(
+        self,
+        db: Session,
+        tag_weights: Dict[str, float],
+        target_years: float,
+        limit: int
+    ) -> List[Tuple[str, float, float, float, List[str]]]:
+        """Top ``limit`` candidates as (candidate id, score, skill, experience, matched tag ids).
+
+        ``tag_weights`` maps tag id to weight; the skill score is the
+        weight of the candidate's tags over the total weight.
+        """
+        total_weight = sum(tag_weights.values())
+        if total_weight <= 0 or limit <= 0:
+            return []
+        self._ensure_loaded(db)
+        with self._lock:
+            self._apply_stale(db)
+            columns = np.array(
+                [self._columns[tag_id] for tag_id in tag_weights if tag_id in self._columns], dtype=np.int64
+            )
+            if not len(columns):
+                return []
+            weights = np.zeros(len(self._columns))
+            weights[columns] = [tag_weights[self._tag_ids[column]] for column in columns]
+
+            skill = np.zeros(len(self._candidate_ids))
+            base_rows, base_columns = self._base.shape
+            in_base = columns[columns < base_columns]
+            if len(in_base) and base_rows:
+                skill[:base_rows] = self._base[:, in_base] @ weights[in_base]
+            for row, row_columns in self._overlay.items():
+                skill[row] = weights[row_columns].sum()
+            skill /= total_weight
+
+            if target_years > 0:
+                experience = np.minimum(np.nan_to_num(self._years) / target_years, 1)
+            else:
+                experience = np.ones_like(skill)
+            score = (1 - MATCH_EXPERIENCE_WEIGHT) * skill + MATCH_EXPERIENCE_WEIGHT * experience
+
+            candidates = np.flatnonzero(skill > 0)
+            if len(candidates) > limit:
+                candidates = candidates[np.argpartition(-score[candidates], limit - 1)[:limit]]
+            candidates = candidates[np.lexsort((candidates, -score[candidates]))]
+            matched = self._matched_columns(candidates, in_base, columns)
+            return [
+                (
+                    self._candidate_ids[row], float(score[row]), float(skill[row]), float(experience[row]),
+                    [self._tag_ids[column] for column in matched[row]]
+                )
+                for row in candidates
+            ]
+
+    def _matched_columns(self, rows: np.ndarray, in_base: np.ndarray, columns: np.ndarray) -> Dict[int, List[int]]:
+        matched: Dict[int, List[int]] = {int(row): [] for row in rows}
+        base_rows = np.array([row for row in matched if row not in self._overlay and row < self._base.shape[0]])
+        if len(base_rows):
+            for column in in_base:
+                start, end = self._base.indptr[column], self._base.indptr[column + 1]
+                for row in base_rows[np.isin(base_rows, self._base.indices[start:end])]:
+                    matched[int(row)].append(int(column))
+        for row in matched:
+            if row in self._overlay:
+                matched[row] = [int(column) for column in np.intersect1d(self._overlay[row], columns)]
+        return matched
+
+    def _install(self, rows: Dict[str, int], columns: Dict[str, int], base: csc_matrix, years: np.ndarray) -> None:
+        self._rows = rows
+        self._candidate_ids = list(rows)
+        self._columns = columns
+        self._tag_ids = list(columns)
+        self._base = base
+        self._years = years
+        # row -> tag columns, replacing that row of _base
+        self._overlay: Dict[int, np.ndarray] = {}
+
+    def _ensure_loaded(self, db: Session) -> None:
+        if not self.loaded:
+            with self._load_lock:
+                if not self.loaded:
+                    self._load_and_install(db)
+            return
+        # A periodic reload runs in the background; matches keep using the
+        # current matrix until it is done
+        expired = self.reload_seconds > 0 and time.monotonic() - self._loaded_at > self.reload_seconds
+        if expired and self._load_lock.acquire(blocking=False):
+            threading.Thread(target=self._reload, daemon=True).start()
+
+    def _reload(self) -> None:
+        try:
+            with database.SessionLocal() as db:
+                self._load_and_install(db)
+        except Exception as e:
+            print(f"Error reloading tag matrix: {str(e)}")
+            self._loaded_at = time.monotonic()  # retry after another interval
+        finally:
+            self._load_lock.release()
+
+    def _load_and_install(self, db: Session) -> None:
+        self._tracking = True
+        started = time.monotonic()
+        loaded = self._load(db)
+        with self._lock:
+            # Changes committed during the load stay marked stale and are
+            # applied on top
+            self._install(*loaded)
+            self._loaded_at = started
+        print(f"Loaded tag matrix: {len(self._candidate_ids)} candidates, "
+              f"{self._base.nnz} tag links in {time.monotonic() - started:.1f}s")
+
+    def _load(self, db: Session):
+        rows: Dict[str, int] = {}
+        columns: Dict[str, int] = {}
+        row_parts, column_parts = [], []
+        # Core rows: the ORM result layer would triple the cost of millions of links
+        connection = db.connection()
+        result = connection.execute(
+            select(models.Resume.candidate_id, models.resume_tags.c.tag_id)
+            .join(models.resume_tags, models.resume_tags.c.resume_id == models.Resume.id)
+            .where(models.Resume.candidate_id.isnot(None)),
+            execution_options={"yield_per": _LOAD_BATCH_SIZE}
+        )
+        for partition in result.partitions():
+            row_parts.append(np.array(
+                [rows.setdefault(candidate_id, len(rows)) for candidate_id, _ in partition], dtype=np.int32
+            ))
+            column_parts.append(np.array(
+                [columns.setdefault(tag_id, len(columns)) for _, tag_id in partition], dtype=np.int32
+            ))
+        base = _incidence(
+            np.concatenate(row_parts) if row_parts else np.zeros(0, dtype=np.int32),
+            np.concatenate(column_parts) if column_parts else np.zeros(0, dtype=np.int32),
+            (len(rows), len(columns))
+        )
+        years = np.full(len(rows), np.nan)
+        result = connection.execute(
+            select(models.Candidate.id, models.Candidate.total_years_experience)
+            .where(models.Candidate.total_years_experience.isnot(None)),
+            execution_options={"yield_per": _LOAD_BATCH_SIZE}
+        )
+        for candidate_id, candidate_years in result:
+            row = rows.get(candidate_id)
+            if row is not None:
+                years[row] = candidate_years
+        return rows, columns, base, years
+
+    def _apply_stale(self, db: Session) -> None:
+        if not self._stale_candidates and not self._stale_resumes:
+            return
+        stale = set(self._stale_candidates)
+        for chunk in _chunks(list(self._stale_resumes)):
+            stale.update(candidate_id for candidate_id in db.scalars(
+                select(models.Resume.candidate_id).where(models.Resume.id.in_(chunk))
+            ) if candidate_id)
+        tags: Dict[str, List[str]] = {candidate_id: [] for candidate_id in stale}
+        years: Dict[str, Optional[float]] = {}
+        for chunk in _chunks(list(stale)):
+            for candidate_id, tag_id in db.execute(
+                select(models.Resume.candidate_id, models.resume_tags.c.tag_id)
+                .join(models.resume_tags, models.resume_tags.c.resume_id == models.Resume.id)
+                .where(models.Resume.candidate_id.in_(chunk))
+            ):
+                tags[candidate_id].append(tag_id)
+            years.update(db.execute(
+                select(models.Candidate.id, models.Candidate.total_years_experience)
+                .where(models.Candidate.id.in_(chunk))
+            ).all())
+
+        new_ids = [candidate_id for candidate_id, tag_ids in tags.items() if tag_ids and candidate_id not in self._rows]
+        if new_ids:
+            for candidate_id in new_ids:
+                self._rows[candidate_id] = len(self._candidate_ids)
+                self._candidate_ids.append(candidate_id)
+            self._years = np.concatenate([self._years, np.full(len(new_ids), np.nan)])
+        for candidate_id, tag_ids in tags.items():
+            row = self._rows.get(candidate_id)
+            if row is None:
+                continue
+            self._years[row] = np.nan if years.get(candidate_id) is None else years[candidate_id]
+            for tag_id in tag_ids:
+                if tag_id not in self._columns:
+                    self._columns[tag_id] = len(self._tag_ids)
+                    self._tag_ids.append(tag_id)
+            self._overlay[row] = np.unique(np.array([self._columns[tag_id] for tag_id in tag_ids], dtype=np.int64))
+        self._stale_candidates.clear()
+        self._stale_resumes.clear()
+        if len(self._overlay) > self.overlay_max_rows:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Merge the overlay rows into the base matrix."""
+        base = self._base.tocoo()
+        keep = ~np.isin(base.row, np.fromiter(self._overlay, dtype=np.int64))
+        overlay_rows = [np.full(len(columns), row) for row, columns in self._overlay.items()]
+        self._base = _incidence(
+            np.concatenate([base.row[keep], *overlay_rows]),
+            np.concatenate([base.col[keep], *self._overlay.values()]),
+            (len(self._candidate_ids), len(self._tag_ids))
+        )
+        self._overlay = {}
+
+def _incidence(rows: np.ndarray, columns: np.ndarray, shape: Tuple[int, int]) -> csc_matrix:
+    matrix = csc_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)), shape=shape)
+    matrix.sum_duplicates()
+    matrix.data[:] = 1  # a candidate can have a tag on several resumes
+    return matrix
+
+def _chunks(items: List[str]):
+    for start in range(0, len(items), _LOOKUP_CHUNK_SIZE):
+        yield items[start:start + _LOOKUP_CHUNK_SIZE]
+
+def requirement_weights(db: Session, project_id: str) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """Weight per tag id of a project's requirements, and the tag names.
+
+    Builds the requirements × tags matrix of the project, scales each row to
+    the requirement's weight divided by its number of tags and sums the
+    rows. Requirements without tags are ignored.
+    """
+    rows = db.execute(
+        select(models.Requirement.id, models.Requirement.is_required, models.Tag.id, models.Tag.name)
+        .join(models.requirement_tags, models.requirement_tags.c.requirement_id == models.Requirement.id)
+        .join(models.Tag, models.Tag.id == models.requirement_tags.c.tag_id)
+        .where(models.Requirement.project_id == project_id)
+    ).all()
+    requirements: Dict[str, int] = {}
+    columns: Dict[str, int] = {}
+    names: Dict[str, str] = {}
+    required: Dict[int, bool] = {}
+    entries = []
+    for requirement_id, is_required, tag_id, tag_name in rows:
+        row = requirements.setdefault(requirement_id, len(requirements))
+        column = columns.setdefault(tag_id, len(columns))
+        required[row] = is_required is not False  # NULL counts as required, like the column default
+        names[tag_id] = tag_name
+        entries.append((row, column))
+    if not entries:
+        return {}, names
+    matrix = csr_matrix(
+        (np.ones(len(entries), dtype=np.float32), tuple(np.array(entries).T)),
+        shape=(len(requirements), len(columns))
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    weights = np.array(
+        [MATCH_REQUIRED_WEIGHT if required[row] else MATCH_PREFERRED_WEIGHT for row in range(len(requirements))],
+        dtype=np.float32
+    )
+    per_tag = matrix.T @ (weights / np.asarray(matrix.sum(axis=1)).ravel())
+    return {tag_id: float(per_tag[column]) for tag_id, column in columns.items()}, names
+
+def match_project(db: Session, project: models.Project, limit: int) -> List[Match]:
+    """The ``limit`` best matching candidates for ``project``, best first."""
+    tag_weights, tag_names = requirement_weights(db, project.id)
+    ranked = candidate_matrix.rank(db, tag_weights, LEVEL_YEARS.get(project.job_level, 0), limit)
+    if not ranked:
+        return []
+    names = dict(db.execute(
+        select(models.Candidate.id, models.Candidate.name)
+        .where(models.Candidate.id.in_([candidate_id for candidate_id, *_ in ranked]))
+    ).all())
+    return [
+        Match(
+            candidate_id=candidate_id,
+            score=score,
+            skill_score=skill,
+            experience_score=experience,
+            matched_tags=sorted(tag_names[tag_id] for tag_id in matched),
+            name=names.get(candidate_id)
+        )
+        for candidate_id, score, skill, experience, matched in ranked
+        if candidate_id in names
+    ]
+
+candidate_matrix = CandidateTagMatrix()
+
+@event.listens_for(Session, "before_flush")
+def _collect_stale_candidates(session, flush_context, instances):
+    if not candidate_matrix.tracking:
+        return
+    stale = session.info.setdefault(_STALE_KEY, set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, models.Candidate) and instance in session.deleted:
+            stale.add(instance.id)
+        if not isinstance(instance, models.Resume):
+            continue
+        attrs = inspect(instance).attrs
+        candidate = attrs.candidate_id.history
+        if (instance in session.new or instance in session.deleted or candidate.has_changes()
+                or attrs.tags.history.has_changes() or attrs.parsed_content.history.has_changes()):
+            # parsed_content also sets the candidate's years of experience
+            for candidate_id in (instance.candidate_id, *(candidate.deleted or ())):
+                if candidate_id:
+                    stale.add(candidate_id)
+
+@event.listens_for(Session, "after_commit")
+def _publish_stale_candidates(session):
+    candidate_matrix.mark_stale(session.info.pop(_STALE_KEY, ()), session.info.pop(RETAGGED_RESUMES_KEY, ()))
+
+@event.listens_for(Session, "after_rollback")
+def _drop_stale_candidates(session):
+    session.info.pop(_STALE_KEY, None)
+    session.info.pop(RETAGGED_RESUMES_KEY, None)
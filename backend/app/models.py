@@ -1,6 +1,8 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Table, Integer, Boolean, Float
+from sqlalchemy import Column, String, Date, DateTime, ForeignKey, Table, Integer, Boolean, Float, Index, LargeBinary, PrimaryKeyConstraint, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
+import json
 import uuid
 from datetime import datetime
 
@@ -9,61 +11,178 @@ def generate_uuid():
 
 Base = declarative_base()
 
+# JSONB on PostgreSQL, JSON text elsewhere. Python None is stored as SQL NULL,
+# so "IS NULL" finds missing values.
+JSONType = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
+def decode_json(value):
+    """Decoded value for a JSON column; JSON text from older clients is parsed.
+
+    Text that is not JSON is kept as a string, as the migration to JSON
+    columns stored it outside the list columns.
+    """
+    if isinstance(value, str):
+        if not value:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+def decode_json_list(value):
+    """Like :func:`decode_json`, wrapping anything but a list in a one-item list."""
+    value = decode_json(value)
+    if value is None or isinstance(value, list):
+        return value
+    return [value]
+
 # Association tables for many-to-many relationships
 resume_tags = Table(
     'resume_tags',
     Base.metadata,
-    Column('resume_id', String, ForeignKey('resumes.id')),
-    Column('tag_id', String, ForeignKey('tags.id'))
+    Column('resume_id', String, ForeignKey('resumes.id'), nullable=False),
+    Column('tag_id', String, ForeignKey('tags.id'), nullable=False, index=True),
+    # Named so the migration that added it can drop it again
+    PrimaryKeyConstraint('resume_id', 'tag_id', name='pk_resume_tags')
 )
 
 requirement_tags = Table(
     'requirement_tags',
     Base.metadata,
-    Column('requirement_id', String, ForeignKey('requirements.id')),
-    Column('tag_id', String, ForeignKey('tags.id'))
+    Column('requirement_id', String, ForeignKey('requirements.id'), nullable=False),
+    Column('tag_id', String, ForeignKey('tags.id'), nullable=False, index=True),
+    # Named so the migration that added it can drop it again
+    PrimaryKeyConstraint('requirement_id', 'tag_id', name='pk_requirement_tags')
+)
+
+# Search index of the skills and languages in a candidate's parsed resumes,
+# maintained by candidate_search on every parse. ``skill`` is the
+# normalised taxonomy key, ``kind`` is "technical" or "language".
+candidate_skills = Table(
+    'candidate_skills',
+    Base.metadata,
+    Column('candidate_id', String, ForeignKey('candidates.id'), nullable=False),
+    Column('kind', String, nullable=False),
+    Column('skill', String, nullable=False),
+    PrimaryKeyConstraint('candidate_id', 'kind', 'skill', name='pk_candidate_skills'),
+    Index('ix_candidate_skills_kind_skill_candidate_id', 'kind', 'skill', 'candidate_id')
 )
 
 class Candidate(Base):
     __tablename__ = 'candidates'
+    __table_args__ = (
+        Index('ix_candidates_created_at_id', 'created_at', 'id'),
+        Index('ix_candidates_career_level_years', 'career_level', 'total_years_experience'),
+    )
     
     id = Column(String, primary_key=True, default=generate_uuid)
     name = Column(String, nullable=False)
-    email = Column(String, nullable=False)
+    email = Column(String, nullable=False, index=True)
     phone = Column(String)
+    # Normalised email and phone, set by dedup, for the duplicate check on insert
+    email_key = Column(String, index=True)
+    phone_key = Column(String, index=True)
+    # From the candidate's most experienced parsed resume, for search
+    total_years_experience = Column(Float)
+    career_level = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, onupdate=datetime.utcnow)
     
     resumes = relationship("Resume", back_populates="candidate")
     interviews = relationship("Interview", back_populates="candidate")
 
+# Likely duplicate candidate pairs found by the dedup job; ``candidate_id``
+# is the older of the two, the one to keep when merging
+class CandidateDuplicate(Base):
+    __tablename__ = 'candidate_duplicates'
+    __table_args__ = (
+        Index('ix_candidate_duplicates_score', 'score', 'candidate_id', 'duplicate_id'),
+    )
+    
+    candidate_id = Column(String, ForeignKey('candidates.id'), primary_key=True)
+    duplicate_id = Column(String, ForeignKey('candidates.id'), primary_key=True, index=True)
+    score = Column(Float, nullable=False)  # estimated resume text similarity, 1.0 for email/phone
+    reason = Column(String, nullable=False)  # email, phone or text
+    detected_at = Column(DateTime, default=datetime.utcnow)
+
 class Resume(Base):
     __tablename__ = 'resumes'
+    __table_args__ = (
+        Index('ix_resumes_created_at_id', 'created_at', 'id'),
+        Index('ix_resumes_candidate_id_created_at_id', 'candidate_id', 'created_at', 'id'),
+        Index('ix_resumes_career_level_years', 'career_level', 'total_years_experience'),
+    )
     
     id = Column(String, primary_key=True, default=generate_uuid)
     candidate_id = Column(String, ForeignKey('candidates.id'))
     file_path = Column(String, nullable=False)
     file_type = Column(String, nullable=False)
-    parsed_content = Column(String)
+    content_hash = Column(String(64), index=True)  # SHA-256 of the uploaded file
+    parsed_content = Column(JSONType)  # NULL until parsed
+    parser_version = Column(String, index=True)  # "<backend>:<version>" of the parse
+    extracted_text = Column(LargeBinary)  # zlib-compressed UTF-8 text
+    extractor_version = Column(String)
+    # Copied out of parsed_content so filters on them can use an index
+    total_years_experience = Column(Float)
+    career_level = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, onupdate=datetime.utcnow)
     
     candidate = relationship("Candidate", back_populates="resumes")
     tags = relationship("Tag", secondary=resume_tags, back_populates="resumes")
+    parse_jobs = relationship("ParseJob", back_populates="resume")
+    
+    @validates('parsed_content')
+    def _sync_parsed_fields(self, key, value):
+        value = decode_json(value) or None
+        content = value if isinstance(value, dict) else {}
+        self.total_years_experience = content.get('total_years_experience')
+        self.career_level = content.get('career_level')
+        return value
+
+class ParseJob(Base):
+    __tablename__ = 'parse_jobs'
+    __table_args__ = (
+        Index('ix_parse_jobs_status_created_at', 'status', 'created_at'),
+    )
+    
+    id = Column(String, primary_key=True, default=generate_uuid)
+    resume_id = Column(String, ForeignKey('resumes.id'), nullable=False, index=True)
+    status = Column(String, nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, onupdate=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    not_before = Column(DateTime)  # a retried job waits until then
+    
+    resume = relationship("Resume", back_populates="parse_jobs")
 
 class Tag(Base):
     __tablename__ = 'tags'
+    __table_args__ = (
+        Index('ix_tags_category_name_id', 'category', 'name', 'id'),
+    )
     
     id = Column(String, primary_key=True, default=generate_uuid)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, unique=True, index=True)
     category = Column(String, nullable=False)
+    updated_at = Column(DateTime, onupdate=datetime.utcnow)
     
     resumes = relationship("Resume", secondary=resume_tags, back_populates="tags")
     requirements = relationship("Requirement", secondary=requirement_tags, back_populates="tags")
 
 class Project(Base):
     __tablename__ = 'projects'
+    __table_args__ = (
+        Index('ix_projects_created_at_id', 'created_at', 'id'),
+        Index('ix_projects_status_created_at_id', 'status', 'created_at', 'id'),
+    )
     
     current_stage = Column(String)  # sourcing, interviewing, offer, onboarding
-    completed_stages = Column(String)  # JSON array of completed stage IDs
+    completed_stages = Column(JSONType)  # completed stage IDs
     
     id = Column(String, primary_key=True, default=generate_uuid)
     title = Column(String, nullable=False)
@@ -75,45 +194,108 @@ class Project(Base):
     remote_policy = Column(String, nullable=False)  # office, hybrid, remote
     salary_range = Column(String)
     description = Column(String, nullable=False)
-    responsibilities = Column(String, nullable=False)  # JSON string
-    qualifications = Column(String, nullable=False)  # JSON string
-    benefits = Column(String)  # JSON string
+    responsibilities = Column(JSONType, nullable=False)  # list of strings
+    qualifications = Column(JSONType, nullable=False)  # list of strings
+    benefits = Column(JSONType)  # list of strings
     priority = Column(String, default='normal')  # low, normal, high, urgent
     status = Column(String, nullable=False, default='draft')  # draft, open, in-progress, on-hold, closed
     target_date = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, onupdate=datetime.utcnow)
     
     requirements = relationship("Requirement", back_populates="project")
     interviews = relationship("Interview", back_populates="project")
+    
+    @validates('completed_stages', 'responsibilities', 'qualifications', 'benefits')
+    def _decode_json_fields(self, key, value):
+        # Empty text stood for no items in the required list columns, as the
+        # migration to JSON columns treated it
+        if value == '' and key in ('responsibilities', 'qualifications'):
+            return []
+        return decode_json_list(value)
 
 class Requirement(Base):
     __tablename__ = 'requirements'
+    __table_args__ = (
+        Index('ix_requirements_created_at_id', 'created_at', 'id'),
+        Index('ix_requirements_project_id_created_at_id', 'project_id', 'created_at', 'id'),
+    )
     
     id = Column(String, primary_key=True, default=generate_uuid)
     project_id = Column(String, ForeignKey('projects.id'))
     description = Column(String, nullable=False)
     is_required = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, onupdate=datetime.utcnow)
     
     project = relationship("Project", back_populates="requirements")
     tags = relationship("Tag", secondary=requirement_tags, back_populates="requirements")
 
 class Interview(Base):
     __tablename__ = 'interviews'
+    __table_args__ = (
+        Index('ix_interviews_created_at_id', 'created_at', 'id'),
+        Index('ix_interviews_project_id_created_at_id', 'project_id', 'created_at', 'id'),
+        Index('ix_interviews_candidate_id_created_at_id', 'candidate_id', 'created_at', 'id'),
+    )
     
     id = Column(String, primary_key=True, default=generate_uuid)
     project_id = Column(String, ForeignKey('projects.id'))
     candidate_id = Column(String, ForeignKey('candidates.id'))
-    scheduled_time = Column(DateTime, nullable=False)
+    scheduled_time = Column(DateTime, nullable=False, index=True)
     status = Column(String, nullable=False)  # scheduled, completed, cancelled
     interview_type = Column(String)  # technical, behavioral, culture
     technical_score = Column(Integer)
     communication_score = Column(Integer)
     culture_fit_score = Column(Integer)
     overall_rating = Column(Float)
-    feedback = Column(String)  # JSON string for detailed feedback
+    feedback = Column(JSONType)  # detailed feedback
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, onupdate=datetime.utcnow)
     
     project = relationship("Project", back_populates="interviews")
     candidate = relationship("Candidate", back_populates="interviews")
+    
+    @validates('feedback')
+    def _decode_feedback(self, key, value):
+        return decode_json(value)
+
+# Append-only log of the inserts, updates and deletes made through a Session,
+# written by the changes module; ``id`` is the change feed's sequence number
+class ChangeLog(Base):
+    __tablename__ = 'change_log'
+    # Never reuse the id of a pruned row, or a cursor would skip changes
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String, nullable=False)  # candidate, resume, project, requirement, interview, tag
+    entity_id = Column(String, nullable=False)
+    operation = Column(String, nullable=False)  # insert, update, delete
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+# Rollups behind /api/analytics, kept current by the analytics module: the
+# count and summed value of each metric, per dimension (a status, or a
+# project for feedback scores), by the day the counted rows were created...
+class AnalyticsDaily(Base):
+    __tablename__ = 'analytics_daily'
+    __table_args__ = (
+        PrimaryKeyConstraint('metric', 'day', 'dimension'),
+    )
+
+    metric = Column(String, nullable=False)  # project_status, interview_status, resume_parse, ...
+    day = Column(Date, nullable=False)
+    dimension = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+
+# ...and over all time
+class AnalyticsTotal(Base):
+    __tablename__ = 'analytics_totals'
+    __table_args__ = (
+        PrimaryKeyConstraint('metric', 'dimension'),
+    )
+
+    metric = Column(String, nullable=False)
+    dimension = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
@@ -8,6 +8,7 @@ class NotificationType(str, Enum):
     FEEDBACK_SUBMITTED = "feedback_submitted"
     OFFER_SENT = "offer_sent"
     ONBOARDING_STARTED = "onboarding_started"
+    BULK_IMPORT_COMPLETED = "bulk_import_completed"
 
 class NotificationService:
     def __init__(self):
@@ -16,7 +17,8 @@ class NotificationService:
             NotificationType.RESUME_RECEIVED: "收到新简历：{candidate_name}",
             NotificationType.FEEDBACK_SUBMITTED: "面试反馈已提交：{candidate_name}",
             NotificationType.OFFER_SENT: "Offer已发送：{candidate_name}",
-            NotificationType.ONBOARDING_STARTED: "入职流程已开始：{candidate_name}"
+            NotificationType.ONBOARDING_STARTED: "入职流程已开始：{candidate_name}",
+            NotificationType.BULK_IMPORT_COMPLETED: "批量导入简历完成：成功 {created} 份，失败 {failed} 份"
         }
     
     async def format_message(self, event_type: NotificationType, data: Dict[str, Any]) -> str:
@@ -0,0 +1,104 @@
+"""Keyset pagination for list endpoints.
+
+Pages are ordered by a unique sort key, (created_at, id) for most tables,
+and the next page starts strictly after the last row of the previous one.
+Unlike OFFSET, fetching a page costs the same however deep into the table it
+is. The cursor for the next page is returned in the ``X-Next-Cursor``
+response header, so list responses stay plain JSON arrays; it is absent on
+the last page.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import literal, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+@dataclass
+class PageParams:
+    limit: int
+    cursor: Optional[str]
+    created_after: Optional[datetime]
+    created_before: Optional[datetime]
+
+def page_params(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+) -> PageParams:
+    """FastAPI dependency for the paging and date-range query parameters."""
+    return PageParams(limit, cursor, created_after, created_before)
+
+def _encode_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, columns: Sequence) -> List[Any]:
+    """Decode a cursor into values for ``columns``.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("wrong number of values")
+        return [
+            datetime.fromisoformat(value) if column.type.python_type is datetime else value
+            for column, value in zip(columns, values)
+        ]
+    except (binascii.Error, ValueError, TypeError, NotImplementedError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+def paginate(
+    query,
+    response: Response,
+    params: PageParams,
+    order_by: Sequence,
+    descending: bool = True,
+) -> list:
+    """Return one page of ``query`` and set the next-page cursor header.
+
+    Args:
+        query: ORM query with the endpoint's filters applied
+        response: Response whose headers receive the next cursor
+        params: Paging parameters from :func:`page_params`
+        order_by: Columns forming a unique sort key, e.g. (created_at, id)
+        descending: Newest first when ordering by created_at
+
+    The created_after/created_before range applies to the first ``order_by``
+    column.
+    """
+    created_column = order_by[0]
+    if params.created_after is not None:
+        query = query.filter(created_column >= params.created_after)
+    if params.created_before is not None:
+        query = query.filter(created_column < params.created_before)
+    if params.cursor:
+        key = tuple_(*order_by)
+        values = tuple_(*[
+            literal(value, column.type) for column, value in zip(order_by, decode_cursor(params.cursor, order_by))
+        ])
+        query = query.filter(key < values if descending else key > values)
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in order_by])
+    # One extra row tells whether there is a next page
+    rows = query.limit(params.limit + 1).all()
+    if len(rows) > params.limit:
+        rows = rows[:params.limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            [getattr(last, column.key) for column in order_by]
+        )
+    return rows
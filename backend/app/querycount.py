@@ -0,0 +1,143 @@
+"""Count SQL statements, to keep endpoints within a fixed query budget.
+
+Usage from a test or a debugging session::
+
+    with assert_max_queries(database.engine, 3):
+        client.get("/api/resumes/?limit=500")
+
+A budget that holds for 500 rows as well as for 5 means the endpoint has no
+N+1 lazy loads. Every statement on the engine is counted, so background
+parse workers should be idle while measuring.
+
+``python -m app.querycount`` runs that check for the tagged list endpoints
+on a scratch in-memory database, at a small and a full page of rows. The
+exit status is 1 if any endpoint went over its budget.
+"""
+import sys
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from . import database, models
+from .pagination import MAX_PAGE_SIZE
+
+# List endpoint -> queries allowed per page: the page itself and one
+# selectin load of the tags
+LIST_BUDGETS: Dict[str, int] = {
+    "/api/resumes/": 2,
+    "/api/requirements/": 2,
+}
+TAGS_PER_ROW = 3
+
+class QueryCounter:
+    def __init__(self, engine: Engine, ignore: Optional[Callable[[str], bool]] = None):
+        self.engine = engine
+        self.ignore = ignore
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.ignore is None or not self.ignore(statement):
+            self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+@contextmanager
+def assert_max_queries(
+    engine: Engine, budget: int, ignore: Optional[Callable[[str], bool]] = None
+) -> Iterator[QueryCounter]:
+    """Fail with the executed statements if the block runs more than ``budget`` queries."""
+    with QueryCounter(engine, ignore) as counter:
+        yield counter
+    if counter.count > budget:
+        statements = "\n".join(f"  {statement}" for statement in counter.statements)
+        raise AssertionError(f"{counter.count} queries executed, budget is {budget}:\n{statements}")
+
+def _seed(engine: Engine, rows: int) -> None:
+    """``rows`` tagged resumes and requirements, written without session events."""
+    now = datetime(2026, 1, 1)
+    tags = [{"id": str(uuid.uuid4()), "name": f"skill{i}", "category": "skill"} for i in range(TAGS_PER_ROW * 4)]
+    candidate = {"id": str(uuid.uuid4()), "name": "Sample", "email": "sample@example.com", "created_at": now}
+    project = {
+        "id": str(uuid.uuid4()), "title": "Sample", "department": "Eng", "headcount": 1, "job_type": "full-time",
+        "job_level": "mid", "location": "Remote", "remote_policy": "remote", "description": "Sample",
+        "responsibilities": [], "qualifications": [], "status": "open", "target_date": now, "created_at": now,
+    }
+    resumes, requirements, resume_tags, requirement_tags = [], [], [], []
+    for number in range(rows):
+        created = now + timedelta(seconds=number)
+        resume_id, requirement_id = str(uuid.uuid4()), str(uuid.uuid4())
+        resumes.append({
+            "id": resume_id, "candidate_id": candidate["id"], "file_path": "sample", "file_type": "text/plain",
+            "created_at": created,
+        })
+        requirements.append({
+            "id": requirement_id, "project_id": project["id"], "description": "Sample", "created_at": created,
+        })
+        for tag in tags[number % 4 * TAGS_PER_ROW:][:TAGS_PER_ROW]:
+            resume_tags.append({"resume_id": resume_id, "tag_id": tag["id"]})
+            requirement_tags.append({"requirement_id": requirement_id, "tag_id": tag["id"]})
+    with engine.begin() as connection:
+        connection.execute(insert(models.Tag.__table__), tags)
+        connection.execute(insert(models.Candidate.__table__), [candidate])
+        connection.execute(insert(models.Project.__table__), [project])
+        connection.execute(insert(models.Resume.__table__), resumes)
+        connection.execute(insert(models.Requirement.__table__), requirements)
+        connection.execute(insert(models.resume_tags), resume_tags)
+        connection.execute(insert(models.requirement_tags), requirement_tags)
+
+def check(page_sizes: Tuple[int, ...] = (5, MAX_PAGE_SIZE)) -> List[Tuple[str, int, int]]:
+    """(endpoint, page size, queries) for every list page over its budget."""
+    from fastapi.testclient import TestClient
+    from .main import app
+
+    over = []
+    for size in page_sizes:
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        models.Base.metadata.create_all(engine)
+        _seed(engine, size)
+        sessions = sessionmaker(bind=engine)
+
+        def get_db():
+            with sessions() as db:
+                yield db
+
+        app.dependency_overrides[database.get_db] = get_db
+        try:
+            # Without a ``with`` block the app's startup (parse workers) does not run
+            client = TestClient(app)
+            for path, budget in LIST_BUDGETS.items():
+                with QueryCounter(engine) as counter:
+                    response = client.get(path, params={"limit": size})
+                if response.status_code != 200 or len(response.json()) != size:
+                    raise AssertionError(f"{path}: unexpected response {response.status_code}")
+                if counter.count > budget:
+                    over.append((path, size, counter.count))
+        finally:
+            app.dependency_overrides.pop(database.get_db, None)
+            engine.dispose()
+    return over
+
+def main() -> int:
+    over = check()
+    for path, size, count in over:
+        print(f"{path} with {size} rows: {count} queries, budget is {LIST_BUDGETS[path]}")
+    print(f"{len(LIST_BUDGETS) - len({path for path, _, _ in over})}/{len(LIST_BUDGETS)} list endpoints within budget")
+    return 1 if over else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Query-plan check for the API's hot queries.
+
+Runs EXPLAIN for the lookups and list pages the endpoints issue and reports
+any that scan a whole table or sort instead of walking an index. Run it
+against a migrated database after schema or query changes::
+
+    python -m app.queryplan
+
+The exit status is 1 if any query regressed. On PostgreSQL sequential scans
+are disabled for the check, so a Seq Scan in the plan means no usable index
+exists rather than that the planner preferred one for a small table.
+"""
+import sys
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import literal, or_, select, text, tuple_
+from sqlalchemy.engine import Engine
+
+from . import database, models
+
+SAMPLE_ID = "00000000-0000-0000-0000-000000000000"
+SAMPLE_TIME = "2026-01-01 00:00:00"
+PAGE = 100
+
+def _page(model, *filters):
+    """A keyset page as built by pagination.paginate, past a sample cursor."""
+    key = tuple_(model.created_at, model.id)
+    return select(model.id).where(
+        *filters, key < tuple_(literal(SAMPLE_TIME), literal(SAMPLE_ID))
+    ).order_by(model.created_at.desc(), model.id.desc()).limit(PAGE + 1)
+
+# Query name -> (index the plan should use, statement builder). The
+# association tables' primary keys are named per dialect, so those lookups
+# are only checked for scans.
+HOT_QUERIES: Dict[str, Tuple[Optional[str], Callable]] = {
+    "candidates page": ("ix_candidates_created_at_id", lambda: _page(models.Candidate)),
+    "candidate by email": ("ix_candidates_email", lambda: select(models.Candidate.id).where(
+        models.Candidate.email == "a@example.com"
+    )),
+    "candidates with skill": ("ix_candidate_skills_kind_skill_candidate_id", lambda: select(
+        models.candidate_skills.c.candidate_id
+    ).where(models.candidate_skills.c.kind == "technical", models.candidate_skills.c.skill == "python")),
+    "candidates by level and experience": ("ix_candidates_career_level_years", lambda: select(models.Candidate.id).where(
+        models.Candidate.career_level == "senior", models.Candidate.total_years_experience >= 5
+    )),
+    "resumes page": ("ix_resumes_created_at_id", lambda: _page(models.Resume)),
+    "resumes of candidate": ("ix_resumes_candidate_id_created_at_id", lambda: _page(
+        models.Resume, models.Resume.candidate_id == SAMPLE_ID
+    )),
+    "resumes by content hash": ("ix_resumes_content_hash", lambda: select(models.Resume.id).where(
+        models.Resume.content_hash == "0" * 64
+    )),
+    "resumes by level and experience": ("ix_resumes_career_level_years", lambda: select(models.Resume.id).where(
+        models.Resume.career_level == "senior", models.Resume.total_years_experience >= 5
+    )),
+    "projects page": ("ix_projects_created_at_id", lambda: _page(models.Project)),
+    "projects by status": ("ix_projects_status_created_at_id", lambda: _page(
+        models.Project, models.Project.status == "open"
+    )),
+    "requirements of project": ("ix_requirements_project_id_created_at_id", lambda: _page(
+        models.Requirement, models.Requirement.project_id == SAMPLE_ID
+    )),
+    "interviews of project": ("ix_interviews_project_id_created_at_id", lambda: _page(
+        models.Interview, models.Interview.project_id == SAMPLE_ID
+    )),
+    "interviews of candidate": ("ix_interviews_candidate_id_created_at_id", lambda: _page(
+        models.Interview, models.Interview.candidate_id == SAMPLE_ID
+    )),
+    "interviews in time range": ("ix_interviews_scheduled_time", lambda: select(models.Interview.id).where(
+        models.Interview.scheduled_time >= literal(SAMPLE_TIME),
+        models.Interview.scheduled_time < literal("2026-02-01 00:00:00")
+    )),
+    "tags by name": ("ix_tags_name", lambda: select(models.Tag.id).where(models.Tag.name.in_(["Python", "Go"]))),
+    "tags page by category": ("ix_tags_category_name_id", lambda: select(models.Tag.id).where(
+        models.Tag.category == "skill",
+        tuple_(models.Tag.name, models.Tag.id) > tuple_(literal("a"), literal(SAMPLE_ID))
+    ).order_by(models.Tag.name, models.Tag.id).limit(PAGE + 1)),
+    "tags of resumes": (None, lambda: select(models.resume_tags).where(
+        models.resume_tags.c.resume_id.in_([SAMPLE_ID])
+    )),
+    "resumes of tag": ("ix_resume_tags_tag_id", lambda: select(models.resume_tags).where(
+        models.resume_tags.c.tag_id == SAMPLE_ID
+    )),
+    "tags of requirements": (None, lambda: select(models.requirement_tags).where(
+        models.requirement_tags.c.requirement_id.in_([SAMPLE_ID])
+    )),
+    "requirement tags of project": ("ix_requirements_project_id_created_at_id", lambda: select(
+        models.Requirement.id, models.requirement_tags.c.tag_id
+    ).join(
+        models.requirement_tags, models.requirement_tags.c.requirement_id == models.Requirement.id
+    ).where(models.Requirement.project_id == SAMPLE_ID)),
+    "candidate by email or phone key": (None, lambda: select(models.Candidate.id).where(or_(
+        models.Candidate.email_key == "a@example.com", models.Candidate.phone_key == "1380000000"
+    ))),
+    "duplicate candidates": ("ix_candidate_duplicates_score", lambda: select(models.CandidateDuplicate).order_by(
+        models.CandidateDuplicate.score.desc(), models.CandidateDuplicate.candidate_id.desc(),
+        models.CandidateDuplicate.duplicate_id.desc()
+    ).limit(100)),
+    "change feed page": (None, lambda: select(models.ChangeLog.id, models.ChangeLog.entity_id).where(
+        models.ChangeLog.id > 1000
+    ).order_by(models.ChangeLog.id).limit(PAGE + 1)),
+    "analytics period": (None, lambda: select(models.AnalyticsDaily).where(
+        models.AnalyticsDaily.metric.in_(["project_status", "interview_status"]),
+        models.AnalyticsDaily.day >= "2026-01-01"
+    )),
+    "queued parse jobs": ("ix_parse_jobs_status_created_at", lambda: select(models.ParseJob.id).where(
+        models.ParseJob.status == "queued"
+    ).order_by(models.ParseJob.created_at).limit(1)),
+}
+
+def explain(connection, statement) -> List[str]:
+    """Plan lines for ``statement`` on the connection's dialect."""
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "sqlite":
+        return [row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    return [row[0] for row in connection.execute(text(f"EXPLAIN {sql}"))]
+
+def problems(dialect: str, plan: List[str], index: Optional[str] = None) -> List[str]:
+    """Plan lines showing a full table scan or a sort, or a missing ``index``.
+
+    A plan can avoid both and still be slow, e.g. walking the created_at
+    index of every resume to find one candidate's, hence the expected index.
+    """
+    found = []
+    for line in plan:
+        if dialect == "sqlite":
+            # "SCAN resumes USING INDEX ..." walks an index; "SCAN resumes"
+            # reads every row
+            if line.startswith("SCAN ") and " USING " not in line:
+                found.append(line)
+            elif "USE TEMP B-TREE FOR ORDER BY" in line:
+                found.append(line)
+        elif "Seq Scan" in line or line.strip().startswith("Sort "):
+            found.append(line.strip())
+    if index is not None and not any(index in line for line in plan):
+        found.append(f"{index} not used")
+    return found
+
+def check(engine: Engine = database.engine) -> List[Tuple[str, List[str]]]:
+    """Return ``(query name, offending plan lines)`` for each regressed query."""
+    regressions = []
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SET enable_seqscan = off"))
+        for name, (index, build) in HOT_QUERIES.items():
+            found = problems(connection.dialect.name, explain(connection, build()), index)
+            if found:
+                regressions.append((name, found))
+        connection.rollback()
+    return regressions
+
+def main() -> int:
+    regressions = check()
+    for name, lines in regressions:
+        print(f"{name}: " + "; ".join(lines))
+    print(f"{len(HOT_QUERIES) - len(regressions)}/{len(HOT_QUERIES)} hot queries use an index")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
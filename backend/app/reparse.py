@@ -0,0 +1,347 @@
+"""Re-parse stored resumes, e.g. after a prompt or schema change.
+
+Usage::
+
+    python -m app.reparse --outdated --workers 8 --rate 120
+    python -m app.reparse --failed --since 2026-01-01 --checkpoint failed.json
+
+Resumes are selected in (created_at, id) order and parsed by a pool of
+asyncio workers, limited to ``--rate`` resumes per minute on top of the LLM
+gateway's own limits. Stored extracted text is used where available, so
+throughput is bounded by the parser rather than by PDF extraction. A resume
+whose file (same content hash) was already parsed by the current parser
+version copies that result instead of being parsed again.
+
+Progress is written to a checkpoint file after every batch of finished
+resumes; running the same command again continues after the last resume
+that was finished with all earlier ones. Resumes with a queued or running
+parse job are skipped, as the API's parse workers own them.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, func, or_, select
+
+from . import database, llm, models
+from .extraction import extraction_engine
+from .jobs import JobStatus, apply_parse_result, copy_parse_result, load_text, store_text
+from .llm_gateway import TokenBucket
+
+REPARSE_BATCH_SIZE = int(os.getenv("REPARSE_BATCH_SIZE", "200"))
+REPARSE_CHECKPOINT_INTERVAL = float(os.getenv("REPARSE_CHECKPOINT_INTERVAL", "10"))
+
+Key = Tuple[datetime, str]
+
+@dataclass
+class Filters:
+    failed: bool = False
+    unparsed: bool = False
+    outdated: bool = False
+    all: bool = False
+    since: Optional[str] = None
+    until: Optional[str] = None
+
+@dataclass
+class Checkpoint:
+    filters: Dict
+    cursor: Optional[Tuple[str, str]] = None  # (created_at ISO, id) of the last finished resume
+    succeeded: int = 0
+    failed: int = 0
+    reused: int = 0
+    started_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed + self.reused
+
+    def save(self, path: str) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(asdict(self), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Checkpoint"]:
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        data["cursor"] = tuple(data["cursor"]) if data.get("cursor") else None
+        return cls(**data)
+
+def _unparsed():
+    return models.Resume.parsed_content.is_(None)
+
+def build_query(filters: Filters):
+    """SELECT of (created_at, id) for the resumes matching ``filters``."""
+    query = select(models.Resume.created_at, models.Resume.id).where(
+        ~exists().where(
+            models.ParseJob.resume_id == models.Resume.id,
+            models.ParseJob.status.in_([JobStatus.QUEUED.value, JobStatus.RUNNING.value])
+        )
+    )
+    conditions = []
+    if filters.failed:
+        conditions.append(and_(_unparsed(), exists().where(
+            models.ParseJob.resume_id == models.Resume.id,
+            models.ParseJob.status == JobStatus.FAILED.value
+        )))
+    if filters.unparsed:
+        conditions.append(_unparsed())
+    if filters.outdated:
+        current = f":{llm.PARSER_VERSION}"
+        conditions.append(and_(~_unparsed(), or_(
+            models.Resume.parser_version.is_(None),
+            ~models.Resume.parser_version.endswith(current)
+        )))
+    if conditions and not filters.all:
+        query = query.where(or_(*conditions))
+    if filters.since:
+        query = query.where(models.Resume.created_at >= datetime.fromisoformat(filters.since))
+    if filters.until:
+        query = query.where(models.Resume.created_at < datetime.fromisoformat(filters.until))
+    return query
+
+def after(query, cursor: Optional[Key]):
+    if cursor is None:
+        return query
+    created_at, resume_id = cursor
+    return query.where(or_(
+        models.Resume.created_at > created_at,
+        and_(models.Resume.created_at == created_at, models.Resume.id > resume_id)
+    ))
+
+class Reparser:
+    def __init__(self, filters: Filters, checkpoint: Checkpoint, checkpoint_path: str,
+                 workers: int, rate: float, batch_size: int = REPARSE_BATCH_SIZE,
+                 limit: Optional[int] = None):
+        self.filters = filters
+        self.checkpoint = checkpoint
+        self.checkpoint_path = checkpoint_path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.limit = limit
+        # Small capacity so a restart does not burst a minute's worth of calls
+        self._rate = TokenBucket(rate, capacity=max(1, workers)) if rate > 0 else None
+        self._inflight: "OrderedDict[Key, bool]" = OrderedDict()
+        self._last_saved = time.monotonic()
+        self._started = time.monotonic()
+        self._done_this_run = 0
+        self.total = 0
+
+    def _cursor(self) -> Optional[Key]:
+        cursor = self.checkpoint.cursor
+        if cursor is None:
+            return None
+        return datetime.fromisoformat(cursor[0]), cursor[1]
+
+    def count(self) -> int:
+        with database.SessionLocal() as db:
+            query = after(build_query(self.filters), self._cursor())
+            return db.execute(select(func.count()).select_from(query.subquery())).scalar()
+
+    def _fetch(self, cursor: Optional[Key]) -> List[Key]:
+        with database.SessionLocal() as db:
+            query = after(build_query(self.filters), cursor).order_by(
+                models.Resume.created_at, models.Resume.id
+            ).limit(self.batch_size)
+            return [tuple(row) for row in db.execute(query)]
+
+    async def run(self) -> None:
+        self.total = await asyncio.to_thread(self.count)
+        if self.limit is not None:
+            self.total = min(self.total, self.limit)
+        print(f"{self.total} resumes to re-parse ({self.checkpoint.processed} done before)")
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        tasks = [asyncio.create_task(self._worker(queue)) for _ in range(self.workers)]
+        try:
+            await self._produce(queue)
+            await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._save()
+            self._report(final=True)
+
+    async def _produce(self, queue: asyncio.Queue) -> None:
+        cursor = self._cursor()
+        queued = 0
+        while self.limit is None or queued < self.limit:
+            keys = await asyncio.to_thread(self._fetch, cursor)
+            if not keys:
+                return
+            for key in keys:
+                if self.limit is not None and queued >= self.limit:
+                    return
+                self._inflight[key] = False
+                await queue.put(key)
+                queued += 1
+            cursor = keys[-1]
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            key = await queue.get()
+            try:
+                result = await self._process(key[1])
+            except Exception as e:
+                print(f"Re-parse of resume {key[1]} failed: {e}")
+                result = "failed"
+            finally:
+                queue.task_done()
+            setattr(self.checkpoint, result, getattr(self.checkpoint, result) + 1)
+            self._finish(key)
+
+    async def _process(self, resume_id: str) -> str:
+        """Re-parse one resume; returns the checkpoint counter to bump."""
+        source_id, file_path, file_type, text = await asyncio.to_thread(self._load, resume_id)
+        if source_id is not None:
+            await asyncio.to_thread(self._copy, source_id, resume_id)
+            return "reused"
+        if text is None:
+            text = await extraction_engine.extract(file_path, file_type)
+            await asyncio.to_thread(self._store_text, resume_id, text)
+        if self._rate:
+            await self._rate.acquire(1)
+        outcome = await llm.parse_text(text)
+        if "error" in outcome.data:
+            await asyncio.to_thread(self._record, resume_id, None, outcome.data["error"])
+            return "failed"
+        await asyncio.to_thread(self._record, resume_id, outcome, None)
+        return "succeeded"
+
+    def _load(self, resume_id: str):
+        with database.SessionLocal() as db:
+            resume = db.get(models.Resume, resume_id)
+            source_id = None
+            if resume.content_hash:
+                source_id = db.scalar(select(models.Resume.id).where(
+                    models.Resume.content_hash == resume.content_hash,
+                    models.Resume.id != resume.id,
+                    models.Resume.parser_version.endswith(f":{llm.PARSER_VERSION}"),
+                    ~_unparsed()
+                ).limit(1))
+            text = None if source_id else load_text(db, resume)
+            return source_id, resume.file_path, resume.file_type, text
+
+    def _copy(self, source_id: str, resume_id: str) -> None:
+        with database.SessionLocal() as db:
+            resume = db.get(models.Resume, resume_id)
+            copy_parse_result(db.get(models.Resume, source_id), resume)
+            db.add(self._job(resume, JobStatus.SUCCEEDED, None))
+            db.commit()
+
+    def _store_text(self, resume_id: str, text: str) -> None:
+        with database.SessionLocal() as db:
+            store_text(db.get(models.Resume, resume_id), text)
+            db.commit()
+
+    def _record(self, resume_id: str, outcome: Optional[llm.ParseOutcome], error: Optional[str]) -> None:
+        """Store the new parse, or only a failed job (keeping the previous parse)."""
+        with database.SessionLocal() as db:
+            resume = db.get(models.Resume, resume_id)
+            if outcome is not None:
+                apply_parse_result(db, resume, outcome.data, outcome.parser_version, replace_tags=True)
+                db.add(self._job(resume, JobStatus.SUCCEEDED, None))
+            else:
+                db.add(self._job(resume, JobStatus.FAILED, error))
+            db.commit()
+
+    def _job(self, resume: models.Resume, status: JobStatus, error: Optional[str]) -> models.ParseJob:
+        now = datetime.utcnow()
+        return models.ParseJob(
+            resume=resume, status=status.value, attempts=1, error=error,
+            started_at=now, finished_at=now
+        )
+
+    def _finish(self, key: Key) -> None:
+        self._inflight[key] = True
+        self._done_this_run += 1
+        # The checkpoint only moves past resumes finished together with all
+        # earlier ones, so a crash re-does at most the in-flight window
+        while self._inflight and next(iter(self._inflight.values())):
+            done_key, _ = self._inflight.popitem(last=False)
+            self.checkpoint.cursor = (done_key[0].isoformat(), done_key[1])
+        if time.monotonic() - self._last_saved >= REPARSE_CHECKPOINT_INTERVAL:
+            self._save()
+            self._report()
+
+    def _save(self) -> None:
+        self.checkpoint.save(self.checkpoint_path)
+        self._last_saved = time.monotonic()
+
+    def _report(self, final: bool = False) -> None:
+        elapsed = time.monotonic() - self._started
+        rate = self._done_this_run / elapsed * 60 if elapsed > 0 else 0.0
+        remaining = max(0, self.total - self._done_this_run)
+        eta = f"{remaining / rate:.1f} min" if rate > 0 else "unknown"
+        checkpoint = self.checkpoint
+        print(
+            f"{'Finished' if final else 'Progress'}: {self._done_this_run}/{self.total} "
+            f"(ok {checkpoint.succeeded}, reused {checkpoint.reused}, failed {checkpoint.failed}), "
+            f"{rate:.1f} resumes/min, ETA {eta}"
+        )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.reparse", description="Re-parse stored resumes.")
+    parser.add_argument("--failed", action="store_true", help="resumes whose parse job failed")
+    parser.add_argument("--unparsed", action="store_true", help="resumes without parsed content")
+    parser.add_argument("--outdated", action="store_true",
+                        help=f"resumes parsed by a parser version other than {llm.PARSER_VERSION}")
+    parser.add_argument("--all", action="store_true", help="every resume in the date range")
+    parser.add_argument("--since", help="uploaded on or after this ISO date")
+    parser.add_argument("--until", help="uploaded before this ISO date")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=60, help="resumes per minute, 0 for no limit")
+    parser.add_argument("--batch-size", type=int, default=REPARSE_BATCH_SIZE)
+    parser.add_argument("--limit", type=int, help="stop after this many resumes")
+    parser.add_argument("--checkpoint", default="reparse-checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="only count matching resumes")
+    args = parser.parse_args(argv)
+
+    filters = Filters(
+        failed=args.failed, unparsed=args.unparsed, outdated=args.outdated,
+        all=args.all, since=args.since, until=args.until
+    )
+    if not (filters.failed or filters.unparsed or filters.outdated or filters.all):
+        parser.error("choose at least one of --failed, --unparsed, --outdated or --all")
+    for value in (filters.since, filters.until):
+        if value:
+            try:
+                datetime.fromisoformat(value)
+            except ValueError:
+                parser.error(f"invalid ISO date: {value}")
+
+    checkpoint = None if args.restart else Checkpoint.load(args.checkpoint)
+    if checkpoint is not None and checkpoint.filters != asdict(filters):
+        parser.error(f"{args.checkpoint} was written for other filters; use --restart or another --checkpoint")
+    if checkpoint is None:
+        checkpoint = Checkpoint(filters=asdict(filters))
+
+    reparser = Reparser(
+        filters, checkpoint, args.checkpoint, workers=args.workers, rate=args.rate,
+        batch_size=args.batch_size, limit=args.limit
+    )
+    if args.dry_run:
+        print(f"{reparser.count()} resumes match")
+        return 0
+    try:
+        asyncio.run(reparser.run())
+    except KeyboardInterrupt:
+        print(f"Interrupted; progress saved to {args.checkpoint}")
+        return 130
+    finally:
+        extraction_engine.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
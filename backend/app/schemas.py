@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr, Field
-from datetime import datetime
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
 from uuid import UUID
+import json
 
 class TagBase(BaseModel):
     name: str
@@ -12,6 +13,7 @@ class TagCreate(TagBase):
 
 class Tag(TagBase):
     id: UUID
+    updated_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -26,11 +28,27 @@ class CandidateCreate(CandidateBase):
 
 class Candidate(CandidateBase):
     id: UUID
+    total_years_experience: Optional[float] = None
+    career_level: Optional[str] = None
     created_at: datetime
+    updated_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
+class CandidateDuplicate(BaseModel):
+    candidate_id: UUID  # the older candidate, to keep when merging
+    duplicate_id: UUID
+    score: float
+    reason: str  # email, phone or text
+    detected_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class CandidateMerge(BaseModel):
+    duplicate_ids: List[UUID] = Field(..., min_length=1)
+
 class ExperienceEntry(BaseModel):
     company: str
     title: str
@@ -79,10 +97,86 @@ class Resume(ResumeBase):
     id: UUID
     file_path: str
     parsed_content: Optional[ParsedResumeContent] = None
+    total_years_experience: Optional[float] = None
+    career_level: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     tags: List[Tag] = []
     
+    @field_validator("parsed_content", mode="before")
+    @classmethod
+    def decode_parsed_content(cls, value):
+        # NULL marks a resume that is not parsed yet
+        return value or None
+    
+    class Config:
+        from_attributes = True
+
+class CandidateMatch(BaseModel):
+    candidate_id: UUID
+    name: Optional[str] = None
+    score: float  # 0-1, higher is a better match
+    skill_score: float  # weighted share of the requirement tags the candidate has
+    experience_score: float  # years of experience relative to the job level, capped at 1
+    matched_tags: List[str]
+    
+    class Config:
+        from_attributes = True
+
+class SimilarityQuery(BaseModel):
+    # The query document: free text, or a stored resume, requirement or project
+    text: Optional[str] = Field(default=None, max_length=100000)
+    resume_id: Optional[UUID] = None
+    requirement_id: Optional[UUID] = None
+    project_id: Optional[UUID] = None
+    kind: str = Field(default="resume", pattern="^(resume|requirement|project)$")  # kind of documents returned
+    limit: int = Field(default=20, ge=1, le=500)
+
+class SimilarDocument(BaseModel):
+    kind: str
+    id: UUID
+    score: float  # cosine similarity, higher is more similar
+    candidate_id: Optional[UUID] = None  # for resumes
+
+class ResumeSearchHit(BaseModel):
+    resume_id: UUID
+    candidate_id: Optional[UUID] = None
+    score: float  # higher is more relevant
+    highlight: str  # excerpt with matches wrapped in <mark></mark>, not HTML-escaped
+    
+    class Config:
+        from_attributes = True
+
+class ResumeUploadResponse(Resume):
+    parse_job_id: UUID
+    parse_status: str
+
+class BulkImportItem(BaseModel):
+    filename: str
+    status: str = "pending"  # created, failed
+    candidate_id: Optional[UUID] = None
+    resume_id: Optional[UUID] = None
+    parse_job_id: Optional[UUID] = None
+    parse_status: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkImportResult(BaseModel):
+    total: int
+    created: int
+    failed: int
+    results: List[BulkImportItem]
+
+class ParseJobStatus(BaseModel):
+    id: UUID
+    resume_id: UUID
+    status: str  # queued, running, succeeded, failed
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    not_before: Optional[datetime] = None  # when a failed job is retried
+    
     class Config:
         from_attributes = True
 
@@ -101,6 +195,14 @@ class ProjectBase(BaseModel):
     benefits: Optional[str] = None  # JSON string
     priority: str = 'normal'  # low, normal, high, urgent
     target_date: datetime
+    
+    @field_validator("responsibilities", "qualifications", "benefits", mode="before")
+    @classmethod
+    def encode_json_list(cls, value):
+        # Stored as JSON columns; the API keeps exchanging JSON strings
+        if value is None or isinstance(value, str):
+            return value
+        return json.dumps(value, ensure_ascii=False)
 
 class ProjectCreate(ProjectBase):
     pass
@@ -112,6 +214,16 @@ class Project(ProjectBase):
     id: UUID
     status: str  # draft, open, in-progress, on-hold, closed
     created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    @field_validator("responsibilities", "qualifications", "benefits", mode="before")
+    @classmethod
+    def encode_json_list(cls, value):
+        # Loaded from the JSON columns, where even a stored string must go
+        # out as JSON text
+        if value is None:
+            return value
+        return json.dumps(value, ensure_ascii=False)
     
     class Config:
         from_attributes = True
@@ -127,6 +239,7 @@ class RequirementCreate(RequirementBase):
 class Requirement(RequirementBase):
     id: UUID
     created_at: datetime
+    updated_at: Optional[datetime] = None
     tags: List[Tag] = []
     
     class Config:
@@ -160,3 +273,43 @@ class Interview(InterviewBase):
     
     class Config:
         from_attributes = True
+
+class EntityChange(BaseModel):
+    seq: int
+    entity: str  # candidate, resume, project, requirement, interview, tag
+    id: UUID
+    operation: str  # insert, update, delete
+    data: Optional[Dict[str, Any]] = None  # current state as the list endpoint returns it; None when deleted
+
+class ChangeFeed(BaseModel):
+    cursor: int  # pass as ``since`` on the next poll
+    changes: List[EntityChange]
+    has_more: bool
+
+class AnalyticsPeriod(BaseModel):
+    """Rollups of the projects, interviews, resumes and parse jobs created in a period."""
+    start: Optional[date] = None  # None for all time
+    end: Optional[date] = None
+    projects: Dict[str, int]  # by status
+    interviews: Dict[str, int]  # by status
+    parse_jobs: Dict[str, int]  # succeeded, failed, pending
+    resumes: int
+    parsed_resumes: int
+    parse_success_rate: Optional[float] = None  # parsed_resumes / resumes
+    interview_completion_rate: Optional[float] = None  # completed / all interviews
+    average_cycle_days: Optional[float] = None  # closed projects, creation to last update
+
+class ProjectScores(BaseModel):
+    project_id: UUID
+    scored_interviews: int
+    technical_score: Optional[float] = None
+    communication_score: Optional[float] = None
+    culture_fit_score: Optional[float] = None
+    overall_rating: Optional[float] = None
+
+class Analytics(BaseModel):
+    days: int
+    current: AnalyticsPeriod  # the last ``days`` days
+    previous: AnalyticsPeriod  # the ``days`` days before them
+    all_time: AnalyticsPeriod
+    project_scores: List[ProjectScores]  # average interview feedback per project
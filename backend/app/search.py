@@ -0,0 +1,344 @@
+"""Full-text search over resumes.
+
+Each resume is indexed as one document: its extracted text followed by the
+titles, companies and achievements of its parsed experience. SQLite uses an
+FTS5 table (porter stemming), with ``resume_search_docs`` mapping FTS rowids
+to resume ids. PostgreSQL uses a table with a generated ``tsvector`` column
+under a GIN index.
+
+A resume is re-indexed in the same transaction whenever a flush changes its
+extracted text or parsed content, so uploads, background parses and
+re-parses keep the index current. Resumes stored before the index existed
+are added with::
+
+    python -m app.search --rebuild
+
+Queries use web-search syntax: plain words must all match, "quoted phrases"
+match as phrases, ``or`` between words matches either and ``-word`` excludes.
+Results are ranked by BM25 (SQLite) or ts_rank_cd (PostgreSQL) and paged
+with a (score, tie-break) cursor.
+"""
+import argparse
+import os
+import re
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from fastapi import Response
+from sqlalchemy import Float, Integer, String, column, event, inspect, select, table, text
+from sqlalchemy.orm import Session
+
+from . import database, models
+from .extraction import decompress_text
+from .pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+# On SQLite, queries matching more resumes than this rank only the most
+# recently indexed ones, bounding the cost of very common terms
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "50000"))
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+SQLITE_DDL = [
+    "CREATE TABLE IF NOT EXISTS resume_search_docs ("
+    "id INTEGER PRIMARY KEY, resume_id VARCHAR NOT NULL UNIQUE REFERENCES resumes (id))",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS resume_search USING fts5(body, tokenize = 'porter unicode61')",
+]
+POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS resume_search ("
+    "resume_id VARCHAR PRIMARY KEY REFERENCES resumes (id) ON DELETE CASCADE, "
+    "body TEXT NOT NULL, "
+    "document tsvector GENERATED ALWAYS AS (to_tsvector('english', body)) STORED)",
+    "CREATE INDEX IF NOT EXISTS ix_resume_search_document ON resume_search USING GIN (document)",
+]
+
+# Session.info keys for resumes to re-index after the current flush
+_CHANGED_KEY = "search_changed_resumes"
+_DELETED_KEY = "search_deleted_resumes"
+
+# Lightweight handles on the tables above, which are not ORM models
+_DOCS = table("resume_search_docs", column("id"), column("resume_id"))
+_FTS = table("resume_search", column("rowid"))
+
+
+_QUERY_TOKEN = re.compile(r'(-?)"([^"]*)"|(-?)(\S+)')
+_WORD = re.compile(r"\w+")
+
+@dataclass
+class SearchHit:
+    resume_id: str
+    candidate_id: Optional[str]
+    score: float
+    highlight: str
+    sort_key: Union[int, str]  # tie-break within a score, for the page cursor
+
+def supports(dialect: str) -> bool:
+    return dialect in ("sqlite", "postgresql")
+
+def create_index(connection) -> None:
+    """Create the search tables for the connection's dialect, if missing."""
+    dialect = connection.dialect.name
+    if not supports(dialect):
+        return
+    for statement in SQLITE_DDL if dialect == "sqlite" else POSTGRES_DDL:
+        connection.execute(text(statement))
+
+@event.listens_for(models.Base.metadata, "after_create")
+def _create_index_with_tables(target, connection, **kw):
+    create_index(connection)
+
+def resume_document(resume: models.Resume) -> str:
+    """Text indexed for ``resume``; empty if it has neither text nor a parse."""
+    parts = []
+    if resume.extracted_text is not None:
+        parts.append(decompress_text(resume.extracted_text))
+    for entry in (resume.parsed_content or {}).get("experience") or []:
+        parts.append(" ".join(filter(None, [entry.get("title"), entry.get("company")])))
+        parts.extend(entry.get("achievements") or [])
+    return "\n".join(part for part in parts if part)
+
+def index_documents(connection, documents: Iterable[Tuple[str, str]]) -> None:
+    """Replace the indexed text of each ``(resume id, text)``; empty text unindexes."""
+    documents = list(documents)
+    dialect = connection.dialect.name
+    if not documents or not supports(dialect):
+        return
+    remove_documents(connection, [resume_id for resume_id, body in documents if not body])
+    documents = [(resume_id, body) for resume_id, body in documents if body]
+    if not documents:
+        return
+    if dialect == "postgresql":
+        connection.execute(
+            text(
+                "INSERT INTO resume_search (resume_id, body) VALUES (:resume_id, :body) "
+                "ON CONFLICT (resume_id) DO UPDATE SET body = EXCLUDED.body"
+            ),
+            [{"resume_id": resume_id, "body": body} for resume_id, body in documents]
+        )
+        return
+    connection.execute(
+        text("INSERT INTO resume_search_docs (resume_id) VALUES (:resume_id) ON CONFLICT (resume_id) DO NOTHING"),
+        [{"resume_id": resume_id} for resume_id, _ in documents]
+    )
+    rowids = _sqlite_rowids(connection, [resume_id for resume_id, _ in documents])
+    connection.execute(
+        text("DELETE FROM resume_search WHERE rowid = :rowid"),
+        [{"rowid": rowids[resume_id]} for resume_id, _ in documents]
+    )
+    connection.execute(
+        text("INSERT INTO resume_search (rowid, body) VALUES (:rowid, :body)"),
+        [{"rowid": rowids[resume_id], "body": body} for resume_id, body in documents]
+    )
+
+def remove_documents(connection, resume_ids: Sequence[str]) -> None:
+    dialect = connection.dialect.name
+    if not resume_ids or not supports(dialect):
+        return
+    params = [{"resume_id": resume_id} for resume_id in resume_ids]
+    if dialect == "postgresql":
+        connection.execute(text("DELETE FROM resume_search WHERE resume_id = :resume_id"), params)
+        return
+    rowids = _sqlite_rowids(connection, resume_ids)
+    if rowids:
+        connection.execute(
+            text("DELETE FROM resume_search WHERE rowid = :rowid"),
+            [{"rowid": rowid} for rowid in rowids.values()]
+        )
+        connection.execute(text("DELETE FROM resume_search_docs WHERE resume_id = :resume_id"), params)
+
+def _sqlite_rowids(connection, resume_ids: Sequence[str]) -> Dict[str, int]:
+    rows = connection.execute(
+        select(_DOCS.c.resume_id, _DOCS.c.id).where(_DOCS.c.resume_id.in_(list(resume_ids)))
+    )
+    return dict(rows.all())
+
+def fts5_query(query: str) -> Optional[str]:
+    """FTS5 MATCH expression for a web-search style query; None if it has no terms."""
+    include: List[str] = []
+    exclude: List[str] = []
+    pending_or = False
+    for negated_phrase, phrase, negated_word, word in _QUERY_TOKEN.findall(query):
+        if word and word.lower() == "or" and not negated_word:
+            pending_or = bool(include)
+            continue
+        words = _WORD.findall(phrase if phrase else word)
+        if not words:
+            continue
+        term = '"' + " ".join(words) + '"'
+        if negated_phrase or negated_word:
+            exclude.append(term)
+        elif pending_or:
+            include[-1] = f"{include[-1]} OR {term}"
+            pending_or = False
+        else:
+            include.append(term)
+    if not include:
+        return None
+    expression = " AND ".join(f"({term})" if " OR " in term else term for term in include)
+    for term in exclude:
+        expression = f"({expression}) NOT {term}"
+    return expression
+
+def search_resumes(
+    db: Session,
+    query: str,
+    response: Response,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> List[SearchHit]:
+    """One page of resumes matching ``query``, best first.
+
+    The next-page cursor is set on ``response`` like ``pagination.paginate``.
+    """
+    dialect = db.get_bind().dialect.name
+    if not supports(dialect):
+        return []
+    if dialect == "sqlite":
+        search, tie_break = _search_sqlite, Integer
+    else:
+        search, tie_break = _search_postgres, String
+    after = decode_cursor(cursor, (column("score", Float), column("key", tie_break))) if cursor else None
+    hits = search(db, query, limit + 1, after)
+    if len(hits) > limit:
+        hits = hits[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([hits[-1].score, hits[-1].sort_key])
+    return hits
+
+def _keyset(score_sql: str, key_sql: str, after) -> Tuple[str, Dict]:
+    if after is None:
+        return "", {}
+    return (
+        f" AND ({score_sql} < :after_score OR ({score_sql} = :after_score AND {key_sql} > :after_key))",
+        {"after_score": after[0], "after_key": after[1]},
+    )
+
+def _search_sqlite(db: Session, query: str, limit: int, after) -> List[SearchHit]:
+    match = fts5_query(query)
+    if match is None:
+        return []
+    params = {"match": match, "limit": limit}
+    # bm25() costs about a microsecond per match; past SEARCH_RANK_WINDOW
+    # matches only the most recently indexed ones are ranked
+    floor = db.scalar(text(
+        "SELECT rowid FROM resume_search WHERE resume_search MATCH :match "
+        "ORDER BY rowid DESC LIMIT 1 OFFSET :window"
+    ), {"match": match, "window": SEARCH_RANK_WINDOW})
+    window = ""
+    if floor is not None:
+        window = " AND rowid > :floor"
+        params["floor"] = floor
+    score = "-bm25(resume_search)"
+    condition, keyset_params = _keyset(score, "rowid", after)
+    rows = db.execute(text(
+        f"SELECT rowid, {score} AS score FROM resume_search "
+        f"WHERE resume_search MATCH :match{window}{condition} "
+        "ORDER BY score DESC, rowid LIMIT :limit"
+    ), {**params, **keyset_params}).all()
+    if not rows:
+        return []
+    # Highlight only the page: snippet() is far more expensive than bm25()
+    rowids = [row.rowid for row in rows]
+    highlights = dict(db.execute(
+        select(_FTS.c.rowid, text(
+            f"snippet(resume_search, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 24)"
+        )).where(text("resume_search MATCH :match"), _FTS.c.rowid.in_(rowids)),
+        {"match": match}
+    ).all())
+    resume_ids = dict(db.execute(select(_DOCS.c.id, _DOCS.c.resume_id).where(_DOCS.c.id.in_(rowids))).all())
+    candidates = _candidate_ids(db, list(resume_ids.values()))
+    return [
+        SearchHit(
+            resume_ids[row.rowid], candidates.get(resume_ids[row.rowid]), row.score,
+            highlights.get(row.rowid, ""), row.rowid
+        )
+        for row in rows
+    ]
+
+def _search_postgres(db: Session, query: str, limit: int, after) -> List[SearchHit]:
+    condition, params = _keyset("ts_rank_cd(s.document, q)", "s.resume_id", after)
+    rows = db.execute(text(
+        "SELECT page.resume_id, page.score, "
+        "ts_headline('english', page.body, websearch_to_tsquery('english', :query), "
+        f"'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxFragments=2, MinWords=8, MaxWords=24') AS highlight "
+        "FROM (SELECT s.resume_id, s.body, ts_rank_cd(s.document, q) AS score "
+        "FROM resume_search s, websearch_to_tsquery('english', :query) q "
+        f"WHERE s.document @@ q{condition} "
+        "ORDER BY score DESC, s.resume_id LIMIT :limit) page "
+        "ORDER BY page.score DESC, page.resume_id"
+    ), {"query": query, "limit": limit, **params}).all()
+    candidates = _candidate_ids(db, [row.resume_id for row in rows])
+    return [
+        SearchHit(row.resume_id, candidates.get(row.resume_id), row.score, row.highlight, row.resume_id)
+        for row in rows
+    ]
+
+def _candidate_ids(db: Session, resume_ids: List[str]) -> Dict[str, str]:
+    if not resume_ids:
+        return {}
+    return dict(db.execute(
+        select(models.Resume.id, models.Resume.candidate_id).where(models.Resume.id.in_(resume_ids))
+    ).all())
+
+@event.listens_for(Session, "before_flush")
+def _collect_changed_resumes(session, flush_context, instances):
+    changed = session.info.setdefault(_CHANGED_KEY, set())
+    deleted = session.info.setdefault(_DELETED_KEY, set())
+    for instance in session.deleted:
+        if isinstance(instance, models.Resume):
+            deleted.add(instance.id)
+    for instance in list(session.new) + list(session.dirty):
+        if not isinstance(instance, models.Resume):
+            continue
+        attrs = inspect(instance).attrs
+        if attrs.extracted_text.history.has_changes() or attrs.parsed_content.history.has_changes():
+            changed.add(instance)
+
+@event.listens_for(Session, "after_flush_postexec")
+def _reindex_changed_resumes(session, flush_context):
+    changed = session.info.pop(_CHANGED_KEY, None)
+    deleted = session.info.pop(_DELETED_KEY, None)
+    if not changed and not deleted:
+        return
+    connection = session.connection()
+    if deleted:
+        remove_documents(connection, list(deleted))
+    if changed:
+        index_documents(connection, [(resume.id, resume_document(resume)) for resume in changed])
+
+def rebuild(batch_size: int = 200) -> int:
+    """Index every resume; returns the number of resumes processed."""
+    with database.engine.begin() as connection:
+        create_index(connection)
+    done = 0
+    last_id = ""
+    while True:
+        with database.SessionLocal() as db:
+            resumes = db.scalars(
+                select(models.Resume).where(models.Resume.id > last_id)
+                .order_by(models.Resume.id).limit(batch_size)
+            ).all()
+            if not resumes:
+                return done
+            index_documents(db.connection(), [(resume.id, resume_document(resume)) for resume in resumes])
+            db.commit()
+            last_id = resumes[-1].id
+        done += len(resumes)
+        print(f"Indexed {done} resumes")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Resume full-text search index")
+    parser.add_argument("--rebuild", action="store_true", help="index every stored resume")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("query", nargs="?", help="search and print the first page")
+    args = parser.parse_args(argv)
+    if args.rebuild:
+        rebuild(args.batch_size)
+    if args.query:
+        with database.SessionLocal() as db:
+            for hit in search_resumes(db, args.query, Response(), 20):
+                print(f"{hit.score:8.3f}  {hit.resume_id}  {hit.highlight}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
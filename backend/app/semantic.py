@@ -0,0 +1,607 @@
+"""Offline semantic similarity over resumes, requirements and projects.
+
+Documents are vectorised locally, with no model download or network call: a
+hashing TF-IDF over words, word bigrams, CJK character bigrams and the
+canonical taxonomy skills mentioned in the text. The skill features are what
+let near-synonyms such as "k8s" and "Kubernetes" match. Each feature is added
+to a few of SEMANTIC_DIMENSIONS dimensions with hash-derived signs (a sparse
+random projection), and the normalised vector is stored as int8 with a
+per-row scale, a quarter of the size of float32 and cheap to score.
+
+Vectors live in memory-mapped files under SEMANTIC_INDEX_DIR, so they survive
+restarts and a query only reads the rows it scores:
+
+- ``vectors.i8`` / ``scales.f32``: one quantised row per document
+- ``ids.bin`` / ``kinds.bin``: the document of each row; kind 0 marks a row
+  superseded by a newer version of its document, or deleted
+- ``lists.bin``: the IVF cluster of each row
+- ``df.bin``: document frequency per hashed feature, for the IDF
+- ``centroids.npy`` and ``meta.json``: cluster centroids, row count, settings
+
+Rows are append-only: a changed document gets a new row and its old row is
+marked deleted. From SEMANTIC_IVF_MIN_DOCS documents on, the rows are
+clustered with spherical k-means in a background thread, and a query scores
+only the rows of its nearest clusters, SEMANTIC_PROBE_FRACTION of them; new
+rows join their nearest cluster. ``python -m app.semantic --rebuild`` re-vectorises every
+stored document, drops deleted rows and re-clusters.
+
+Documents are indexed by a background thread once the transaction that
+changed them commits, so committing never waits on the index. Writers in
+several processes serialise on a lock file; readers reopen the files when
+``meta.json`` changes.
+"""
+import argparse
+import atexit
+import hashlib
+import json
+import math
+import os
+import queue
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from . import database, models
+from .search import resume_document
+from .taxonomy import get_taxonomy, normalise
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialised within a process
+    fcntl = None
+
+SEMANTIC_INDEX_DIR = Path(os.getenv("SEMANTIC_INDEX_DIR", "semantic_index"))
+SEMANTIC_DIMENSIONS = int(os.getenv("SEMANTIC_DIMENSIONS", "256"))
+SEMANTIC_IVF_MIN_DOCS = int(os.getenv("SEMANTIC_IVF_MIN_DOCS", "20000"))
+# Share of the clusters a query probes; resume texts cluster loosely, and
+# recall@10 only reaches 0.9 at about two thirds of them
+SEMANTIC_PROBE_FRACTION = float(os.getenv("SEMANTIC_PROBE_FRACTION", "0.65"))
+
+KIND_RESUME = "resume"
+KIND_REQUIREMENT = "requirement"
+KIND_PROJECT = "project"
+KIND_CODES = {KIND_RESUME: 1, KIND_REQUIREMENT: 2, KIND_PROJECT: 3}
+
+_HASH_BUCKETS = 1 << 20  # document frequency buckets
+_PROJECTIONS = 4  # dimensions each feature is added to
+_SKILL_COUNT = 3  # term count given to a taxonomy skill feature
+_ID_DTYPE = "S40"
+_INITIAL_CAPACITY = 1024
+_CHUNK_ROWS = 32768  # rows converted to float32 at a time
+_STOP_WORDS = frozenset(
+    "a an and are as at be been by for from has have in is it of on or our that the this to was we were with "
+    "you your will".split()
+)
+
+_WORD = re.compile(r"\w+")
+_CJK = re.compile(r"[\u3400-\u9fff]")
+
+# Session.info keys for documents waiting on the transaction outcome
+_CHANGED_KEY = "semantic_changed"
+_INDEX_KEY = "semantic_pending"
+
+def document_features(text: str) -> Counter:
+    """Feature counts of ``text``: words, word bigrams, CJK bigrams and skills."""
+    counts: Counter = Counter()
+    previous = None
+    for word in _WORD.findall(text.lower()):
+        if not word.isascii() and _CJK.search(word):
+            counts.update(word[i:i + 2] for i in range(max(len(word) - 1, 1)))
+            previous = None
+        elif len(word) < 2 or word.isdigit() or word in _STOP_WORDS:
+            previous = None
+        else:
+            counts[word] += 1
+            if previous:
+                counts[f"{previous} {word}"] += 1
+            previous = word
+    for skill in get_taxonomy().match_text(text):
+        counts[f"skill:{normalise(skill)}"] += _SKILL_COUNT
+    return counts
+
+@lru_cache(maxsize=262144)
+def _feature_digest(feature: str) -> bytes:
+    # 4 bytes of frequency bucket, then 2 bytes per projected dimension
+    return hashlib.blake2b(feature.encode("utf-8"), digest_size=4 + 2 * _PROJECTIONS).digest()
+
+def _hash_features(features: Counter, dimensions: int):
+    digests = np.frombuffer(b"".join(map(_feature_digest, features)), dtype="<u2").reshape(len(features), -1)
+    buckets = (digests[:, 0].astype(np.uint32) | (digests[:, 1].astype(np.uint32) << 16)) % _HASH_BUCKETS
+    projections = digests[:, 2:]
+    dims = (projections >> 1) % dimensions
+    signs = np.where(projections & 1, 1.0, -1.0)
+    counts = np.fromiter(features.values(), dtype=np.float64, count=len(features))
+    return buckets, dims, signs, counts
+
+class SemanticIndex:
+    """Memory-mapped document vectors with an IVF index, shared by processes."""
+
+    def __init__(self, directory: Path = SEMANTIC_INDEX_DIR, dimensions: int = SEMANTIC_DIMENSIONS):
+        self.directory = Path(directory)
+        self.dimensions = dimensions
+        self._lock = threading.RLock()
+        self._train_lock = threading.Lock()
+        self._training = False
+        self._meta_mtime: Optional[int] = None
+        self._reset_state()
+
+    # Vectors
+
+    def vectorise(self, text: str) -> Optional[np.ndarray]:
+        """Unit float32 vector of ``text``, or None when it has no features."""
+        with self._lock:
+            self._refresh()
+            return self._vectorise(text)[0]
+
+    def _vectorise(self, text: str) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        features = document_features(text or "")
+        if not features:
+            return None, None
+        buckets, dims, signs, counts = _hash_features(features, self.dimensions)
+        df = self._df[buckets] if self._df is not None else 0
+        weights = (1 + np.log(counts)) * (np.log((self._documents + 1) / (df + 1)) + 1)
+        vector = np.zeros(self.dimensions)
+        np.add.at(vector, dims.ravel(), (signs * weights[:, None]).ravel())
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None, None
+        return (vector / norm).astype(np.float32), np.unique(buckets)
+
+    # Writes
+
+    def upsert(self, documents: Iterable[Tuple[str, str, str]], replace: bool = True, cluster: bool = True) -> int:
+        """Index (kind, id, text) documents; returns the number of rows added.
+
+        With ``replace`` earlier versions of the documents are marked
+        deleted; ``cluster`` allows starting a background clustering.
+        """
+        documents = list(documents)
+        if not documents:
+            return 0
+        with self._write():
+            if replace:
+                self._tombstone([doc_id for _, doc_id, _ in documents])
+            rows = []
+            for kind, doc_id, text in documents:
+                vector, buckets = self._vectorise(text)
+                if vector is None:
+                    continue
+                rows.append((KIND_CODES[kind], doc_id, vector))
+                self._ensure_df()
+                self._df[buckets] += 1
+                self._documents += 1
+            self._append(rows)
+            added = len(rows)
+        if cluster:
+            self._maybe_train()
+        return added
+
+    def delete(self, doc_ids: Sequence[str]) -> None:
+        if not doc_ids:
+            return
+        with self._write():
+            self._tombstone(doc_ids)
+
+    def clear(self) -> None:
+        """Remove every document."""
+        with self._write():
+            for path in self.directory.iterdir():
+                if path.name != ".lock":
+                    path.unlink()
+            self._reset_state()
+
+    def _tombstone(self, doc_ids: Sequence[str]) -> None:
+        if not self._count:
+            return
+        ids = np.array([doc_id.encode() for doc_id in doc_ids], dtype=_ID_DTYPE)
+        rows = np.flatnonzero(np.isin(self._ids[:self._count], ids))
+        self._kinds[rows] = 0
+
+    def _append(self, rows: List[Tuple[int, str, np.ndarray]]) -> None:
+        if not rows:
+            return
+        start = self._count
+        self._ensure_capacity(start + len(rows))
+        end = start + len(rows)
+        vectors = np.stack([vector for _, _, vector in rows])
+        scales = np.abs(vectors).max(axis=1) / 127
+        self._vectors[start:end] = np.round(vectors / scales[:, None]).astype(np.int8)
+        self._scales[start:end] = scales
+        self._ids[start:end] = [doc_id.encode() for _, doc_id, _ in rows]
+        self._kinds[start:end] = [kind for kind, _, _ in rows]
+        self._lists[start:end] = self._nearest_lists(vectors) if self._centroids is not None else -1
+        self._count = end
+
+    # Queries
+
+    def search(
+        self,
+        vector: np.ndarray,
+        kind: str,
+        limit: int,
+        exclude: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """(id, cosine similarity) of the ``limit`` nearest documents of ``kind``."""
+        with self._lock:
+            self._refresh()
+            if not self._count:
+                return []
+            code = KIND_CODES[kind]
+            if self._centroids is not None:
+                # One extra False slot for rows without a list (-1)
+                probed = np.zeros(len(self._centroids) + 1, dtype=bool)
+                nprobe = max(math.ceil(SEMANTIC_PROBE_FRACTION * len(self._centroids)), 1)
+                probed[np.argsort(-(self._centroids @ vector))[:nprobe]] = True
+                rows = np.flatnonzero(probed[self._lists[:self._count]])
+                rows = rows[self._kinds[rows] == code]
+            else:
+                rows = np.flatnonzero(self._kinds[:self._count] == code)
+            if exclude is not None:
+                rows = rows[self._ids[rows] != exclude.encode()]
+            best_rows, best_scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+            for start in range(0, len(rows), _CHUNK_ROWS):
+                chunk = rows[start:start + _CHUNK_ROWS]
+                scores = (self._vectors[chunk].astype(np.float32) @ vector) * self._scales[chunk]
+                best_rows = np.concatenate([best_rows, chunk])
+                best_scores = np.concatenate([best_scores, scores])
+                if len(best_rows) > limit:
+                    keep = np.argpartition(-best_scores, limit - 1)[:limit]
+                    best_rows, best_scores = best_rows[keep], best_scores[keep]
+            order = np.argsort(-best_scores, kind="stable")
+            return [(self._ids[row].decode(), float(best_scores[i])) for i, row in zip(order, best_rows[order])]
+
+    # Clustering
+
+    def train(self, sample_size: int = 50000, iterations: int = 10, seed: int = 0) -> int:
+        """Cluster the live rows and reassign every row; returns the number of clusters."""
+        with self._train_lock:
+            return self._train(sample_size, iterations, seed)
+
+    def _train(self, sample_size: int, iterations: int, seed: int) -> int:
+        with self._lock:
+            self._refresh()
+            count = self._count
+            live = np.flatnonzero(self._kinds[:count] != 0) if count else np.zeros(0, dtype=np.int64)
+        if not len(live):
+            return 0
+        rng = np.random.default_rng(seed)
+        clusters = int(min(max(math.sqrt(len(live)), 1), 4096))
+        sample = np.sort(rng.choice(live, min(sample_size, len(live)), replace=False))
+        data = self._rows(sample)
+        centroids = data[rng.choice(len(data), clusters, replace=False)]
+        for _ in range(iterations):
+            assignment = self._assign(data, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, data)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+
+        # Assign the existing rows into a new file, so queries keep using the
+        # old clusters meanwhile, then the rows added since under the lock
+        next_path = self.directory / "lists.bin.next"
+        with self._lock:
+            capacity = self._capacity
+        lists = np.memmap(next_path, dtype=np.int32, mode="w+", shape=(capacity,))
+        for start in range(0, count, _CHUNK_ROWS):
+            end = min(start + _CHUNK_ROWS, count)
+            lists[start:end] = self._assign(self._rows(slice(start, end)), centroids)
+        with self._write():
+            if self._capacity != capacity:
+                lists.flush()
+                del lists
+                with open(next_path, "r+b") as f:
+                    f.truncate(self._capacity * np.dtype(np.int32).itemsize)
+                lists = np.memmap(next_path, dtype=np.int32, mode="r+", shape=(self._capacity,))
+            if self._count > count:
+                lists[count:self._count] = self._assign(self._rows(slice(count, self._count)), centroids)
+            lists.flush()
+            del lists
+            os.replace(next_path, self.directory / "lists.bin")
+            np.save(self.directory / "centroids.npy", centroids)
+            self._centroids = centroids
+            self._trained_count = len(live)
+            self._open_arrays()
+        return clusters
+
+    def _maybe_train(self) -> None:
+        """Cluster in the background once the index is big enough, or has grown 4x."""
+        live = self._documents
+        due = live >= SEMANTIC_IVF_MIN_DOCS and (self._centroids is None or live >= 4 * self._trained_count)
+        if not due or self._training:
+            return
+        self._training = True
+
+        def run():
+            try:
+                clusters = self.train()
+                print(f"Clustered semantic index into {clusters} lists")
+            except Exception as e:
+                print(f"Error clustering semantic index: {str(e)}")
+            finally:
+                self._training = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _assign(self, vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+
+    def _nearest_lists(self, vectors: np.ndarray) -> np.ndarray:
+        return self._assign(vectors.astype(np.float32), self._centroids)
+
+    def _rows(self, rows) -> np.ndarray:
+        """Dequantised float32 vectors of ``rows`` (indexes or a slice)."""
+        return self._vectors[rows].astype(np.float32) * self._scales[rows][:, None]
+
+    # Files
+
+    def _reset_state(self) -> None:
+        self._count = 0
+        self._capacity = 0
+        self._documents = 0
+        self._trained_count = 0
+        self._vectors = self._scales = self._ids = self._kinds = self._lists = self._df = None
+        self._centroids: Optional[np.ndarray] = None
+
+    @contextmanager
+    def _write(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.directory / ".lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                yield
+                for array in (self._vectors, self._scales, self._ids, self._kinds, self._lists, self._df):
+                    if array is not None:
+                        array.flush()
+                self._write_meta()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        """Reopen the files if another writer changed them."""
+        try:
+            mtime = (self.directory / "meta.json").stat().st_mtime_ns
+        except FileNotFoundError:
+            if self._meta_mtime is not None:
+                self._reset_state()
+                self._meta_mtime = None
+            return
+        if mtime == self._meta_mtime:
+            return
+        meta = json.loads((self.directory / "meta.json").read_text())
+        self._meta_mtime = mtime
+        self.dimensions = meta["dimensions"]
+        self._count = meta["count"]
+        self._capacity = meta["capacity"]
+        self._documents = meta["documents"]
+        self._trained_count = meta["trained_count"]
+        centroids_path = self.directory / "centroids.npy"
+        self._centroids = np.load(centroids_path) if meta["trained_count"] and centroids_path.exists() else None
+        self._open_arrays()
+
+    def _open_arrays(self) -> None:
+        if not self._capacity:
+            self._vectors = self._scales = self._ids = self._kinds = self._lists = None
+        else:
+            self._vectors = self._memmap("vectors.i8", np.int8, (self._capacity, self.dimensions))
+            self._scales = self._memmap("scales.f32", np.float32, (self._capacity,))
+            self._ids = self._memmap("ids.bin", _ID_DTYPE, (self._capacity,))
+            self._kinds = self._memmap("kinds.bin", np.uint8, (self._capacity,))
+            self._lists = self._memmap("lists.bin", np.int32, (self._capacity,))
+        df_path = self.directory / "df.bin"
+        self._df = np.memmap(df_path, dtype=np.int32, mode="r+", shape=(_HASH_BUCKETS,)) if df_path.exists() else None
+
+    def _memmap(self, name: str, dtype, shape) -> np.memmap:
+        path = self.directory / name
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if not path.exists() or path.stat().st_size < size:
+            with open(path, "ab") as f:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows <= self._capacity:
+            return
+        capacity = max(self._capacity, _INITIAL_CAPACITY)
+        while capacity < rows:
+            capacity *= 2
+        for array in (self._vectors, self._scales, self._ids, self._kinds, self._lists):
+            if array is not None:
+                array.flush()
+        self._capacity = capacity
+        self._open_arrays()
+
+    def _ensure_df(self) -> None:
+        if self._df is None:
+            self._df = np.memmap(self.directory / "df.bin", dtype=np.int32, mode="w+", shape=(_HASH_BUCKETS,))
+
+    def _write_meta(self) -> None:
+        meta = {
+            "dimensions": self.dimensions,
+            "count": self._count,
+            "capacity": self._capacity,
+            "documents": self._documents,
+            "trained_count": self._trained_count if self._centroids is not None else 0,
+        }
+        path = self.directory / "meta.json"
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(meta))
+        os.replace(temporary, path)
+        self._meta_mtime = path.stat().st_mtime_ns
+
+semantic_index = SemanticIndex()
+
+def requirement_document(requirement: models.Requirement) -> str:
+    return requirement.description or ""
+
+def project_document(project: models.Project) -> str:
+    parts = [project.title, project.description]
+    for field in (project.responsibilities, project.qualifications):
+        if isinstance(field, list):
+            parts.extend(item for item in field if isinstance(item, str))
+    return "\n".join(part for part in parts if part)
+
+# Attributes whose changes alter each model's document
+_DOCUMENTS = {
+    models.Resume: (KIND_RESUME, resume_document, ("extracted_text", "parsed_content")),
+    models.Requirement: (KIND_REQUIREMENT, requirement_document, ("description",)),
+    models.Project: (KIND_PROJECT, project_document, ("title", "description", "responsibilities", "qualifications")),
+}
+
+def document_text(item) -> str:
+    """Indexed text of a resume, requirement or project."""
+    return _DOCUMENTS[type(item)][1](item)
+
+def similar(text: str, kind: str, limit: int, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+    """(id, similarity) of the stored documents of ``kind`` most similar to ``text``."""
+    vector = semantic_index.vectorise(text)
+    if vector is None:
+        return []
+    return [(doc_id, score) for doc_id, score in semantic_index.search(vector, kind, limit, exclude) if score > 0]
+
+@event.listens_for(Session, "before_flush")
+def _collect_changed_documents(session, flush_context, instances):
+    changed = session.info.setdefault(_CHANGED_KEY, {})
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        spec = _DOCUMENTS.get(type(instance))
+        if spec is None:
+            continue
+        attrs = inspect(instance).attrs
+        if (instance in session.new or instance in session.deleted
+                or any(getattr(attrs, name).history.has_changes() for name in spec[2])):
+            changed[id(instance)] = instance
+
+@event.listens_for(Session, "after_flush_postexec")
+def _snapshot_changed_documents(session, flush_context):
+    # Texts are read now, while the objects are loaded; they are indexed
+    # only if the transaction commits
+    changed = session.info.pop(_CHANGED_KEY, None)
+    if not changed:
+        return
+    pending = session.info.setdefault(_INDEX_KEY, {})
+    for instance in changed.values():
+        kind, document, _ = _DOCUMENTS[type(instance)]
+        state = inspect(instance)
+        pending[instance.id] = None if state.deleted or state.was_deleted else (kind, document(instance))
+
+class _Indexer:
+    """Applies committed documents to the index in a background thread.
+
+    Commits only queue their documents, so an AsyncSession committing on the
+    event loop never vectorises or takes the index's file lock.
+    """
+
+    def __init__(self, index: SemanticIndex):
+        self.index = index
+        self._queue: "queue.Queue[dict]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, pending: dict) -> None:
+        self._queue.put(pending)
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="semantic-indexer", daemon=True)
+                self._thread.start()
+
+    def wait(self) -> None:
+        """Block until every queued document is indexed."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            pending = self._queue.get()
+            taken = 1
+            # Apply whatever queued up meanwhile in one write; later commits win
+            while True:
+                try:
+                    pending.update(self._queue.get_nowait())
+                    taken += 1
+                except queue.Empty:
+                    break
+            try:
+                self.index.delete([doc_id for doc_id, document in pending.items() if document is None])
+                self.index.upsert([
+                    (document[0], doc_id, document[1]) for doc_id, document in pending.items() if document is not None
+                ])
+            except Exception as e:
+                # The data is committed; a missed document is picked up by --rebuild
+                print(f"Error updating semantic index: {str(e)}")
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+
+indexer = _Indexer(semantic_index)
+# Index what is still queued before the process exits
+atexit.register(indexer.wait)
+
+@event.listens_for(Session, "after_commit")
+def _index_committed_documents(session):
+    pending = session.info.pop(_INDEX_KEY, None)
+    if pending:
+        indexer.submit(pending)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_documents(session):
+    session.info.pop(_CHANGED_KEY, None)
+    session.info.pop(_INDEX_KEY, None)
+
+def rebuild(batch_size: int = 500) -> int:
+    """Re-index every stored document from scratch; returns the number indexed.
+
+    Queries see a partial index until it finishes.
+    """
+    indexer.wait()
+    semantic_index.clear()
+    done = 0
+    for model, (kind, document, _) in _DOCUMENTS.items():
+        last_id = ""
+        while True:
+            with database.SessionLocal() as db:
+                items = db.scalars(
+                    select(model).where(model.id > last_id).order_by(model.id).limit(batch_size)
+                ).all()
+                if not items:
+                    break
+                semantic_index.upsert(
+                    [(kind, item.id, document(item)) for item in items], replace=False, cluster=False
+                )
+                last_id = items[-1].id
+            done += len(items)
+            print(f"Indexed {done} documents")
+    if semantic_index._documents:
+        print(f"Clustered into {semantic_index.train()} lists")
+    return done
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Semantic similarity index")
+    parser.add_argument("--rebuild", action="store_true", help="re-index every stored document")
+    parser.add_argument("--train", action="store_true", help="re-cluster the index")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--kind", choices=list(KIND_CODES), default=KIND_RESUME)
+    parser.add_argument("query", nargs="?", help="print the documents most similar to this text")
+    args = parser.parse_args(argv)
+    if args.rebuild:
+        rebuild(args.batch_size)
+    elif args.train:
+        print(f"Clustered into {semantic_index.train()} lists")
+    if args.query:
+        for doc_id, score in similar(args.query, args.kind, 20):
+            print(f"{score:6.3f}  {doc_id}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
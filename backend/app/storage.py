@@ -0,0 +1,170 @@
+"""Content-addressed storage for uploaded resume files.
+
+Files are stored under their SHA-256 digest, so identical uploads share a
+single blob on disk. Uploads are streamed to a temporary file in fixed-size
+chunks while the digest, size limit and file type are checked, and only
+renamed into place once complete, so memory use stays flat per upload and a
+failed upload never leaves a partial blob behind.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from fastapi import UploadFile
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "uploads"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 512
+
+PDF = "application/pdf"
+DOC = "application/msword"
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+TEXT = "text/plain"
+
+# Declared content types and the sniffed types accepted for them. Browsers
+# are not reliable about .doc vs .docx, so Word types accept either.
+COMPATIBLE_TYPES = {
+    PDF: {PDF},
+    DOC: {DOC, DOCX},
+    DOCX: {DOCX, DOC},
+    TEXT: {TEXT},
+}
+
+# Content types assumed for files that arrive without one, e.g. ZIP entries
+EXTENSION_TYPES = {
+    ".pdf": PDF,
+    ".doc": DOC,
+    ".docx": DOCX,
+    ".txt": TEXT,
+}
+
+class UploadTooLarge(ValueError):
+    pass
+
+@dataclass
+class StoredUpload:
+    path: Path
+    digest: str
+    size: int
+    sniffed_type: Optional[str]
+    created: bool  # False when an identical blob already existed
+
+def sniff_mime(head: bytes) -> Optional[str]:
+    """Detect the resume file type from its first bytes."""
+    if head.startswith(b"%PDF-"):
+        return PDF
+    if head.startswith(b"PK\x03\x04"):
+        return DOCX
+    if head.startswith(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"):
+        return DOC
+    if b"\x00" in head:
+        return None
+    try:
+        # The sniff window may end inside a multi-byte character
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.start < len(head) - 3:
+            return None
+    return TEXT
+
+def resolve_file_type(declared: str, sniffed: Optional[str]) -> Optional[str]:
+    """Return the type to store for an upload, or None if it is not acceptable."""
+    if sniffed in COMPATIBLE_TYPES.get(declared, set()):
+        return sniffed
+    return None
+
+def blob_path(digest: str, suffix: str = "") -> Path:
+    """Path of the blob stored for ``digest``."""
+    return UPLOAD_DIR / f"{digest}{suffix.lower()}"
+
+class BlobWriter:
+    """Writes one upload to a temporary file, then moves it to its blob path.
+
+    Use as a context manager; the temporary file is removed unless
+    :meth:`commit` succeeded.
+    """
+
+    def __init__(self, suffix: str = "", max_bytes: int = MAX_UPLOAD_BYTES):
+        UPLOAD_DIR.mkdir(exist_ok=True)
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._hasher = hashlib.sha256()
+        self._head = b""
+        # Same directory as the blobs so the final rename is atomic
+        self._tmp = tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, prefix=".upload-", delete=False)
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {self.max_bytes} bytes")
+        if len(self._head) < SNIFF_BYTES:
+            self._head += chunk[:SNIFF_BYTES - len(self._head)]
+        self._hasher.update(chunk)
+        self._tmp.write(chunk)
+
+    def commit(self) -> StoredUpload:
+        self._tmp.close()
+        digest = self._hasher.hexdigest()
+        path = blob_path(digest, self.suffix)
+        created = not path.exists()
+        if created:
+            os.replace(self._tmp.name, path)
+        else:
+            os.unlink(self._tmp.name)
+        return StoredUpload(path, digest, self.size, sniff_mime(self._head), created)
+
+    def abort(self) -> None:
+        self._tmp.close()
+        if os.path.exists(self._tmp.name):
+            os.unlink(self._tmp.name)
+
+    def __enter__(self) -> "BlobWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.abort()
+
+async def save_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> StoredUpload:
+    """Stream an uploaded file into blob storage.
+
+    Raises:
+        UploadTooLarge: As soon as more than ``max_bytes`` have been received.
+    """
+    # Starlette knows the size of the spooled part already; reject before
+    # reading any of it when possible.
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+    # Hashing and disk writes block, so the whole copy runs in a thread
+    return await asyncio.to_thread(store_stream, file.file, Path(file.filename or "").suffix, max_bytes)
+
+def store_stream(stream: BinaryIO, suffix: str = "", max_bytes: int = MAX_UPLOAD_BYTES) -> StoredUpload:
+    """Blocking counterpart of :func:`save_upload` for file-like objects."""
+    with BlobWriter(suffix, max_bytes) as writer:
+        while chunk := stream.read(CHUNK_SIZE):
+            writer.write(chunk)
+        return writer.commit()
+
+def discard_blob(db: Session, stored: StoredUpload) -> None:
+    """Remove a blob this upload created, unless a stored resume uses it.
+
+    An identical upload running concurrently may have reused the blob and
+    committed its resume since; the blob then stays.
+    """
+    if not stored.created:
+        return
+    referenced = db.scalar(select(models.Resume.id).where(
+        models.Resume.content_hash == stored.digest, models.Resume.file_path == str(stored.path)
+    ).limit(1))
+    if referenced is None and stored.path.exists():
+        stored.path.unlink()
@@ -0,0 +1,185 @@
+"""Tag lookup and attachment.
+
+Resolving a set of tag names costs at most three queries however many tags
+there are: one ``IN`` lookup, one bulk insert of the missing names (which
+skips names a concurrent writer inserted first, relying on the unique index
+on ``tags.name``) and one lookup of the inserted ids. Resolved ids are kept
+in an LRU cache. Ids of tags inserted by a transaction only enter the cache
+once that transaction commits, so a rollback never leaves ids of tags that
+do not exist behind.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+from sqlalchemy import delete, event, insert, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+
+TAG_CACHE_SIZE = int(os.getenv("TAG_CACHE_SIZE", "10000"))
+
+# Session.info keys for cache updates waiting on the transaction outcome
+_PENDING_KEY = "tag_cache_pending"
+_STALE_KEY = "tag_cache_stale"
+# Session.info key for ids of resumes whose tag links were written directly
+RETAGGED_RESUMES_KEY = "retagged_resumes"
+
+def tag_category(name: str) -> str:
+    """Category of a new tag: the prefix of ``domain:backend``, else "skill"."""
+    return name.split(":", 1)[0] if ":" in name else "skill"
+
+class TagCache:
+    """Thread-safe LRU cache of tag name to id."""
+
+    def __init__(self, max_size: int = TAG_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, str]:
+        found = {}
+        with self._lock:
+            for name in names:
+                tag_id = self._entries.get(name)
+                if tag_id is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(name)
+                found[name] = tag_id
+                self.hits += 1
+        return found
+
+    def put_many(self, ids: Dict[str, str]) -> None:
+        with self._lock:
+            for name, tag_id in ids.items():
+                self._entries[name] = tag_id
+                self._entries.move_to_end(name)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, names: Iterable[str]) -> None:
+        with self._lock:
+            for name in names:
+                self._entries.pop(name, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class TagService:
+    def __init__(self, cache: TagCache):
+        self.cache = cache
+
+    def resolve(self, db: Session, names: Iterable[str]) -> Dict[str, str]:
+        """Return ``{name: tag_id}`` for ``names``, creating missing tags."""
+        names = list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+        pending = db.info.setdefault(_PENDING_KEY, {})
+        ids = {name: pending[name] for name in names if name in pending}
+        ids.update(self.cache.get_many(name for name in names if name not in ids))
+        missing = [name for name in names if name not in ids]
+        if not missing:
+            return ids
+        found = self._lookup(db, missing)
+        # Rows that already existed are committed and safe to cache now
+        self.cache.put_many(found)
+        ids.update(found)
+        new_names = [name for name in missing if name not in found]
+        if new_names:
+            self._insert_missing(db, new_names)
+            created = self._lookup(db, new_names)
+            pending.update(created)
+            ids.update(created)
+        return ids
+
+    def attach(self, db: Session, target, names: Iterable[str]) -> None:
+        """Attach tags by name to a resume or requirement, creating missing tags."""
+        table, owner_column = self._links(target)
+        ids = self.resolve(db, names)
+        if not ids:
+            return
+        # Write out the target and any pending collection changes first, so
+        # the existing links read below are complete
+        db.flush()
+        existing = set(db.scalars(
+            select(table.c.tag_id).where(owner_column == target.id, table.c.tag_id.in_(ids.values()))
+        ))
+        rows = [
+            {owner_column.name: target.id, "tag_id": tag_id}
+            for tag_id in dict.fromkeys(ids.values()) if tag_id not in existing
+        ]
+        if rows:
+            db.execute(insert(table), rows)
+            # The loaded collection no longer matches the table
+            db.expire(target, ["tags"])
+            self._note_retagged(db, target)
+
+    def detach_all(self, db: Session, target) -> None:
+        """Remove every tag from a resume or requirement."""
+        table, owner_column = self._links(target)
+        db.flush()
+        db.execute(delete(table).where(owner_column == target.id))
+        db.expire(target, ["tags"])
+        self._note_retagged(db, target)
+
+    def _links(self, target):
+        if isinstance(target, models.Resume):
+            return models.resume_tags, models.resume_tags.c.resume_id
+        if isinstance(target, models.Requirement):
+            return models.requirement_tags, models.requirement_tags.c.requirement_id
+        raise TypeError(f"Cannot tag {type(target).__name__}")
+
+    def _note_retagged(self, db: Session, target) -> None:
+        # Link rows written with core statements are invisible to flush
+        # events; listeners that track resume tags read this instead
+        if isinstance(target, models.Resume):
+            db.info.setdefault(RETAGGED_RESUMES_KEY, set()).add(target.id)
+
+    def _lookup(self, db: Session, names: List[str]) -> Dict[str, str]:
+        rows = db.execute(select(models.Tag.name, models.Tag.id).where(models.Tag.name.in_(names)))
+        return {name: tag_id for name, tag_id in rows}
+
+    def _insert_missing(self, db: Session, names: List[str]) -> None:
+        rows = [{"id": models.generate_uuid(), "name": name, "category": tag_category(name)} for name in names]
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            statement = dialect_insert(models.Tag).on_conflict_do_nothing(index_elements=["name"])
+            db.execute(statement, rows)
+            return
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(models.Tag), [row])
+            except IntegrityError:
+                pass  # inserted concurrently by another transaction
+
+tag_service = TagService(TagCache())
+
+@event.listens_for(Session, "after_flush")
+def _collect_stale_tags(session, flush_context):
+    # Renamed or deleted Tag objects must not be served from the cache
+    stale = session.info.setdefault(_STALE_KEY, set())
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, models.Tag):
+            stale.add(instance.name)
+            stale.update(inspect(instance).attrs.name.history.deleted or ())
+
+@event.listens_for(Session, "after_commit")
+def _publish_tag_cache(session):
+    tag_service.cache.discard(session.info.pop(_STALE_KEY, ()))
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        tag_service.cache.put_many(pending)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_tags(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_STALE_KEY, None)
@@ -0,0 +1,223 @@
+"""Skill taxonomy used to normalise skills and derive tags.
+
+The taxonomy is a JSON file (``TAG_TAXONOMY_PATH``, defaulting to the
+``taxonomy.json`` next to this module) listing canonical skills with their
+aliases and domains, and a domain hierarchy. It is compiled into a hash
+index from normalised name to skill, plus a token trie for finding
+multi-word skills in free text such as requirement descriptions. The file is
+re-read when its modification time changes.
+"""
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+TAG_TAXONOMY_PATH = Path(os.getenv("TAG_TAXONOMY_PATH", Path(__file__).with_name("taxonomy.json")))
+TAXONOMY_CHECK_INTERVAL = float(os.getenv("TAXONOMY_CHECK_INTERVAL", "5"))
+
+DOMAIN_TAG_PREFIX = "domain:"
+
+# "Node.js", "NodeJS" and "node-js" all normalise to "nodejs"; a leading dot
+# (".NET") and symbols (C++, C#) are kept.
+_INNER_SEPARATOR = re.compile(r"(?<=\w)[.\-_](?=\w)")
+_TOKEN = re.compile(r"[\w+#]+(?:[.\-_][\w+#]+)*|\.\w+")
+_SPACES = re.compile(r"\s+")
+
+@lru_cache(maxsize=65536)
+def normalise(term: str) -> str:
+    """Normalised lookup key for a skill name or alias."""
+    term = unicodedata.normalize("NFKC", term).casefold().strip()
+    return _SPACES.sub(" ", _INNER_SEPARATOR.sub("", term))
+
+def tokenise(text: str) -> List[str]:
+    return [normalise(token) for token in _TOKEN.findall(unicodedata.normalize("NFKC", text).casefold())]
+
+@dataclass(frozen=True)
+class SkillEntry:
+    name: str
+    domains: Tuple[str, ...]  # including ancestor domains
+
+class Taxonomy:
+    """Compiled taxonomy; build with :meth:`from_config`."""
+
+    def __init__(self, skills: Dict[str, SkillEntry], trie: Dict[str, Any], domains: Dict[str, Optional[str]]):
+        self._skills = skills
+        self._trie = trie
+        self.domains = domains
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "Taxonomy":
+        """Compile a taxonomy config.
+
+        Raises:
+            ValueError: If the config references unknown domains, has a
+                cycle in the domain hierarchy or maps an alias twice
+        """
+        domains = {
+            name: (spec or {}).get("parent")
+            for name, spec in config.get("domains", {}).items()
+        }
+        ancestry: Dict[str, Tuple[str, ...]] = {}
+        for domain in domains:
+            chain, current = [], domain
+            while current is not None:
+                if current not in domains:
+                    raise ValueError(f"Unknown parent domain: {current}")
+                if current in chain:
+                    raise ValueError(f"Cycle in domain hierarchy at: {current}")
+                chain.append(current)
+                current = domains[current]
+            ancestry[domain] = tuple(chain)
+
+        skills: Dict[str, SkillEntry] = {}
+        trie: Dict[str, Any] = {}
+        for name, spec in config.get("skills", {}).items():
+            spec = spec or {}
+            expanded: List[str] = []
+            for domain in spec.get("domains", []):
+                if domain not in ancestry:
+                    raise ValueError(f"Skill {name} references unknown domain: {domain}")
+                expanded.extend(d for d in ancestry[domain] if d not in expanded)
+            entry = SkillEntry(name, tuple(expanded))
+            ambiguous = {normalise(term) for term in spec.get("ambiguous", [])}
+            for term in [name, *spec.get("aliases", [])]:
+                key = normalise(term)
+                if skills.get(key, entry) != entry:
+                    raise ValueError(f"Alias {term!r} maps to both {skills[key].name} and {name}")
+                skills[key] = entry
+                # Ambiguous terms ("go") only match whole skill names, not prose
+                if key in ambiguous:
+                    continue
+                node = trie
+                for token in tokenise(term):
+                    node = node.setdefault(token, {})
+                node[None] = entry
+        return cls(skills, trie, domains)
+
+    @classmethod
+    def load(cls, path: Path) -> "Taxonomy":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_config(json.load(f))
+
+    @property
+    def size(self) -> int:
+        return len({entry.name for entry in self._skills.values()})
+
+    def lookup(self, skill: str) -> Optional[SkillEntry]:
+        return self._skills.get(normalise(skill))
+
+    def canonical(self, skill: str) -> str:
+        """Canonical name of ``skill``, or the trimmed input if it is unknown."""
+        entry = self.lookup(skill)
+        return entry.name if entry else skill.strip()
+
+    def normalise_skills(self, skills: Iterable[str]) -> List[str]:
+        """Canonicalise and de-duplicate a skill list, keeping its order."""
+        result: Dict[str, None] = {}
+        for skill in skills:
+            if skill and skill.strip():
+                result.setdefault(self.canonical(skill), None)
+        return list(result)
+
+    def domain_tags(self, skills: Iterable[str]) -> List[str]:
+        """``domain:*`` tags, including ancestor domains, for known skills."""
+        tags: Dict[str, None] = {}
+        for skill in skills:
+            entry = self.lookup(skill)
+            if entry:
+                for domain in entry.domains:
+                    tags.setdefault(f"{DOMAIN_TAG_PREFIX}{domain}", None)
+        return list(tags)
+
+    def match_text(self, text: str) -> List[str]:
+        """Canonical names of skills mentioned in free text, in order.
+
+        Walks the token trie from each position and keeps the longest match,
+        so "spring boot" is found as one skill rather than "spring".
+        """
+        tokens = tokenise(text)
+        found: Dict[str, None] = {}
+        i = 0
+        while i < len(tokens):
+            node, match, end = self._trie, None, i
+            for j in range(i, len(tokens)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if None in node:
+                    match, end = node[None], j + 1
+            if match:
+                found.setdefault(match.name, None)
+                i = end
+            else:
+                i += 1
+        return list(found)
+
+    def tags_for_text(self, text: str) -> List[str]:
+        """Skill and domain tags for free text such as a requirement description."""
+        skills = self.match_text(text)
+        return skills + self.domain_tags(skills)
+
+class TaxonomyStore:
+    """Holds the compiled taxonomy and reloads it when the file changes.
+
+    The file's modification time is checked at most every
+    ``check_interval`` seconds. A file that fails to compile is reported
+    and the previous taxonomy stays in use.
+    """
+
+    def __init__(self, path: Path = TAG_TAXONOMY_PATH, check_interval: float = TAXONOMY_CHECK_INTERVAL):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._taxonomy: Optional[Taxonomy] = None
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Taxonomy:
+        now = time.monotonic()
+        if self._taxonomy is None or now - self._checked >= self.check_interval:
+            self._checked = now
+            try:
+                mtime = self.path.stat().st_mtime
+            except OSError as e:
+                if self._taxonomy is None:
+                    raise ValueError(f"Taxonomy file not readable: {e}")
+                return self._taxonomy
+            if mtime != self._mtime:
+                try:
+                    self.reload()
+                except ValueError as e:
+                    if self._taxonomy is None:
+                        raise
+                    print(f"Taxonomy reload failed, keeping previous version: {e}")
+                    # Do not retry the broken file until it changes again
+                    self._mtime = mtime
+        return self._taxonomy
+
+    def reload(self) -> Taxonomy:
+        """Compile the taxonomy file now.
+
+        Raises:
+            ValueError: If the file cannot be read or compiled
+        """
+        with self._lock:
+            try:
+                mtime = self.path.stat().st_mtime
+                taxonomy = Taxonomy.load(self.path)
+            except (OSError, json.JSONDecodeError) as e:
+                raise ValueError(f"Failed to load taxonomy {self.path}: {e}")
+            self._taxonomy, self._mtime = taxonomy, mtime
+            print(f"Loaded skill taxonomy: {taxonomy.size} skills, {len(taxonomy.domains)} domains")
+            return taxonomy
+
+taxonomy_store = TaxonomyStore()
+
+def get_taxonomy() -> Taxonomy:
+    return taxonomy_store.get()
@@ -0,0 +1,112 @@
+"""Benchmark the candidate dedup job on a synthetic candidate pool.
+
+Usage (from the backend directory)::
+
+    DATABASE_URL=sqlite:////tmp/dedup_bench.db python -m benchmarks.dedup_benchmark --candidates 200000
+
+Generates ``--candidates`` candidates with one resume each (the full-text
+benchmark's resume generator) and plants ``--duplicates`` of them a second
+time: some under the same email written differently, the rest under a new
+email with a lightly edited resume and the same or a reordered name. It runs
+the dedup job without storing its result and reports the scan and pairing
+time, peak memory, and how many planted pairs were found (recall) and how
+many found pairs were planted (precision). Point DATABASE_URL at a scratch
+database: the pool is written into it.
+"""
+import argparse
+import random
+import resource
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app import database, dedup, models
+from app.extraction import compress_text
+from benchmarks.fts_benchmark import filler_vocabulary, make_document
+
+FIRST_NAMES = ["Wei", "Jane", "John", "Li", "Maria", "Ahmed", "Yuki", "Olga", "Carlos", "Priya", "Tom", "Fatima"]
+LAST_NAMES = ["Zhang", "Smith", "Garcia", "Wang", "Kim", "Nguyen", "Muller", "Rossi", "Khan", "Sato", "Silva", "Chen"]
+
+def edit(text: str, rng: random.Random) -> str:
+    """A re-sent resume: one line dropped and a few words changed."""
+    lines = text.split("\n")
+    del lines[rng.randrange(1, len(lines))]
+    words = "\n".join(lines).split(" ")
+    for _ in range(max(1, len(words) // 30)):
+        words[rng.randrange(len(words))] = "updated"
+    return " ".join(words)
+
+def load_pool(candidates: int, duplicates: int, batch_size: int, seed: int):
+    """Store the pool; returns the planted (original, duplicate) id pairs."""
+    rng = random.Random(seed)
+    filler, cumulative = filler_vocabulary(20000, rng)
+    models.Base.metadata.create_all(database.engine)
+    duplicate_every = max(candidates // max(duplicates, 1), 1)
+    planted = set()
+    created = datetime(2020, 1, 1)
+    for offset in range(0, candidates, batch_size):
+        count = min(batch_size, candidates - offset)
+        candidate_rows, resume_rows = [], []
+        for number in range(offset, offset + count):
+            created += timedelta(seconds=1)
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            row = {
+                "id": str(uuid.uuid4()), "name": f"{first} {last}", "email": f"c{number}@example.com",
+                "phone": f"+1 555 {number:07d}", "created_at": created
+            }
+            text = make_document(rng, filler, cumulative)
+            candidate_rows.append(row)
+            resume_rows.append({
+                "id": str(uuid.uuid4()), "candidate_id": row["id"], "file_path": "benchmark",
+                "file_type": "text", "extracted_text": compress_text(text)
+            })
+            if number % duplicate_every == 0 and len(planted) < duplicates:
+                copy = {"id": str(uuid.uuid4()), "created_at": created + timedelta(days=30), "phone": None}
+                if rng.random() < 0.3:
+                    copy.update(name=row["name"], email=row["email"].upper())
+                    copy_text = make_document(rng, filler, cumulative)
+                else:
+                    name = f"{last} {first}" if rng.random() < 0.5 else row["name"]
+                    copy.update(name=name, email=f"dup{number}@example.org")
+                    copy_text = edit(text, rng)
+                candidate_rows.append(copy)
+                resume_rows.append({
+                    "id": str(uuid.uuid4()), "candidate_id": copy["id"], "file_path": "benchmark",
+                    "file_type": "text", "extracted_text": compress_text(copy_text)
+                })
+                planted.add((row["id"], copy["id"]))
+        with database.engine.begin() as connection:
+            connection.execute(insert(models.Candidate.__table__), candidate_rows)
+            connection.execute(insert(models.Resume.__table__), resume_rows)
+        print(f"  {offset + count} candidates")
+    return planted
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=200_000)
+    parser.add_argument("--duplicates", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"Database: {database.engine.url}")
+    print(f"Loading {args.candidates} candidates and {args.duplicates} duplicates...")
+    planted = load_pool(args.candidates, args.duplicates, args.batch_size, args.seed)
+
+    began = time.perf_counter()
+    finder = dedup.scan(args.batch_size)
+    scanned = time.perf_counter()
+    pairs = finder.pairs()
+    paired = time.perf_counter()
+    found = {(pair.candidate_id, pair.duplicate_id) for pair in pairs}
+    hits = len(found & planted)
+    print(f"Scan (keys, text, MinHash): {scanned - began:.1f}s ({len(finder.ids) / (scanned - began):.0f} candidates/s)")
+    print(f"LSH pairing and verification: {paired - scanned:.1f}s")
+    print(f"Found {len(found)} pairs; recall {hits / max(len(planted), 1):.3f}, "
+          f"precision {hits / max(len(found), 1):.3f}")
+    print(f"Peak memory: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Benchmark resume full-text search on a synthetic corpus.
+
+Usage (from the backend directory)::
+
+    DATABASE_URL=sqlite:////tmp/fts_bench.db python -m benchmarks.fts_benchmark --documents 1000000
+
+Generates ``--documents`` resume-like texts (a few bullet points built from
+technology, industry and verb lists plus Zipf-distributed filler words),
+stores them as resumes and indexes them through app.search in batches. It
+then reports indexing throughput and, for a set of queries from rare to very
+common, the latency of the first and of a later result page. Point
+DATABASE_URL at a scratch database: the corpus is written into it.
+"""
+import argparse
+import random
+import statistics
+import string
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import Response
+from sqlalchemy import insert
+
+from app import database, models, search
+
+TECHNOLOGIES = [
+    "python", "java", "golang", "rust", "typescript", "react", "angular", "vue", "django", "flask",
+    "spring", "kubernetes", "docker", "terraform", "ansible", "aws", "azure", "gcp", "kafka", "spark",
+    "hadoop", "airflow", "postgresql", "mysql", "mongodb", "redis", "elasticsearch", "graphql", "grpc",
+    "tensorflow", "pytorch", "pandas", "scala", "swift", "kotlin", "flutter", "linux", "jenkins",
+]
+INDUSTRIES = [
+    "fintech", "healthcare", "ecommerce", "logistics", "insurance", "gaming", "telecom", "retail",
+    "banking", "edtech", "automotive", "energy", "media", "travel", "biotech", "government",
+]
+VERBS = [
+    "led", "built", "designed", "migrated", "scaled", "automated", "optimised", "launched",
+    "refactored", "maintained", "mentored", "delivered", "integrated", "monitored", "secured",
+]
+OBJECTS = [
+    "platform", "pipeline", "service", "migration", "dashboard", "api", "cluster", "warehouse",
+    "checkout", "payments", "search", "recommendation engine", "mobile app", "data lake",
+]
+QUERIES = [
+    ("rare term", "zyxwv"),
+    ("uncommon pair", "flutter biotech"),
+    ("three terms", "kubernetes migration fintech"),
+    ("phrase", '"data lake"'),
+    ("or", "rust or scala"),
+    ("not", "react -angular"),
+    ("common term", "built"),
+]
+
+def filler_vocabulary(size: int, rng: random.Random):
+    words = {"".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(size)}
+    words.discard("zyxwv")
+    words = sorted(words)
+    # Cumulative weights, so each draw does not re-sum 20k weights
+    cumulative, total = [], 0.0
+    for rank in range(len(words)):
+        total += 1 / (rank + 1)
+        cumulative.append(total)
+    return words, cumulative
+
+def make_document(rng: random.Random, filler, cumulative) -> str:
+    lines = [f"{rng.choice(['Senior', 'Lead', 'Staff', ''])} Engineer, {rng.choice(INDUSTRIES).title()} Corp"]
+    for _ in range(rng.randint(4, 8)):
+        lines.append(
+            f"- {rng.choice(VERBS).title()} the {rng.choice(TECHNOLOGIES)} {rng.choice(OBJECTS)} "
+            f"for a {rng.choice(INDUSTRIES)} client using {rng.choice(TECHNOLOGIES)} and "
+            f"{rng.choice(TECHNOLOGIES)}; " + " ".join(rng.choices(filler, cum_weights=cumulative, k=rng.randint(8, 20)))
+        )
+    lines.append("Skills: " + ", ".join(rng.sample(TECHNOLOGIES, rng.randint(4, 10))))
+    return "\n".join(lines)
+
+def load_corpus(documents: int, batch_size: int, seed: int) -> float:
+    """Store and index the corpus; returns seconds spent indexing."""
+    rng = random.Random(seed)
+    filler, cumulative = filler_vocabulary(20000, rng)
+    models.Base.metadata.create_all(database.engine)
+    candidate_id = str(uuid.uuid4())
+    started = datetime(2020, 1, 1)
+    index_seconds = 0.0
+    with database.engine.begin() as connection:
+        connection.execute(insert(models.Candidate.__table__), [
+            {"id": candidate_id, "name": "Benchmark", "email": "benchmark@example.com"}
+        ])
+    for offset in range(0, documents, batch_size):
+        count = min(batch_size, documents - offset)
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "candidate_id": candidate_id,
+                "file_path": "benchmark",
+                "file_type": "text",
+                "created_at": started + timedelta(seconds=offset + i),
+            }
+            for i in range(count)
+        ]
+        bodies = [(row["id"], make_document(rng, filler, cumulative)) for row in rows]
+        with database.engine.begin() as connection:
+            connection.execute(insert(models.Resume.__table__), rows)
+            began = time.perf_counter()
+            search.index_documents(connection, bodies)
+            index_seconds += time.perf_counter() - began
+        print(f"  {offset + count} documents, {(offset + count) / index_seconds:.0f} docs/s indexing")
+    return index_seconds
+
+def time_query(query: str, pages: int, repeat: int):
+    """Median seconds for the first page and for page ``pages``, and the hit count."""
+    first, later, hits = [], [], 0
+    with database.SessionLocal() as db:
+        for _ in range(repeat):
+            cursor = None
+            for page in range(1, pages + 1):
+                response = Response()
+                began = time.perf_counter()
+                results = search.search_resumes(db, query, response, 20, cursor)
+                elapsed = time.perf_counter() - began
+                if page == 1:
+                    first.append(elapsed)
+                    hits = len(results)
+                elif page == pages:
+                    later.append(elapsed)
+                cursor = response.headers.get("X-Next-Cursor")
+                if cursor is None:
+                    break
+    return statistics.median(first), statistics.median(later) if later else None, hits
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--pages", type=int, default=5, help="page whose latency is reported as 'later page'")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-load", action="store_true", help="query an already loaded corpus")
+    args = parser.parse_args()
+
+    print(f"Database: {database.engine.url}")
+    if not args.skip_load:
+        print(f"Loading {args.documents} documents...")
+        seconds = load_corpus(args.documents, args.batch_size, args.seed)
+        print(f"Indexed {args.documents} documents in {seconds:.1f}s ({args.documents / seconds:.0f} docs/s)")
+    print(f"{'query':<16} {'text':<32} {'page 1':>10} {'page ' + str(args.pages):>10}")
+    for name, query in QUERIES:
+        first, later, hits = time_query(query, args.pages, args.repeat)
+        later_text = f"{later * 1000:8.1f}ms" if later is not None else "         -"
+        print(f"{name:<16} {query:<32} {first * 1000:8.1f}ms {later_text}  ({hits} hits on page 1)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Benchmark candidate-project matching on a synthetic candidate pool.
+
+Usage (from the backend directory)::
+
+    DATABASE_URL=sqlite:////tmp/match_bench.db python -m benchmarks.matching_benchmark --candidates 200000
+
+Generates ``--candidates`` candidates with one resume each, tagged with a
+Zipf-distributed sample of ``--tags`` tags, and a project whose requirements
+use a mix of common and rare tags. It reports the time to load the tag
+matrix, the latency of ranking the pool for the project, and of ranking again
+after a batch of resumes was re-tagged. Point DATABASE_URL at a scratch
+database: the pool is written into it.
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from app import database, matching, models
+
+LEVELS = list(matching.LEVEL_YEARS)
+
+def tag_rows(count: int):
+    return [{"id": str(uuid.uuid4()), "name": f"skill-{rank:05d}", "category": "skill"} for rank in range(count)]
+
+def load_pool(candidates: int, tags: list, per_candidate: int, batch_size: int, seed: int) -> None:
+    rng = random.Random(seed)
+    cumulative, total = [], 0.0
+    for rank in range(len(tags)):
+        total += 1 / (rank + 1)
+        cumulative.append(total)
+    models.Base.metadata.create_all(database.engine)
+    with database.engine.begin() as connection:
+        connection.execute(insert(models.Tag.__table__), tags)
+    for offset in range(0, candidates, batch_size):
+        count = min(batch_size, candidates - offset)
+        candidate_rows, resume_rows, link_rows = [], [], []
+        for _ in range(count):
+            candidate_id, resume_id = str(uuid.uuid4()), str(uuid.uuid4())
+            candidate_rows.append({
+                "id": candidate_id, "name": "Benchmark", "email": "benchmark@example.com",
+                "total_years_experience": round(rng.uniform(0, 15), 1), "created_at": datetime(2020, 1, 1)
+            })
+            resume_rows.append({"id": resume_id, "candidate_id": candidate_id, "file_path": "benchmark", "file_type": "text"})
+            chosen = {tags[i]["id"] for i in _sample(rng, cumulative, per_candidate)}
+            link_rows.extend({"resume_id": resume_id, "tag_id": tag_id} for tag_id in chosen)
+        with database.engine.begin() as connection:
+            connection.execute(insert(models.Candidate.__table__), candidate_rows)
+            connection.execute(insert(models.Resume.__table__), resume_rows)
+            connection.execute(insert(models.resume_tags), link_rows)
+        print(f"  {offset + count} candidates")
+
+def _sample(rng: random.Random, cumulative, count: int):
+    return rng.choices(range(len(cumulative)), cum_weights=cumulative, k=rng.randint(count // 2, count * 3 // 2))
+
+def create_project(tags: list, seed: int) -> str:
+    rng = random.Random(seed)
+    with database.SessionLocal() as db:
+        project = models.Project(
+            title="Benchmark", department="Engineering", headcount=1, job_type="full-time",
+            job_level="senior", location="Remote", remote_policy="remote", description="Benchmark",
+            responsibilities=[], qualifications=[], target_date=datetime(2030, 1, 1)
+        )
+        db.add(project)
+        db.flush()
+        # Common, mid-frequency and rare tags, required and preferred
+        for indexes, required in [([0, 3, 40], True), ([12, 150, 900], True), ([1, 600], False), ([5, 2000], False)]:
+            requirement = models.Requirement(project_id=project.id, description="Benchmark", is_required=required)
+            db.add(requirement)
+            db.flush()
+            db.execute(insert(models.requirement_tags), [
+                {"requirement_id": requirement.id, "tag_id": tags[min(i + rng.randint(0, 2), len(tags) - 1)]["id"]}
+                for i in indexes
+            ])
+        db.commit()
+        return project.id
+
+def time_match(project_id: str, limit: int, repeat: int):
+    times = []
+    with database.SessionLocal() as db:
+        project = db.get(models.Project, project_id)
+        for _ in range(repeat):
+            began = time.perf_counter()
+            matches = matching.match_project(db, project, limit)
+            times.append(time.perf_counter() - began)
+    return statistics.median(times), matches
+
+def retag(count: int, tags: list, seed: int) -> None:
+    """Replace the tags of ``count`` random resumes through the ORM, as a reparse would."""
+    rng = random.Random(seed)
+    with database.SessionLocal() as db:
+        resume_ids = db.scalars(select(models.Resume.id).order_by(models.Resume.id).limit(count * 10)).all()
+        tag_objects = db.scalars(select(models.Tag).where(models.Tag.id.in_([tag["id"] for tag in tags[:200]]))).all()
+        for resume_id in rng.sample(resume_ids, min(count, len(resume_ids))):
+            resume = db.get(models.Resume, resume_id)
+            resume.tags = rng.sample(tag_objects, 10)
+        db.commit()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=200_000)
+    parser.add_argument("--tags", type=int, default=5000)
+    parser.add_argument("--tags-per-candidate", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--retag", type=int, default=500, help="resumes re-tagged before the incremental run")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"Database: {database.engine.url}")
+    tags = tag_rows(args.tags)
+    print(f"Loading {args.candidates} candidates...")
+    load_pool(args.candidates, tags, args.tags_per_candidate, args.batch_size, args.seed)
+    project_id = create_project(tags, args.seed)
+
+    began = time.perf_counter()
+    first, matches = time_match(project_id, args.limit, 1)
+    print(f"First match (loads the matrix): {(time.perf_counter() - began) * 1000:.0f}ms")
+    latency, matches = time_match(project_id, args.limit, args.repeat)
+    print(f"Ranking {args.candidates} candidates: {latency * 1000:.1f}ms median, "
+          f"top score {matches[0].score:.3f}" if matches else "no matches")
+    retag(args.retag, tags, args.seed)
+    first, _ = time_match(project_id, args.limit, 1)
+    latency, _ = time_match(project_id, args.limit, args.repeat)
+    print(f"After re-tagging {args.retag} resumes: {first * 1000:.1f}ms first (applies the changes), "
+          f"{latency * 1000:.1f}ms median")
+
+if __name__ == "__main__":
+    main()
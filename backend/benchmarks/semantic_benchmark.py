@@ -0,0 +1,123 @@
+"""Benchmark the semantic similarity index on a synthetic corpus.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.semantic_benchmark --documents 1000000 --directory /tmp/semantic_bench
+
+Vectorises ``--documents`` resume-like texts straight into a SemanticIndex
+in ``--directory`` and clusters it. Unlike the full-text benchmark's corpus,
+where every technology is equally likely in every resume, each synthetic
+candidate here has a profile (frontend, data, ...) that most of their
+technologies come from, as real resumes do. It then reports, for several
+SEMANTIC_PROBE_FRACTION values, query latency and the recall@10 of the IVF results
+against an exact scan of every row, plus the process's peak memory. No
+database is used.
+"""
+import argparse
+import random
+import resource
+import shutil
+import statistics
+import time
+import uuid
+
+import numpy as np
+
+from app import semantic
+from benchmarks.fts_benchmark import INDUSTRIES, OBJECTS, TECHNOLOGIES, VERBS, filler_vocabulary
+
+PROFILES = {
+    "frontend": ["react", "angular", "vue", "typescript", "graphql"],
+    "backend": ["python", "java", "golang", "django", "flask", "spring", "grpc", "postgresql", "mysql", "redis"],
+    "data": ["spark", "hadoop", "airflow", "kafka", "pandas", "scala", "elasticsearch", "mongodb"],
+    "ml": ["tensorflow", "pytorch", "pandas", "python", "spark"],
+    "devops": ["kubernetes", "docker", "terraform", "ansible", "aws", "azure", "gcp", "linux", "jenkins"],
+    "mobile": ["swift", "kotlin", "flutter", "graphql"],
+}
+PROBE_FRACTIONS = [0.1, 0.25, 0.5, 0.65, 0.8]
+
+QUERIES = [
+    "Senior engineer to run kubernetes and terraform for a fintech platform",
+    "Frontend developer, react and typescript, ecommerce checkout",
+    "Data engineer building spark and airflow pipelines into a data lake",
+    "Machine learning with pytorch for healthcare",
+    "Mobile app in flutter or swift for a travel company",
+    "k8s docker golang microservices",
+]
+
+def make_document(rng: random.Random, filler, cumulative) -> str:
+    technologies = PROFILES[rng.choice(list(PROFILES))]
+    industry = rng.choice(INDUSTRIES)
+    technology = lambda: rng.choice(technologies) if rng.random() < 0.8 else rng.choice(TECHNOLOGIES)
+    lines = [f"{rng.choice(['Senior', 'Lead', 'Staff', ''])} Engineer, {industry.title()} Corp"]
+    for _ in range(rng.randint(4, 8)):
+        lines.append(
+            f"- {rng.choice(VERBS).title()} the {technology()} {rng.choice(OBJECTS)} for a "
+            f"{industry if rng.random() < 0.7 else rng.choice(INDUSTRIES)} client using {technology()} and "
+            f"{technology()}; " + " ".join(rng.choices(filler, cum_weights=cumulative, k=rng.randint(8, 20)))
+        )
+    lines.append("Skills: " + ", ".join(dict.fromkeys(technology() for _ in range(rng.randint(4, 10)))))
+    return "\n".join(lines)
+
+def load(index: semantic.SemanticIndex, documents: int, batch_size: int, seed: int) -> float:
+    rng = random.Random(seed)
+    filler, cumulative = filler_vocabulary(20000, rng)
+    began = time.perf_counter()
+    for offset in range(0, documents, batch_size):
+        count = min(batch_size, documents - offset)
+        index.upsert(
+            [(semantic.KIND_RESUME, str(uuid.uuid4()), make_document(rng, filler, cumulative)) for _ in range(count)],
+            replace=False, cluster=False
+        )
+        elapsed = time.perf_counter() - began
+        print(f"  {offset + count} documents, {(offset + count) / elapsed:.0f} docs/s")
+    return time.perf_counter() - began
+
+def time_queries(index: semantic.SemanticIndex, repeat: int):
+    latencies, results = [], []
+    for query in QUERIES:
+        vector = index.vectorise(query)
+        times = []
+        for _ in range(repeat):
+            began = time.perf_counter()
+            hits = index.search(vector, semantic.KIND_RESUME, 10)
+            times.append(time.perf_counter() - began)
+        latencies.append(statistics.median(times))
+        results.append({doc_id for doc_id, _ in hits})
+    return latencies, results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--directory", default="/tmp/semantic_bench")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--skip-load", action="store_true", help="query an already loaded index")
+    args = parser.parse_args()
+
+    index = semantic.SemanticIndex(args.directory)
+    if not args.skip_load:
+        shutil.rmtree(args.directory, ignore_errors=True)
+        print(f"Loading {args.documents} documents into {args.directory}...")
+        seconds = load(index, args.documents, args.batch_size, args.seed)
+        print(f"Indexed {args.documents} documents in {seconds:.1f}s ({args.documents / seconds:.0f} docs/s)")
+        began = time.perf_counter()
+        clusters = index.train()
+        print(f"Clustered into {clusters} lists in {time.perf_counter() - began:.1f}s")
+
+    index._refresh()  # load a --skip-load index before swapping its clusters out
+    centroids, index._centroids = index._centroids, None  # exact scan for comparison
+    exact_latency, exact_results = time_queries(index, 1)
+    index._centroids = centroids
+    print(f"Exact scan: {statistics.median(exact_latency) * 1000:.1f}ms median")
+    for fraction in PROBE_FRACTIONS:
+        semantic.SEMANTIC_PROBE_FRACTION = fraction
+        latency, results = time_queries(index, args.repeat)
+        recall = np.mean([len(ivf & exact) / max(len(exact), 1) for ivf, exact in zip(results, exact_results)])
+        print(f"IVF probing {fraction:4.0%}: {statistics.median(latency) * 1000:6.1f}ms median, "
+              f"{max(latency) * 1000:6.1f}ms max, recall@10 {recall:.2f}")
+    print(f"Peak memory: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+if __name__ == "__main__":
+    main()
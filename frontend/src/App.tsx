@@ -10,8 +10,8 @@ import { AnalyticsDashboard } from './components/ui/analytics-dashboard'
 import { SidebarProvider, Sidebar, SidebarMenu } from './components/ui/sidebar'
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from './components/ui/dialog'
 import { Badge } from './components/ui/badge'
-import { api } from './lib/api'
-import type { Candidate, Project, Interview, Resume, Tag } from './lib/api'
+import { api, applyChanges, ChangesExpiredError } from './lib/api'
+import type { Candidate, EntityChange, Project, Interview, Resume, Tag } from './lib/api'
 import { cn } from './lib/utils'
 import * as React from 'react'
 import { useState, useEffect } from 'react'
@@ -32,8 +32,13 @@ export default function App() {
   const updateInterviews = (data: Interview[]) => setInterviews(data);
   const updateProjects = (data: Project[]) => setProjects(data);
 
+  // Change feed position of the loaded lists; null until a full load succeeded
+  const cursorRef = React.useRef<number | null>(null);
+
   const refreshData = React.useCallback(async () => {
     try {
+      // Taken before the lists, so changes made while they load are replayed
+      const { cursor } = await api.getChanges();
       type ApiResults = [
         Promise<Candidate[]>,
         Promise<Resume[]>,
@@ -46,6 +51,7 @@ export default function App() {
         api.getProjects(),
         api.getInterviews()
       ]);
+    if (results.every(result => result.status === 'fulfilled')) cursorRef.current = cursor;
     
     results.forEach((result, index) => {
       if (result.status === 'fulfilled') {
@@ -74,23 +80,48 @@ export default function App() {
     }
   }, []);
 
+  // Fetch only what changed since the last load or sync and merge it in
+  const syncChanges = React.useCallback(async () => {
+    if (cursorRef.current === null) return refreshData();
+    try {
+      const changes: EntityChange[] = [];
+      let cursor = cursorRef.current;
+      for (;;) {
+        const feed = await api.getChanges(cursor);
+        changes.push(...feed.changes);
+        cursor = feed.cursor;
+        if (!feed.has_more) break;
+      }
+      if (changes.length) {
+        setCandidates(items => applyChanges(items, changes, 'candidate'));
+        setResumes(items => applyChanges(items, changes, 'resume'));
+        setProjects(items => applyChanges(items, changes, 'project'));
+        setInterviews(items => applyChanges(items, changes, 'interview'));
+      }
+      cursorRef.current = cursor;
+    } catch (error) {
+      if (error instanceof ChangesExpiredError) return refreshData();
+      throw error;
+    }
+  }, [refreshData]);
+
   // Initial data load
   useEffect(() => {
     refreshData();
   }, [refreshData]);
 
-  // Auto refresh with error handling and loading state
+  // Poll the change feed; a poll with nothing new costs next to nothing
   useEffect(() => {
     const interval = setInterval(async () => {
       try {
-        await refreshData();
+        await syncChanges();
       } catch (error) {
         console.error('Auto-refresh failed:', error);
         // Don't show toast for background refresh errors
       }
-    }, 15000); // Reduced to 15 seconds for better real-time updates
+    }, 5000);
     return () => clearInterval(interval);
-  }, [refreshData]);
+  }, [syncChanges]);
 
   // Use memoized update functions in refreshData
   const memoizedUpdateFunctions = React.useMemo(() => ({
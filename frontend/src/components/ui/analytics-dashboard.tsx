@@ -1,29 +1,28 @@
 import * as React from "react";
 import { Card, CardContent, CardHeader, CardTitle } from "./card";
 import { Progress } from "./progress";
-import type { Project, Interview, Resume } from "../../lib/api";
+import type { Analytics, Project } from "../../lib/api";
 import { api } from "../../lib/api";
 import { format } from "date-fns";
 import { ArrowDownIcon, ArrowUpIcon, MinusIcon } from "lucide-react";
 
 export function AnalyticsDashboard() {
   const [projects, setProjects] = React.useState<Project[]>([]);
-  const [interviews, setInterviews] = React.useState<Interview[]>([]);
-  const [resumes, setResumes] = React.useState<Resume[]>([]);
+  const [analytics, setAnalytics] = React.useState<Analytics | null>(null);
   const [loading, setLoading] = React.useState(true);
   const [error, setError] = React.useState<string | null>(null);
 
   React.useEffect(() => {
     const fetchData = async () => {
       try {
-        const [projectsData, interviewsData, resumesData] = await Promise.all([
+        // Figures come pre-aggregated from the server; only the progress
+        // list needs the projects themselves
+        const [projectsData, analyticsData] = await Promise.all([
           api.getProjects(),
-          api.getInterviews(),
-          api.getResumes()
+          api.getAnalytics(30)
         ]);
         setProjects(projectsData);
-        setInterviews(interviewsData);
-        setResumes(resumesData);
+        setAnalytics(analyticsData);
       } catch (err) {
         setError((err as Error).message);
       } finally {
@@ -51,88 +50,38 @@ export function AnalyticsDashboard() {
     return ((currentIndex + 1) / stages.length) * 100;
   };
 
-  const calculateProcessingEfficiency = () => {
-    const now = new Date();
-    const thirtyDaysAgo = new Date(now.getTime() - 30 * 24 * 60 * 60 * 1000);
-    const sixtyDaysAgo = new Date(now.getTime() - 60 * 24 * 60 * 60 * 1000);
-
-    const recentResumes = resumes.filter(r => new Date(r.created_at) >= thirtyDaysAgo);
-    const previousResumes = resumes.filter(r => {
-      const date = new Date(r.created_at);
-      return date >= sixtyDaysAgo && date < thirtyDaysAgo;
-    });
-
-    const recentEfficiency = recentResumes.filter(r => r.parsed_content).length / (recentResumes.length || 1);
-    const previousEfficiency = previousResumes.filter(r => r.parsed_content).length / (previousResumes.length || 1);
+  const compare = (recent: number, previous: number, change: number, lowerIsBetter = false) => ({
+    value: Math.round(recent),
+    trend: {
+      value: Math.round(change),
+      label: "vs 上月",
+      direction: (lowerIsBetter ? recent < previous : recent > previous) ? "up"
+        : (lowerIsBetter ? recent > previous : recent < previous) ? "down" : "neutral"
+    }
+  });
 
-    return {
-      value: Math.round(recentEfficiency * 100),
-      trend: {
-        value: Math.round((recentEfficiency - previousEfficiency) * 100),
-        label: "vs 上月",
-        direction: recentEfficiency > previousEfficiency ? "up" : recentEfficiency < previousEfficiency ? "down" : "neutral"
-      }
-    };
+  const calculateProcessingEfficiency = () => {
+    const recent = (analytics?.current.parse_success_rate ?? 0) * 100;
+    const previous = (analytics?.previous.parse_success_rate ?? 0) * 100;
+    return compare(recent, previous, recent - previous);
   };
 
   const calculateInterviewConversion = () => {
-    const now = new Date();
-    const thirtyDaysAgo = new Date(now.getTime() - 30 * 24 * 60 * 60 * 1000);
-    const sixtyDaysAgo = new Date(now.getTime() - 60 * 24 * 60 * 60 * 1000);
-
-    const recentInterviews = interviews.filter(i => new Date(i.created_at) >= thirtyDaysAgo);
-    const previousInterviews = interviews.filter(i => {
-      const date = new Date(i.created_at);
-      return date >= sixtyDaysAgo && date < thirtyDaysAgo;
-    });
-
-    const recentConversion = recentInterviews.filter(i => i.status === "completed").length / (recentInterviews.length || 1);
-    const previousConversion = previousInterviews.filter(i => i.status === "completed").length / (previousInterviews.length || 1);
-
-    return {
-      value: Math.round(recentConversion * 100),
-      trend: {
-        value: Math.round((recentConversion - previousConversion) * 100),
-        label: "vs 上月",
-        direction: recentConversion > previousConversion ? "up" : recentConversion < previousConversion ? "down" : "neutral"
-      }
-    };
+    const recent = (analytics?.current.interview_completion_rate ?? 0) * 100;
+    const previous = (analytics?.previous.interview_completion_rate ?? 0) * 100;
+    return compare(recent, previous, recent - previous);
   };
 
   const calculateRecruitmentCycle = () => {
-    const completedProjects = projects.filter(p => p.status === "closed");
-    const now = new Date();
-    const thirtyDaysAgo = new Date(now.getTime() - 30 * 24 * 60 * 60 * 1000);
-    const sixtyDaysAgo = new Date(now.getTime() - 60 * 24 * 60 * 60 * 1000);
-
-    const recentProjects = completedProjects.filter(p => new Date(p.created_at) >= thirtyDaysAgo);
-    const previousProjects = completedProjects.filter(p => {
-      const date = new Date(p.created_at);
-      return date >= sixtyDaysAgo && date < thirtyDaysAgo;
-    });
-
-    const calculateAverageCycle = (projects: Project[]) => {
-      if (projects.length === 0) return 0;
-      return projects.reduce((sum, p) => {
-        const start = new Date(p.created_at);
-        const end = new Date(p.updated_at || p.created_at);
-        return sum + (end.getTime() - start.getTime()) / (24 * 60 * 60 * 1000);
-      }, 0) / projects.length;
-    };
-
-    const recentCycle = calculateAverageCycle(recentProjects);
-    const previousCycle = calculateAverageCycle(previousProjects);
-
-    return {
-      value: Math.round(recentCycle),
-      trend: {
-        value: Math.round(((previousCycle - recentCycle) / (previousCycle || 1)) * 100),
-        label: "vs 上月",
-        direction: recentCycle < previousCycle ? "up" : recentCycle > previousCycle ? "down" : "neutral"
-      }
-    };
+    const recent = analytics?.current.average_cycle_days ?? 0;
+    const previous = analytics?.previous.average_cycle_days ?? 0;
+    return compare(recent, previous, ((previous - recent) / (previous || 1)) * 100, true);
   };
 
+  const projectScores = new Map(
+    (analytics?.project_scores ?? []).map((scores) => [scores.project_id, scores])
+  );
+
   const efficiency = calculateProcessingEfficiency();
   const conversion = calculateInterviewConversion();
   const cycle = calculateRecruitmentCycle();
@@ -250,8 +199,14 @@ export function AnalyticsDashboard() {
                       {project.department} · {getProjectStatus(project.status)}
                     </p>
                   </div>
-                  <div className="text-sm text-gray-500">
-                    目标日期: {format(new Date(project.target_date), 'yyyy-MM-dd')}
+                  <div className="text-right text-sm text-gray-500">
+                    <div>目标日期: {format(new Date(project.target_date), 'yyyy-MM-dd')}</div>
+                    {projectScores.get(project.id)?.overall_rating != null && (
+                      <div className="text-xs">
+                        面试平均评分: {projectScores.get(project.id)!.overall_rating!.toFixed(1)}
+                        （{projectScores.get(project.id)!.scored_interviews} 场）
+                      </div>
+                    )}
                   </div>
                 </div>
                 <Progress value={getProjectProgress(project)} className="h-2" />
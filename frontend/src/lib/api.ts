@@ -6,13 +6,17 @@ export interface Candidate {
   email: string;
   phone: string;
   state: 'available' | 'interviewing' | 'hired';
+  total_years_experience?: number | null;
+  career_level?: string | null;
   created_at: string;
+  updated_at?: string | null;
 }
 
 export interface Tag {
   id: string;
   name: string;
   category: string;
+  updated_at?: string | null;
 }
 
 export interface Resume {
@@ -22,6 +26,7 @@ export interface Resume {
   file_type: string;
   parsed_content: string | null;
   created_at: string;
+  updated_at?: string | null;
   tags: Tag[];
 }
 
@@ -54,6 +59,7 @@ export interface Requirement {
   description: string;
   is_required: boolean;
   created_at: string;
+  updated_at?: string | null;
   tags: Tag[];
 }
 
@@ -82,7 +88,178 @@ export interface Interview {
 
 export type InterviewCreate = Omit<Interview, 'id' | 'created_at' | 'updated_at'>
 
+export interface SimilarityQuery {
+  text?: string;
+  resume_id?: string;
+  requirement_id?: string;
+  project_id?: string;
+  kind?: 'resume' | 'requirement' | 'project';
+  limit?: number;
+}
+
+export interface SimilarDocument {
+  kind: 'resume' | 'requirement' | 'project';
+  id: string;
+  score: number;
+  candidate_id?: string;
+}
+
+// A likely duplicate pair from the dedup job; candidate_id is the older
+// candidate, the one to keep when merging
+export interface CandidateDuplicate {
+  candidate_id: string;
+  duplicate_id: string;
+  score: number;
+  reason: 'email' | 'phone' | 'text';
+  detected_at: string;
+}
+
+export interface CandidateMatch {
+  candidate_id: string;
+  name?: string;
+  score: number;
+  skill_score: number;
+  experience_score: number;
+  matched_tags: string[];
+}
+
+// List endpoints return one page, newest first; the cursor for the next
+// page comes back in the X-Next-Cursor header
+export interface ListParams {
+  limit?: number;
+  cursor?: string;
+  created_after?: string;
+  created_before?: string;
+  [filter: string]: string | number | string[] | undefined;
+}
+
+export interface CandidateSearch extends ListParams {
+  skills?: string[];
+  match?: 'all' | 'any';
+  languages?: string[];
+  min_years?: number;
+  career_level?: string;
+}
+
+// One entity inserted, updated or deleted since the cursor; data is its
+// current state as the list endpoint returns it, null when deleted
+export interface EntityChange {
+  seq: number;
+  entity: 'candidate' | 'resume' | 'project' | 'requirement' | 'interview' | 'tag';
+  id: string;
+  operation: 'insert' | 'update' | 'delete';
+  data: Record<string, unknown> | null;
+}
+
+export interface ChangeFeed {
+  cursor: number;
+  changes: EntityChange[];
+  has_more: boolean;
+}
+
+// The cursor is older than the server's change log: reload the lists
+export class ChangesExpiredError extends Error {}
+
+// Apply the changes of one entity type to a newest-first list
+export function applyChanges<T extends { id: string }>(
+  items: T[],
+  changes: EntityChange[],
+  entity: EntityChange['entity']
+): T[] {
+  const relevant = changes.filter((change) => change.entity === entity);
+  if (!relevant.length) return items;
+  const byId = new Map(relevant.map((change) => [change.id, change]));
+  const kept = items
+    .filter((item) => byId.get(item.id)?.operation !== 'delete')
+    .map((item) => (byId.has(item.id) ? (byId.get(item.id)!.data as unknown as T) : item));
+  const present = new Set(items.map((item) => item.id));
+  const inserted = relevant
+    .filter((change) => change.operation === 'insert' && !present.has(change.id))
+    .reverse()
+    .map((change) => change.data as unknown as T);
+  return [...inserted, ...kept];
+}
+
+// Rollups of the projects, interviews, resumes and parse jobs created in a
+// period; start and end are null for all time
+export interface AnalyticsPeriod {
+  start: string | null;
+  end: string | null;
+  projects: Record<string, number>;
+  interviews: Record<string, number>;
+  parse_jobs: Record<string, number>;
+  resumes: number;
+  parsed_resumes: number;
+  parse_success_rate: number | null;
+  interview_completion_rate: number | null;
+  average_cycle_days: number | null;
+}
+
+export interface ProjectScores {
+  project_id: string;
+  scored_interviews: number;
+  technical_score: number | null;
+  communication_score: number | null;
+  culture_fit_score: number | null;
+  overall_rating: number | null;
+}
+
+export interface Analytics {
+  days: number;
+  current: AnalyticsPeriod;
+  previous: AnalyticsPeriod;
+  all_time: AnalyticsPeriod;
+  project_scores: ProjectScores[];
+}
+
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+}
+
+// Largest page the list endpoints serve
+const MAX_PAGE_SIZE = 500;
+
+export async function fetchPage<T>(path: string, params: ListParams = {}): Promise<Page<T>> {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (Array.isArray(value)) value.forEach((item) => query.append(key, item));
+    else if (value !== undefined) query.set(key, String(value));
+  });
+  const suffix = query.toString() ? `?${query}` : '';
+  const response = await fetch(`${API_URL}${path}${suffix}`);
+  if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+  return { items: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') };
+}
+
+// Follows X-Next-Cursor until the list runs out, so callers get every row
+export async function fetchAll<T>(path: string, params: ListParams = {}): Promise<T[]> {
+  const items: T[] = [];
+  let cursor = params.cursor;
+  do {
+    const page = await fetchPage<T>(path, { limit: MAX_PAGE_SIZE, ...params, cursor });
+    items.push(...page.items);
+    cursor = page.nextCursor ?? undefined;
+  } while (cursor);
+  return items;
+}
+
 export const api = {
+  // Change feed; without since only the current cursor comes back
+  async getChanges(since?: number): Promise<ChangeFeed> {
+    const suffix = since === undefined ? '' : `?since=${since}`;
+    const response = await fetch(`${API_URL}/api/changes${suffix}`);
+    if (response.status === 410) throw new ChangesExpiredError('变更记录已过期');
+    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+    return response.json();
+  },
+
+  async getAnalytics(days = 30): Promise<Analytics> {
+    const response = await fetch(`${API_URL}/api/analytics?days=${days}`);
+    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+    return response.json();
+  },
+
   // Candidates
   async createCandidate(data: Omit<Candidate, 'id' | 'created_at'>) {
     const response = await fetch(`${API_URL}/api/candidates/`, {
@@ -90,15 +267,39 @@ export const api = {
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify(data),
     });
-    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+    if (!response.ok) {
+      // 409: a candidate with the same email or phone exists; detail names it
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.detail || `HTTP error! status: ${response.status}`);
+    }
     return response.json();
   },
 
-  async getCandidates(): Promise<Candidate[]> {
-    const response = await fetch(`${API_URL}/api/candidates/`);
+  async getCandidateDuplicates(params?: ListParams & { candidate_id?: string }): Promise<Page<CandidateDuplicate>> {
+    return fetchPage<CandidateDuplicate>('/api/candidates/duplicates', params);
+  },
+
+  async mergeCandidates(candidateId: string, duplicateIds: string[]): Promise<Candidate> {
+    const response = await fetch(`${API_URL}/api/candidates/${candidateId}/merge`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ duplicate_ids: duplicateIds }),
+    });
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.detail || `合并失败: HTTP错误 ${response.status}`);
+    }
     return response.json();
   },
 
+  async getCandidates(params?: ListParams): Promise<Candidate[]> {
+    return fetchAll<Candidate>('/api/candidates/', params);
+  },
+
+  async searchCandidates(params: CandidateSearch): Promise<Page<Candidate>> {
+    return fetchPage<Candidate>('/api/candidates/search', params);
+  },
+
   // Resumes
   async uploadResume(
     file: File, 
@@ -164,16 +365,13 @@ export const api = {
     });
   },
 
-  async getResumes(): Promise<Resume[]> {
-    const response = await fetch(`${API_URL}/api/resumes/`);
-    return response.json();
+  async getResumes(params?: ListParams): Promise<Resume[]> {
+    return fetchAll<Resume>('/api/resumes/', params);
   },
 
   // Tags
-  async getTags(): Promise<Tag[]> {
-    const response = await fetch(`${API_URL}/api/tags/`);
-    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-    return response.json();
+  async getTags(params?: ListParams): Promise<Tag[]> {
+    return fetchAll<Tag>('/api/tags/', params);
   },
 
   async createProject(data: Omit<Project, 'id' | 'status' | 'created_at'>): Promise<Project> {
@@ -186,10 +384,8 @@ export const api = {
     return response.json();
   },
   
-  async getProjects(): Promise<Project[]> {
-    const response = await fetch(`${API_URL}/api/projects/`);
-    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-    return response.json();
+  async getProjects(params?: ListParams): Promise<Project[]> {
+    return fetchAll<Project>('/api/projects/', params);
   },
 
   async updateProject(id: string, data: Partial<Project>): Promise<Project> {
@@ -205,6 +401,20 @@ export const api = {
     return response.json();
   },
 
+  async findSimilar(query: SimilarityQuery): Promise<SimilarDocument[]> {
+    const response = await fetch(`${API_URL}/api/similar`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(query),
+    });
+    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+    return response.json();
+  },
+
+  async getProjectMatches(id: string, limit?: number): Promise<CandidateMatch[]> {
+    return (await fetchPage<CandidateMatch>(`/api/projects/${id}/matches`, { limit })).items;
+  },
+
   async deleteProject(id: string): Promise<void> {
     const response = await fetch(`${API_URL}/api/projects/${id}`, {
       method: 'DELETE',
@@ -235,10 +445,8 @@ export const api = {
     return response.json();
   },
 
-  async getInterviews(): Promise<Interview[]> {
-    const response = await fetch(`${API_URL}/api/interviews/`);
-    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-    return response.json();
+  async getInterviews(params?: ListParams): Promise<Interview[]> {
+    return fetchAll<Interview>('/api/interviews/', params);
   },
 
   async updateInterview(id: string, data: Partial<Interview>): Promise<Interview> {